@@ -0,0 +1,21 @@
+from importlib import import_module
+
+# imported on first use, so ``crawler.reader`` and friends work without the
+# HTTP stack (aiohttp, requests, bs4) that the fetching backends need
+_EXPORTS = {
+    "fetch_products": ".engine",
+    "BACKENDS": ".engine",
+    "read_product_ids": ".common",
+    "iter_products": ".reader",
+    "ProductIndex": ".reader",
+}
+
+__all__ = ["fetch_products", "read_product_ids", "iter_products", "ProductIndex", "BACKENDS"]
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,68 @@
+import json
+import argparse
+
+from .common import read_product_ids
+from .engine import fetch_products, BACKENDS
+from .parsing import CLEANERS
+from .sinks import FORMATS
+from .negative_cache import DEAD_TTL
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m crawler", description="Fetch Tiki products by ID")
+    parser.add_argument("csv", nargs="?", default="products-0-200000(in).csv",
+                        help="CSV file whose first column holds the product IDs")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="hybrid")
+    parser.add_argument("--processes", type=int, help="worker processes (process, hybrid)")
+    parser.add_argument("--chunk-size", type=int, help="IDs handed to a worker at a time (process, hybrid)")
+    parser.add_argument("--concurrency", type=int, help="starting in-flight requests per event loop (async, hybrid)")
+    parser.add_argument("--max-concurrency", type=int, help="ceiling for the adaptive limiter (async, hybrid)")
+    parser.add_argument("--no-keepalive", action="store_true",
+                        help="open a new connection per request (sequential, process); for benchmarks")
+    parser.add_argument("--http2", action="store_true", help="use an HTTP/2 client (sequential, process)")
+    parser.add_argument("--success-dir", help="where product files go (default products_<backend>)")
+    parser.add_argument("--error-dir", help="where error lists go (default errors_<backend>)")
+    parser.add_argument("--format", choices=FORMATS, default="json", help="product file format")
+    parser.add_argument("--compression", choices=["gzip", "zstd"], help="compression for ndjson/parquet")
+    parser.add_argument("--stats-json", help="write the run report to this file")
+    parser.add_argument("--journal", help="progress file used to resume an interrupted crawl")
+    parser.add_argument("--retry-failed", action="store_true", help="fetch IDs the journal lists as failed again")
+    parser.add_argument("--dead-cache", help="file of IDs that returned 404; they are skipped until --dead-ttl-days pass")
+    parser.add_argument("--dead-ttl-days", type=float, default=DEAD_TTL / 86400,
+                        help="how long a 404 is trusted (default 7)")
+    parser.add_argument("--no-retry-404", action="store_true", help="give up on an ID after its first 404")
+    parser.add_argument("--snapshots", help="snapshot store for incremental re-crawls; only new or changed "
+                                            "products are cleaned and written")
+    parser.add_argument("--cleaner", choices=sorted(CLEANERS), default="bs4", help="description cleaner")
+    parser.add_argument("--parse-kind", choices=["process", "thread", "inline"],
+                        help="where the async backend cleans descriptions")
+    args = parser.parse_args()
+
+    options = {}
+    if args.processes and args.backend in ("process", "hybrid"):
+        options["processes"] = args.processes
+    if args.chunk_size and args.backend in ("process", "hybrid"):
+        options["chunk_size"] = args.chunk_size
+    if args.concurrency and args.backend in ("async", "hybrid"):
+        options["concurrency"] = args.concurrency
+    if args.parse_kind and args.backend == "async":
+        options["parse_kind"] = args.parse_kind
+    if args.backend in ("sequential", "process"):
+        options["keepalive"] = not args.no_keepalive
+        options["http2"] = args.http2
+    if args.max_concurrency and args.backend in ("async", "hybrid"):
+        options["max_concurrency"] = args.max_concurrency
+
+    report = fetch_products(read_product_ids(args.csv), backend=args.backend,
+                            success_dir=args.success_dir, error_dir=args.error_dir, journal=args.journal,
+                            retry_failed=args.retry_failed, cleaner=args.cleaner,
+                            output_format=args.format, compression=args.compression,
+                            dead_cache=args.dead_cache, dead_ttl=args.dead_ttl_days * 86400,
+                            retry_not_found=not args.no_retry_404, snapshots=args.snapshots, **options)
+    if args.stats_json:
+        with open(args.stats_json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
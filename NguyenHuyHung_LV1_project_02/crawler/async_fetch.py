@@ -0,0 +1,165 @@
+import time
+import json
+import asyncio
+import aiohttp
+
+from .common import (URL, HEADERS, TIMEOUT, RETRIES, is_throttled, is_not_found, parse_retry_after,
+                     backoff_delay)
+from .parsing import ParserPool
+from .ratelimit import AdaptiveLimiter, report_metrics
+from .snapshots import Validators, content_hash, conditional_headers
+
+CONCURRENCY = 20
+MAX_CONCURRENCY = 200
+METRICS_INTERVAL = 10
+QUEUE_SIZE = 1000
+
+
+async def fetch_product(session, limiter, product_id, retries=RETRIES, retry_not_found=True, snapshot=None):
+    """ Fetch one product; returns (status, result, validators, queue_wait)
+
+    ``queue_wait`` is the time spent waiting for the limiter to grant a
+    slot, summed over the attempts, so callers can keep it out of latency.
+
+    On success the result is the raw payload, parsed later by the ParserPool.
+    With ``retry_not_found`` off a 404 is final after the first attempt.
+    With a ``snapshot`` the request is conditional, and a 304 or a body that
+    hashes like the snapshot returns status "unchanged", so it is never parsed.
+    """
+    url = URL.format(product_id)
+    headers = conditional_headers(snapshot)
+    error_type = "unknown_error"
+    queue_wait = 0.0
+    for attempt in range(1, retries + 1):
+        data = None
+        validators = None
+        retry_after = None
+        outcome = "throttled"
+        final = False
+        waiting = time.perf_counter()
+        await limiter.acquire()
+        queue_wait += time.perf_counter() - waiting
+        started = time.monotonic()
+        try:
+            async with session.get(url, headers=headers, timeout=TIMEOUT) as response:
+                if response.status == 304 and snapshot is not None:
+                    validators = _validators(response, snapshot.content_hash)
+                    outcome = "ok"
+                elif response.status == 200:
+                    body = await response.read()
+                    validators = _validators(response, content_hash(body))
+                    if snapshot is None or validators.content_hash != snapshot.content_hash:
+                        data = json.loads(body)
+                    outcome = "ok"
+                else:
+                    error_type = f"status_{response.status}"
+                    print(f"Failed {product_id}: Status {response.status} (Attempt {attempt})")
+                    if is_throttled(response.status):
+                        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    else:
+                        outcome = "ok"
+                        final = is_not_found(response.status) and not retry_not_found
+        except Exception as e:
+            error_type = "exception"
+            print(f"Exception {product_id}: {e} (Attempt {attempt})")
+        finally:
+            limiter.release(time.monotonic() - started, outcome, retry_after)
+
+        if data is not None:
+            print(f"Success fetch: {product_id}")
+            return "success", data, validators, queue_wait
+        if validators is not None:
+            print(f"Unchanged: {product_id}")
+            return "unchanged", {"id": product_id}, validators, queue_wait
+        if final:
+            return error_type, {"id": product_id, "attempts": attempt}, None, queue_wait
+        if attempt < retries:
+            await asyncio.sleep(backoff_delay(attempt, retry_after))
+
+    return error_type, {"id": product_id, "attempts": retries}, None, queue_wait
+
+
+def _validators(response, body_hash):
+    return Validators(body_hash, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+
+
+async def get_product_info(session, limiter, product_id, retries=RETRIES, retry_not_found=True):
+    """ fetch_product without change detection: (status, result) """
+    status, result, _, _ = await fetch_product(session, limiter, product_id, retries, retry_not_found)
+    return status, result
+
+
+async def produce(product_ids, ids_queue, workers):
+    """ Feed IDs into the bounded queue; accepts a plain or an async iterable """
+    if hasattr(product_ids, "__aiter__"):
+        async for pid in product_ids:
+            await ids_queue.put(pid)
+    else:
+        for pid in product_ids:
+            await ids_queue.put(pid)
+    for _ in range(workers):
+        await ids_queue.put(None)
+
+
+async def fetch_worker(limiter, session, parser, ids_queue, results, retry_not_found=True, snapshots=None):
+    while (pid := await ids_queue.get()) is not None:
+        snapshot = snapshots.get(pid) if snapshots is not None else None
+        started = time.perf_counter()
+        status, result, validators, queue_wait = await fetch_product(session, limiter, pid,
+                                                                     retry_not_found=retry_not_found,
+                                                                     snapshot=snapshot)
+        # latency of the requests themselves (and backoff), like the sequential fetcher reports
+        latency = time.perf_counter() - started - queue_wait
+        if status == "success":
+            try:
+                result = await parser.parse(result)
+            except Exception as e:
+                # a malformed payload fails this product only, like in the sequential fetcher
+                print(f"Exception {pid}: {e} (parsing)")
+                status, result = "exception", {"id": pid, "attempts": 1}
+        await results.put((pid, status, result, latency, validators, queue_wait))
+
+
+async def write_results(output, results):
+    while (item := await results.get()) is not None:
+        output.add(*item)
+
+
+async def fetch_async(product_ids, output, parser, concurrency=CONCURRENCY, max_concurrency=MAX_CONCURRENCY,
+                      metrics_interval=METRICS_INTERVAL, queue_size=QUEUE_SIZE, retry_not_found=True):
+    """ Producer -> fetch workers -> writer, joined by bounded queues
+
+    IDs are pulled lazily from ``product_ids`` and a fixed set of
+    ``max_concurrency`` workers does the fetching, so memory does not grow
+    with the number of IDs. The adaptive limiter decides how many of those
+    workers are actually in flight; ``concurrency`` is only its starting point.
+    Descriptions are cleaned by ``parser`` off the event loop.
+    """
+    limiter = AdaptiveLimiter(concurrency, max_concurrency=max_concurrency)
+    connector = aiohttp.TCPConnector(limit_per_host=max_concurrency)
+    ids_queue = asyncio.Queue(maxsize=queue_size)
+    results = asyncio.Queue(maxsize=queue_size)
+    reporter = asyncio.create_task(report_metrics(limiter, metrics_interval))
+
+    async def fetch_all(session):
+        workers = [fetch_worker(limiter, session, parser, ids_queue, results, retry_not_found, output.snapshots)
+                   for _ in range(max_concurrency)]
+        await asyncio.gather(produce(product_ids, ids_queue, max_concurrency), *workers)
+        await results.put(None)
+
+    try:
+        async with aiohttp.ClientSession(connector=connector, headers=HEADERS) as session:
+            await asyncio.gather(fetch_all(session), write_results(output, results))
+    finally:
+        reporter.cancel()
+    return limiter.metrics()
+
+
+def run(product_ids, output, concurrency=CONCURRENCY, max_concurrency=MAX_CONCURRENCY,
+        cleaner="bs4", parse_kind="process", parse_workers=None, retry_not_found=True):
+    parser = ParserPool(cleaner, parse_kind, parse_workers)
+    try:
+        asyncio.run(fetch_async(product_ids, output, parser, concurrency, max_concurrency,
+                                retry_not_found=retry_not_found))
+    finally:
+        parser.close()
@@ -0,0 +1,119 @@
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+from itertools import islice
+
+from .common import read_product_ids
+from .mock_server import MockConfig, MockTikiServer, read_id_file
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CSV = os.path.join(PROJECT_DIR, "products-0-200000(in).csv")
+
+
+def write_ids(path, product_ids):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("id\n")
+        f.writelines(f"{pid}\n" for pid in product_ids)
+
+
+def run_backend(server, backend, ids_csv, workdir, extra_args=(), label=None):
+    """ Crawl ``ids_csv`` against ``server`` in a child process and measure it
+
+    The child's CPU time and peak RSS come from ``os.wait4``; for the
+    multi-process backends the RSS is that of the largest process.
+    """
+    stats_path = os.path.join(workdir, "stats.json")
+    cmd = [sys.executable, "-m", "crawler", ids_csv, "--backend", backend,
+           "--success-dir", os.path.join(workdir, "products"), "--error-dir", os.path.join(workdir, "errors"),
+           "--stats-json", stats_path, *extra_args]
+    env = dict(os.environ, TIKI_PRODUCT_URL=server.url)
+
+    server.reset()
+    with open(os.path.join(workdir, "crawl.log"), "w") as log:
+        proc = subprocess.Popen(cmd, cwd=PROJECT_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+        _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{backend} exited with {proc.returncode}, see {workdir}/crawl.log")
+
+    with open(stats_path, encoding="utf-8") as f:
+        report = json.load(f)
+    server_counts = server.snapshot()
+    report["backend"] = label or backend
+    report["cpu"] = usage.ru_utime + usage.ru_stime
+    report["peak_rss_mb"] = usage.ru_maxrss / 1024
+    report["connections"] = server_counts.pop("connections", 0)
+    report["requests"] = sum(server_counts.values())
+    return report
+
+
+def print_table(reports):
+    print(f"{'backend':<24}{'IDs':>7}{'wall s':>9}{'IDs/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'wait ms':>9}"
+          f"{'CPU s':>8}{'RSS MB':>8}{'requests':>10}{'conns':>8}")
+    for r in reports:
+        print(f"{r['backend']:<24}{sum(r['counts'].values()):>7}{r['elapsed']:>9.1f}{r['rate']:>9.1f}"
+              f"{r['latency']['p50'] * 1000:>9.0f}{r['latency']['p99'] * 1000:>9.0f}"
+              f"{r['queue_wait']['p50'] * 1000:>9.0f}"
+              f"{r['cpu']:>8.1f}{r['peak_rss_mb']:>8.0f}{r['requests']:>10}{r['connections']:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m crawler.benchmark",
+                                     description="Benchmark the crawler backends against the local mock API")
+    parser.add_argument("--backends", default="sequential,async,process,hybrid")
+    parser.add_argument("--ids", default=DEFAULT_CSV, help="CSV of product IDs; the first --count are used")
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--sequential-count", type=int, default=200, help="IDs for the (slow) sequential backend")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--not-found-rate", type=float, default=0.1)
+    parser.add_argument("--not-found-file", help="IDs that always 404, e.g. errors_async/status_404.txt")
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--description-size", type=int, default=4000)
+    parser.add_argument("--connect-latency", type=float, default=0.03,
+                        help="simulated TCP+TLS handshake seconds per new connection")
+    parser.add_argument("--keepalive-compare", action="store_true",
+                        help="also run sequential/process with a new connection per request")
+    parser.add_argument("--json", help="also write the reports here, for tracking regressions")
+    parser.add_argument("crawler_args", nargs=argparse.REMAINDER,
+                        help="extra arguments for python -m crawler, after --")
+    args = parser.parse_args()
+    extra = [a for a in args.crawler_args if a != "--"]
+
+    config = MockConfig(args.latency, args.latency_sigma, args.not_found_rate,
+                        read_id_file(args.not_found_file) if args.not_found_file else (),
+                        args.throttle_rate, error_rate=args.error_rate, description_size=args.description_size,
+                        connect_latency=args.connect_latency)
+    runs = []
+    for backend in args.backends.split(","):
+        runs.append((backend, backend, extra))
+        if args.keepalive_compare and backend in ("sequential", "process"):
+            runs.append((f"{backend} (no keep-alive)", backend, [*extra, "--no-keepalive"]))
+
+    server = MockTikiServer(config).start()
+    reports = []
+    try:
+        with tempfile.TemporaryDirectory(prefix="crawler-bench-") as tmp:
+            for i, (label, backend, crawler_args) in enumerate(runs):
+                workdir = os.path.join(tmp, f"{i}-{backend}")
+                os.makedirs(workdir)
+                count = args.sequential_count if backend == "sequential" else args.count
+                ids_csv = os.path.join(workdir, "ids.csv")
+                write_ids(ids_csv, islice(read_product_ids(args.ids), count))
+                print(f"Running {label} on {count} IDs...", file=sys.stderr)
+                reports.append(run_backend(server, backend, ids_csv, workdir, crawler_args, label))
+    finally:
+        server.stop()
+
+    print_table(reports)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+import os
+import csv
+import time
+import queue
+import random
+from collections import defaultdict
+from email.utils import parsedate_to_datetime
+
+from .errors import ErrorLog
+from .metrics import LatencyHistogram
+from .sinks import make_sink
+
+# TIKI_PRODUCT_URL points the crawler at another server, e.g. crawler.mock_server
+URL = os.environ.get("TIKI_PRODUCT_URL", "https://api.tiki.vn/product-detail/api/v1/products/{}")
+HEADERS = {'User-Agent': 'Mozilla/5.0'}
+
+TIMEOUT = 10
+RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 30
+BATCH_SIZE = 1000
+
+# outcomes that are not errors: fetched and written, or unchanged since the snapshot
+FINISHED_STATUSES = ("success", "unchanged")
+
+
+def read_product_ids(csv_path):
+    """ Lazily yield the product IDs in the first column of a CSV with a header row """
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for row in reader:
+            if row and row[0].strip():
+                yield int(row[0])
+
+
+def bounded_imap_unordered(pool, func, iterable, window):
+    """ Like ``pool.imap_unordered`` but with at most ``window`` tasks submitted at a time
+
+    ``Pool.imap_unordered`` drains its whole input into the task queue up
+    front; this keeps the input lazy and the number of pending results bounded.
+    """
+    done = queue.SimpleQueue()
+    pending = 0
+
+    def next_result():
+        ok, value = done.get()
+        if not ok:
+            raise value
+        return value
+
+    for item in iterable:
+        pool.apply_async(func, (item,), callback=lambda value: done.put((True, value)),
+                         error_callback=lambda error: done.put((False, error)))
+        pending += 1
+        if pending >= window:
+            yield next_result()
+            pending -= 1
+    while pending:
+        yield next_result()
+        pending -= 1
+
+
+def is_not_found(status):
+    """ The product does not exist; asking again will not change that """
+    return status == 404
+
+
+def is_throttled(status):
+    """ Statuses that mean the server wants us to slow down """
+    return status == 429 or status >= 500
+
+
+def parse_retry_after(value):
+    """ Seconds from a Retry-After header, given as seconds or an HTTP date """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, retry_after=None):
+    """ Seconds to wait before the next attempt: full-jitter exponential backoff,
+    but never less than what the server asked for in Retry-After """
+    delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+class CrawlOutput:
+    """ Output stage shared by every backend: the product sink, the error log,
+    counts and the per-product fetch latency histogram (plus, for the async
+    fetchers, a histogram of the time spent waiting for the rate limiter)
+
+    With a snapshot store, "unchanged" products are only counted and marked
+    as checked; new and changed ones go to the sink as usual and their
+    validators are parked in the store's pending table, ``batch_size`` at a
+    time, and promoted once the sink reports them durable.
+
+    With a journal, successful IDs are recorded only once the sink reports
+    them durable, so the journal never gets ahead of the files.
+    """
+
+    def __init__(self, success_dir, error_dir, batch_size=BATCH_SIZE, prefix="", journal=None,
+                 output_format="json", compression=None, snapshots=None):
+        self.success_dir = success_dir
+        self.error_dir = error_dir
+        self.batch_size = batch_size
+        self.prefix = prefix
+        self.journal = journal
+        self.output_format = output_format
+        self.compression = compression
+        self.snapshots = snapshots
+        self.sink = make_sink(output_format, success_dir, prefix, compression)
+        self.errors = ErrorLog(error_dir, prefix)
+        self.pending = 0
+        self.failed = []
+        self.changed = []
+        self.unchanged = []
+        self.counts = defaultdict(int)
+        self.latency = LatencyHistogram()
+        self.queue_wait = LatencyHistogram()
+        os.makedirs(success_dir, exist_ok=True)
+        os.makedirs(error_dir, exist_ok=True)
+
+    def worker(self, name):
+        """ Output for a worker process or shard, writing its own file names """
+        return CrawlOutput(self.success_dir, self.error_dir, self.batch_size, f"{self.prefix}{name}_",
+                           self.journal, self.output_format, self.compression, self.snapshots)
+
+    def add(self, product_id, status, result, latency=None, validators=None, queue_wait=None):
+        self.counts[status] += 1
+        if latency is not None:
+            self.latency.record(latency)
+        if queue_wait is not None:
+            self.queue_wait.record(queue_wait)
+        if status == "unchanged":
+            self.unchanged.append((product_id, validators))
+            if len(self.unchanged) >= self.batch_size:
+                self._record([])
+        elif status == "success":
+            if self.snapshots is not None and validators is not None:
+                self.changed.append((product_id, validators))
+                if len(self.changed) >= self.batch_size:
+                    self._park_changed()
+            self.sink.write(product_id, result)
+            self.pending += 1
+            if self.pending >= self.batch_size:
+                self.flush()
+        else:
+            self.errors.record(product_id, status, result.get("attempts"), latency)
+            self.failed.append((product_id, status))
+            if len(self.failed) >= self.batch_size:
+                self._record([])
+
+    def merge(self, summary):
+        """ Fold in the summary returned by a worker's ``close()`` """
+        for status, count in summary["counts"].items():
+            self.counts[status] += count
+        self.latency.merge(summary["latency"])
+        self.queue_wait.merge(summary["queue_wait"])
+
+    def _park_changed(self):
+        if self.changed:
+            self.snapshots.record_pending(self.changed)
+            self.changed = []
+
+    def _record(self, durable):
+        # failures must be on disk before the journal calls them finished
+        self.errors.flush()
+        if self.snapshots is not None:
+            self._park_changed()
+            if durable:
+                self.snapshots.promote(durable)
+            if self.unchanged:
+                self.snapshots.record_unchanged(self.unchanged)
+        rows = ([(pid, "success") for pid in durable] + [(pid, "unchanged") for pid, _ in self.unchanged]
+                + self.failed)
+        if self.journal is not None and rows:
+            self.journal.mark(rows)
+        self.failed = []
+        self.unchanged = []
+
+    def flush(self):
+        self._record(self.sink.flush())
+        self.pending = 0
+
+    def close(self):
+        self._record(self.sink.close())
+        self.pending = 0
+        return {"counts": dict(self.counts), "latency": self.latency, "queue_wait": self.queue_wait}
+
+
+def print_summary(report):
+    counts = report["counts"]
+    total_success = counts.get("success", 0)
+    total_errors = sum(count for status, count in counts.items() if status not in FINISHED_STATUSES)
+    print(f"Total success: {total_success}")
+    if "unchanged" in counts:
+        print(f"Unchanged since the last crawl: {counts['unchanged']}")
+    print(f"Total errors: {total_errors}")
+    for err_type, count in counts.items():
+        if err_type not in FINISHED_STATUSES:
+            print(f"   - {err_type}: {count}")
+    latency = report["latency"]
+    print(f"Elapsed: {report['elapsed']:.1f}s ({report['rate']:.1f} IDs/s), "
+          f"latency p50 {latency['p50'] * 1000:.0f}ms p99 {latency['p99'] * 1000:.0f}ms")
+    queue_wait = report.get("queue_wait")
+    if queue_wait and queue_wait["count"]:
+        print(f"Rate limiter wait p50 {queue_wait['p50'] * 1000:.0f}ms p99 {queue_wait['p99'] * 1000:.0f}ms")
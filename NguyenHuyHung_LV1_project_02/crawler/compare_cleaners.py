@@ -0,0 +1,78 @@
+import sys
+import json
+import time
+import random
+import argparse
+
+from .parsing import CLEANERS, clean_description
+
+SAMPLE_BLOCKS = [
+    "<p>Sản phẩm <strong>chính hãng</strong>, bảo hành 12&nbsp;tháng.</p>",
+    "<ul><li>Chất liệu: cotton</li><li>Kích thước: 30 x 40 cm</li></ul>",
+    "<h2>Thông số kỹ thuật</h2><table><tr><td>Trọng lượng</td><td>1.2 kg</td></tr></table>",
+    "<p><img src=\"https://salt.tikicdn.com/ts/product/a.jpg\" alt=\"\" /><br/>Giá &amp; khuyến mãi</p>",
+    "<div><span style=\"color:red\">Lưu ý:</span> giao hàng 2-3 ngày &lt;nội thành&gt;</div>",
+    "<p>\n  Xuất xứ:\tViệt Nam  </p><!-- tiki -->",
+    "<style>.x{color:red}</style><script>var a = 1;</script><p>Hướng dẫn sử dụng</p>",
+]
+
+
+def sample_descriptions(count, seed=0):
+    """ Synthetic descriptions built from markup seen in Tiki product pages """
+    rng = random.Random(seed)
+    return ["".join(rng.choice(SAMPLE_BLOCKS) for _ in range(rng.randint(3, 60))) for _ in range(count)]
+
+
+def load_descriptions(paths):
+    """ Descriptions from raw API payloads, as JSON arrays or one JSON object per line """
+    descriptions = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        try:
+            payloads = json.loads(text)
+            payloads = payloads if isinstance(payloads, list) else [payloads]
+        except json.JSONDecodeError:
+            payloads = [json.loads(line) for line in text.splitlines() if line.strip()]
+        descriptions.extend(p.get("description") or "" for p in payloads)
+    return descriptions
+
+
+def compare(descriptions, repeat=3, show=3):
+    """ Time every cleaner and check its output against the BeautifulSoup one """
+    expected = [clean_description(d) for d in descriptions]
+    total_bytes = sum(len(d.encode("utf-8")) for d in descriptions)
+    print(f"{len(descriptions)} descriptions, {total_bytes / 1e6:.1f} MB of HTML")
+
+    baseline = None
+    for name, cleaner in CLEANERS.items():
+        best = float("inf")
+        for _ in range(repeat):
+            started = time.perf_counter()
+            output = [cleaner(d) for d in descriptions]
+            best = min(best, time.perf_counter() - started)
+        baseline = baseline or best
+
+        mismatches = [(d, e, o) for d, e, o in zip(descriptions, expected, output) if e != o]
+        print(f"{name:6} {best:8.3f}s  {best / len(descriptions) * 1e6:9.1f} us/desc  "
+              f"x{baseline / best:5.1f}  mismatches: {len(mismatches)}")
+        for d, e, o in mismatches[:show]:
+            print(f"    html:     {d[:120]!r}\n    bs4:      {e[:120]!r}\n    {name + ':':9} {o[:120]!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m crawler.compare_cleaners",
+                                     description="Benchmark description cleaners against BeautifulSoup")
+    parser.add_argument("payloads", nargs="*", help="raw product payload files (JSON or NDJSON)")
+    parser.add_argument("--samples", type=int, default=2000, help="synthetic descriptions when no files are given")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    descriptions = load_descriptions(args.payloads) if args.payloads else sample_descriptions(args.samples)
+    if not descriptions:
+        sys.exit("No descriptions to compare")
+    compare(descriptions, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import time
+
+from . import sequential, async_fetch, process_pool, hybrid
+from .common import BATCH_SIZE, CrawlOutput, print_summary
+from .errors import iter_failures
+from .journal import ProgressJournal
+from .negative_cache import NegativeCache, DEAD_TTL, DEAD_STATUSES
+from .snapshots import SnapshotStore
+
+BACKENDS = {
+    "sequential": sequential.run,
+    "async": async_fetch.run,
+    "process": process_pool.run,
+    "hybrid": hybrid.run,
+}
+
+# output folder suffixes, matching the original scripts
+DIR_SUFFIX = {
+    "sequential": "seq",
+    "async": "async",
+    "process": "mp",
+    "hybrid": "hybrid",
+}
+
+
+def fetch_products(product_ids, backend="async", success_dir=None, error_dir=None,
+                   batch_size=BATCH_SIZE, journal=None, retry_failed=False, cleaner="bs4",
+                   output_format="json", compression=None, dead_cache=None, dead_ttl=DEAD_TTL,
+                   retry_not_found=True, snapshots=None, **options):
+    """ Fetch every product ID with the chosen backend and return a run report
+
+    The report holds the status ``counts``, ``elapsed`` seconds, the ``rate``
+    in IDs per second and ``latency`` percentiles (seconds per product,
+    retries included). For the async backends ``queue_wait`` holds the
+    percentiles of the time products waited for the rate limiter, which is
+    not part of ``latency``.
+
+    ``journal`` is the path of a progress file; IDs it already lists as
+    finished are skipped, so an interrupted crawl resumes where it stopped.
+    With ``retry_failed`` only successes count as finished.
+    ``cleaner`` picks the description cleaner, see ``parsing.CLEANERS``.
+    ``output_format`` is "json" (the original 1000-product arrays), "ndjson"
+    (with ``compression`` None, "gzip" or "zstd") or "parquet"; read any of
+    them back with ``crawler.reader``.
+
+    ``dead_cache`` is the path of a negative cache (``crawler.negative_cache``):
+    IDs that returned 404 within the last ``dead_ttl`` seconds are not
+    requested at all, and this run's 404s are added to it. With
+    ``retry_not_found`` off a 404 is not retried.
+
+    ``snapshots`` is the path of a snapshot store (``crawler.snapshots``) for
+    incremental re-crawls: requests are conditional, unchanged products are
+    counted as "unchanged" and neither cleaned nor written, so the product
+    files of the run are the delta of new and changed products.
+
+    Extra keyword options go to the backend, e.g. ``processes`` for "process"
+    and "hybrid" or ``concurrency`` for "async" and "hybrid".
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}, expected one of {sorted(BACKENDS)}")
+
+    if journal is not None:
+        journal = ProgressJournal(journal)
+        product_ids = journal.pending(product_ids, retry_failed)
+    if dead_cache is not None:
+        dead_cache = NegativeCache(dead_cache, dead_ttl)
+        product_ids = dead_cache.filter(product_ids)
+    if snapshots is not None:
+        snapshots = SnapshotStore(snapshots)
+
+    started = time.perf_counter()
+    started_at = int(time.time())
+    suffix = DIR_SUFFIX[backend]
+    output = CrawlOutput(success_dir or f"products_{suffix}", error_dir or f"errors_{suffix}", batch_size,
+                         journal=journal, output_format=output_format, compression=compression,
+                         snapshots=snapshots)
+    BACKENDS[backend](product_ids, output, cleaner=cleaner, retry_not_found=retry_not_found, **options)
+
+    summary = output.close()
+    if journal is not None:
+        journal.close()
+    if snapshots is not None:
+        snapshots.close()
+    if dead_cache is not None:
+        # this run's dead IDs are read back from the error log rather than kept in memory
+        dead_cache.add(int(row["id"]) for row in iter_failures(output.error_dir)
+                       if row["error_type"] in DEAD_STATUSES and int(row["failed_at"]) >= started_at)
+        dead_cache.save()
+
+    elapsed = time.perf_counter() - started
+    total = sum(summary["counts"].values())
+    report = {
+        "backend": backend,
+        "counts": summary["counts"],
+        "skipped_dead": dead_cache.skipped if dead_cache is not None else 0,
+        "elapsed": elapsed,
+        "rate": total / elapsed if elapsed else 0.0,
+        "latency": summary["latency"].summary(),
+        "queue_wait": summary["queue_wait"].summary(),
+    }
+    print_summary(report)
+    return report
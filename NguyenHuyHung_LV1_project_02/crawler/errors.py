@@ -0,0 +1,148 @@
+import os
+import csv
+import sys
+import glob
+import time
+import shutil
+import argparse
+from collections import defaultdict
+
+FLUSH_EVERY = 1000
+FLUSH_INTERVAL = 5.0
+FAILURE_FIELDS = ["id", "error_type", "status", "attempts", "latency_ms", "failed_at"]
+MERGING_SUFFIX = ".merging"
+
+
+class ErrorLog:
+    """ Buffered error sink, written only by the process that owns it
+
+    Failures are kept in memory and appended in one go every ``flush_every``
+    records or ``flush_interval`` seconds: one open per error type for the
+    ``<error_type>.txt`` ID lists the crawler always wrote, and one for
+    ``failures.csv`` with the status code, attempt count and latency of each
+    failed ID. Worker processes get their own ``prefix``, so no two
+    processes ever append to the same file.
+    """
+
+    def __init__(self, error_dir, prefix="", flush_every=FLUSH_EVERY, flush_interval=FLUSH_INTERVAL):
+        self.error_dir = error_dir
+        self.prefix = prefix
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.buffer = []
+        self.flushed_at = time.monotonic()
+
+    def record(self, product_id, error_type, attempts=None, latency=None):
+        status = error_type[len("status_"):] if error_type.startswith("status_") else ""
+        self.buffer.append((product_id, error_type, status, attempts or "",
+                            round(latency * 1000) if latency is not None else "", int(time.time())))
+        if len(self.buffer) >= self.flush_every or time.monotonic() - self.flushed_at >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self.flushed_at = time.monotonic()
+        if not self.buffer:
+            return
+        by_type = defaultdict(list)
+        for row in self.buffer:
+            by_type[row[1]].append(f"{row[0]}\n")
+        for error_type, lines in by_type.items():
+            with open(os.path.join(self.error_dir, f"{self.prefix}{error_type}.txt"), "a", encoding="utf-8") as f:
+                f.writelines(lines)
+
+        path = os.path.join(self.error_dir, f"{self.prefix}failures.csv")
+        is_new = not os.path.exists(path)
+        with open(path, "a", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            if is_new:
+                writer.writerow(FAILURE_FIELDS)
+            writer.writerows(self.buffer)
+            f.flush()
+            os.fsync(f.fileno())
+        print(f"Saved {len(self.buffer)} failed IDs to {self.error_dir}")
+        self.buffer = []
+
+
+def merge_shards(error_dir, prefix, shards):
+    """ Fold the error files of worker shards (``<prefix><shard>_*``) into the ``<prefix>*`` ones
+
+    A multi-process crawl then leaves one status_404.txt and one
+    failures.csv, like a single-process crawl. Call it once the workers
+    have exited. Each shard file is renamed to ``<name>.merging`` before it
+    is appended and removed once the target is synced, so the next run,
+    which reuses the shard names, never merges the same rows twice; a
+    crash mid-merge leaves the shard's rows in the ``.merging`` file.
+    """
+    for shard in shards:
+        shard_prefix = f"{prefix}{shard}_"
+        for path in sorted(glob.glob(os.path.join(error_dir, glob.escape(shard_prefix) + "*"))):
+            if path.endswith(MERGING_SUFFIX):
+                continue
+            target = os.path.join(error_dir, prefix + os.path.basename(path)[len(shard_prefix):])
+            target_is_empty = not os.path.exists(target) or os.path.getsize(target) == 0
+            merging = path + MERGING_SUFFIX
+            os.replace(path, merging)
+            with open(merging, "rb") as src, open(target, "ab") as dst:
+                if target.endswith(".csv"):
+                    header = src.readline()
+                    if target_is_empty:
+                        dst.write(header)
+                shutil.copyfileobj(src, dst)
+                dst.flush()
+                os.fsync(dst.fileno())
+            os.remove(merging)
+
+
+def iter_failures(error_dir):
+    """ Every row of every failures.csv in ``error_dir``, workers' included """
+    for path in sorted(glob.glob(os.path.join(error_dir, "*failures.csv"))):
+        with open(path, newline="", encoding="utf-8") as f:
+            yield from csv.DictReader(f)
+
+
+def retry_ids(error_dir, include=None, exclude=()):
+    """ Distinct failed IDs, optionally limited to or excluding some error types """
+    seen = set()
+    for row in iter_failures(error_dir):
+        if include and row["error_type"] not in include:
+            continue
+        if row["error_type"] in exclude or row["id"] in seen:
+            continue
+        seen.add(row["id"])
+        yield int(row["id"])
+
+
+def write_retry_list(error_dir, path, include=None, exclude=()):
+    """ Write the retry IDs as a CSV the crawler reads directly; returns how many """
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("id\n")
+        for pid in retry_ids(error_dir, include, exclude):
+            f.write(f"{pid}\n")
+            count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m crawler.errors",
+                                     description="Summarize a crawl's failures and write a retry list")
+    parser.add_argument("error_dir")
+    parser.add_argument("--out", help="write the failed IDs here, ready for python -m crawler")
+    parser.add_argument("--include", action="append", help="only these error types, e.g. status_429")
+    parser.add_argument("--exclude", action="append", default=[], help="skip these error types, e.g. status_404")
+    args = parser.parse_args()
+
+    counts = defaultdict(int)
+    for row in iter_failures(args.error_dir):
+        counts[row["error_type"]] += 1
+    if not counts:
+        sys.exit(f"No failures.csv in {args.error_dir}")
+    for error_type, count in sorted(counts.items(), key=lambda item: -item[1]):
+        print(f"{error_type}: {count}")
+    if args.out:
+        count = write_retry_list(args.error_dir, args.out, args.include, args.exclude)
+        print(f"Wrote {count} IDs to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import queue
+import asyncio
+from itertools import islice
+from multiprocessing import Process, Queue, cpu_count
+
+from . import async_fetch
+from .errors import merge_shards
+from .parsing import ParserPool
+
+CHUNK_SIZE = 500
+# how often the parent checks on its workers while waiting for them
+POLL_INTERVAL = 1.0
+
+
+async def queued_ids(id_queue):
+    """ Async stream of IDs from the parent's chunk queue, without blocking the loop """
+    loop = asyncio.get_running_loop()
+    while (chunk := await loop.run_in_executor(None, id_queue.get)) is not None:
+        for pid in chunk:
+            yield pid
+
+
+def _worker(index, output, id_queue, done_queue, concurrency, max_concurrency, cleaner, retry_not_found):
+    """ Always reports back: (index, summary, None) or (index, summary or None, error message) """
+    # the processes already cover every core, so parsing just moves to a thread
+    parser = ParserPool(cleaner, "thread")
+    error = summary = None
+    try:
+        asyncio.run(async_fetch.fetch_async(queued_ids(id_queue), output, parser, concurrency, max_concurrency,
+                                            retry_not_found=retry_not_found))
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        parser.close()
+        try:
+            summary = output.close()
+        except Exception as e:
+            error = error or f"{type(e).__name__}: {e}"
+        done_queue.put((index, summary, error))
+
+
+def _check_workers(workers, reported=()):
+    # a worker that exited without reporting back will never consume or report anything
+    for i, w in enumerate(workers):
+        if i not in reported and w.exitcode is not None:
+            raise RuntimeError(f"Hybrid worker {i} exited with code {w.exitcode} before finishing")
+
+
+def _put(q, item, workers):
+    # a plain put would block forever if the workers had died
+    while True:
+        try:
+            q.put(item, timeout=POLL_INTERVAL)
+            return
+        except queue.Full:
+            _check_workers(workers)
+
+
+def _get(q, workers, reported):
+    while True:
+        try:
+            return q.get(timeout=POLL_INTERVAL)
+        except queue.Empty:
+            try:
+                _check_workers(workers, reported)
+            except RuntimeError as dead:
+                # it may have reported just before exiting
+                try:
+                    return q.get(timeout=POLL_INTERVAL)
+                except queue.Empty:
+                    raise dead from None
+
+
+def run(product_ids, output, processes=None, concurrency=async_fetch.CONCURRENCY,
+        max_concurrency=async_fetch.MAX_CONCURRENCY, chunk_size=CHUNK_SIZE, cleaner="bs4", retry_not_found=True):
+    """ N processes, each running its own event loop
+
+    The parent reads the IDs lazily and hands them out in chunks through a
+    bounded queue, so a fast worker simply takes more chunks and nothing
+    holds the full ID list. Each process adapts its own limiter, so the total
+    in-flight limit is up to ``processes * max_concurrency``.
+
+    If a worker fails or dies, the remaining ones are stopped and a
+    RuntimeError is raised, after the summaries that did arrive are merged.
+    The workers' error files are merged into one set for the run at the end.
+    """
+    processes = processes or cpu_count()
+    id_queue = Queue(maxsize=2 * processes)
+    done_queue = Queue()
+    workers = [Process(target=_worker,
+                       args=(i, output.worker(f"w{i}"), id_queue, done_queue, concurrency, max_concurrency,
+                             cleaner, retry_not_found))
+               for i in range(processes)]
+    for w in workers:
+        w.start()
+
+    try:
+        product_ids = iter(product_ids)
+        while chunk := list(islice(product_ids, chunk_size)):
+            _put(id_queue, chunk, workers)
+        for _ in workers:
+            _put(id_queue, None, workers)
+
+        reported = set()
+        errors = []
+        while len(reported) < len(workers):
+            index, summary, error = _get(done_queue, workers, reported)
+            reported.add(index)
+            if summary is not None:
+                output.merge(summary)
+            if error is not None:
+                errors.append(f"worker {index}: {error}")
+        if errors:
+            raise RuntimeError("Hybrid workers failed: " + "; ".join(errors))
+    except BaseException:
+        for w in workers:
+            if w.is_alive():
+                w.terminate()
+        raise
+    finally:
+        for w in workers:
+            w.join()
+        merge_shards(output.error_dir, output.prefix, [f"w{i}" for i in range(processes)])
@@ -0,0 +1,90 @@
+import os
+import time
+import sqlite3
+from itertools import islice
+
+CHUNK_SIZE = 900
+
+# connections opened by a parent process before it forked; see ProgressJournal.conn
+_inherited = []
+
+
+class ProgressJournal:
+    """ Durable record of finished product IDs, kept in a SQLite file
+
+    An ID is only written here after its product batch (or error line) is on
+    disk, so a restarted crawl can safely skip everything the journal lists.
+    The connection is opened lazily and per process: a journal handed to
+    worker processes, pickled or inherited through fork (even with the
+    parent's connection already open), opens its own connection in each.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+        self._pid = None
+
+    def __getstate__(self):
+        return {"path": self.path, "_conn": None, "_pid": None}
+
+    @property
+    def conn(self):
+        if self._conn is not None and self._pid != os.getpid():
+            # opened before a fork: SQLite connections must not cross processes,
+            # and closing the copy here could disturb the parent's, so just keep it
+            _inherited.append(self._conn)
+            self._conn = None
+        if self._conn is None:
+            self._pid = os.getpid()
+            self._conn = sqlite3.connect(self.path, timeout=60)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=FULL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS progress (
+                    id INTEGER PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            self._conn.commit()
+        return self._conn
+
+    def mark(self, rows):
+        """ Record (product_id, status) pairs in one transaction """
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO progress(id, status, updated_at) VALUES(?, ?, ?)",
+                [(int(pid), status, now) for pid, status in rows])
+
+    def pending(self, product_ids, retry_failed=False):
+        """ Yield the IDs that still need fetching
+
+        IDs are checked against the journal a chunk at a time, so neither
+        the input nor the finished set is ever held in memory as a whole.
+        """
+        sql = "SELECT id FROM progress WHERE id IN ({})"
+        if retry_failed:
+            sql += " AND status IN ('success', 'unchanged')"
+        skipped = 0
+        product_ids = iter(product_ids)
+        while chunk := list(islice(product_ids, CHUNK_SIZE)):
+            query = sql.format(",".join("?" * len(chunk)))
+            finished = {row[0] for row in self.conn.execute(query, [int(pid) for pid in chunk])}
+            skipped += len(finished)
+            for pid in chunk:
+                if int(pid) not in finished:
+                    yield pid
+        if skipped:
+            print(f"Journal {self.path}: skipped {skipped} finished IDs")
+
+    def counts(self):
+        return dict(self.conn.execute("SELECT status, COUNT(*) FROM progress GROUP BY status"))
+
+    def close(self):
+        if self._conn is not None:
+            if self._pid == os.getpid():
+                self._conn.close()
+            else:
+                _inherited.append(self._conn)
+            self._conn = None
@@ -0,0 +1,56 @@
+import math
+
+
+class LatencyHistogram:
+    """ Log-bucketed latency histogram: constant memory, cheap to merge and pickle
+
+    Buckets grow by ``growth`` (5% by default), so percentiles are accurate to
+    within that factor however many samples are recorded.
+    """
+
+    def __init__(self, low=1e-4, high=300.0, growth=1.05):
+        self.low = low
+        self.growth = growth
+        self.buckets = [0] * (int(math.log(high / low, growth)) + 2)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        if seconds <= self.low:
+            index = 0
+        else:
+            index = min(len(self.buckets) - 1, int(math.log(seconds / self.low, self.growth)) + 1)
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def merge(self, other):
+        for i, n in enumerate(other.buckets):
+            self.buckets[i] += n
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, q):
+        """ Upper bound of the bucket holding the ``q``-th percentile, in seconds """
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank and n:
+                return min(self.max, self.low * self.growth ** i)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": self.max,
+        }
@@ -0,0 +1,289 @@
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from .compare_cleaners import SAMPLE_BLOCKS
+
+PRODUCT_PATH = re.compile(r"^/product-detail/api/v1/products/(\d+)/?$")
+# Last-Modified of version 0 of every product, 2024-01-01
+EPOCH = 1704067200
+
+
+class MockConfig:
+    """ How the mock API behaves; every rate is a probability in [0, 1]
+
+    ``latency`` is the median response time in seconds; with ``latency_sigma``
+    above zero it follows a log-normal distribution around that median, which
+    gives the long tail real APIs have. ``connect_latency`` is charged once per
+    new connection, standing in for the TCP+TLS handshake the real HTTPS API
+    costs. Whether an ID is missing is decided
+    from the ID itself, so the same IDs 404 on every run; throttling (429 with
+    ``Retry-After``) and 5xx errors are drawn per request.
+
+    ``revision`` stands for the day of the catalogue: at every revision a
+    ``change_rate`` share of the products gets a new price, decided from the
+    ID and revision, so re-crawls see a stable set of changes. Products carry
+    an ``ETag`` and ``Last-Modified`` for their version (unless
+    ``validators`` is off) and conditional requests get 304.
+    """
+
+    def __init__(self, latency=0.05, latency_sigma=0.5, not_found_rate=0.0, not_found_ids=(),
+                 throttle_rate=0.0, retry_after=1, error_rate=0.0, description_size=4000, seed=0,
+                 connect_latency=0.0, revision=0, change_rate=0.0, validators=True):
+        self.latency = latency
+        self.connect_latency = connect_latency
+        self.latency_sigma = latency_sigma
+        self.not_found_rate = not_found_rate
+        self.not_found_ids = set(not_found_ids)
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.error_rate = error_rate
+        self.description_size = description_size
+        self.seed = seed
+        self.revision = revision
+        self.change_rate = change_rate
+        self.validators = validators
+
+    def is_missing(self, product_id):
+        if product_id in self.not_found_ids:
+            return True
+        return random.Random(product_id * 7919 + self.seed).random() < self.not_found_rate
+
+    def version(self, product_id):
+        """ The last revision at which the product changed, 0 if it never did """
+        if self.change_rate <= 0:
+            return 0
+        for revision in range(self.revision, 0, -1):
+            if random.Random(f"{product_id}:{revision}:{self.seed}").random() < self.change_rate:
+                return revision
+        return 0
+
+    def delay(self):
+        if self.latency <= 0:
+            return 0.0
+        if self.latency_sigma <= 0:
+            return self.latency
+        return random.lognormvariate(0, self.latency_sigma) * self.latency
+
+
+def make_product(product_id, description_size=4000, version=0):
+    """ Product-detail payload shaped like the real Tiki response; each ``version`` has its own price """
+    rng = random.Random(product_id)
+    blocks = []
+    size = 0
+    while size < description_size:
+        blocks.append(rng.choice(SAMPLE_BLOCKS))
+        size += len(blocks[-1])
+    price = rng.randrange(10, 5000) * 1000 + version * 1000
+    return {
+        "id": product_id,
+        "master_id": product_id,
+        "sku": str(rng.randrange(10 ** 12, 10 ** 13)),
+        "name": f"Sản phẩm mẫu {product_id}",
+        "url_key": f"san-pham-mau-{product_id}",
+        "url_path": f"san-pham-mau-{product_id}.html?spid={product_id}",
+        "type": "simple",
+        "price": price,
+        "list_price": price + rng.randrange(0, 200) * 1000,
+        "discount_rate": rng.randrange(0, 50),
+        "rating_average": round(rng.uniform(0, 5), 1),
+        "review_count": rng.randrange(0, 5000),
+        "short_description": f"Mô tả ngắn cho sản phẩm {product_id}",
+        "description": "".join(blocks),
+        "images": [
+            {
+                "base_url": f"https://salt.tikicdn.com/ts/product/{product_id:x}/{i}.jpg",
+                "large_url": f"https://salt.tikicdn.com/cache/w1200/ts/product/{product_id:x}/{i}.jpg",
+                "medium_url": f"https://salt.tikicdn.com/cache/w300/ts/product/{product_id:x}/{i}.jpg",
+                "small_url": f"https://salt.tikicdn.com/cache/w100/ts/product/{product_id:x}/{i}.jpg",
+                "thumbnail_url": f"https://salt.tikicdn.com/cache/w75/ts/product/{product_id:x}/{i}.jpg",
+                "is_gallery": True,
+                "label": None,
+                "position": None,
+            }
+            for i in range(rng.randint(1, 8))
+        ],
+        "inventory_status": "available",
+    }
+
+
+class MockTikiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body go out as two writes; with Nagle on, keep-alive
+    # connections would stall on delayed ACKs and look slower than new ones
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.count("connections")
+        if self.server.config.connect_latency > 0:
+            time.sleep(self.server.config.connect_latency)
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_not_modified(self, headers):
+        self.send_response(304)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+
+    def is_not_modified(self, etag, version_time):
+        """ RFC 9110: If-None-Match wins over If-Modified-Since when both are sent """
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            return etag in (tag.strip() for tag in if_none_match.split(","))
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since is not None:
+            try:
+                return version_time <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def send_json(self, status, body, headers=()):
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        config = self.server.config
+        if self.path == "/__stats":
+            return self.send_json(200, self.server.snapshot())
+
+        match = PRODUCT_PATH.match(self.path)
+        if not match:
+            self.server.count("status_404")
+            return self.send_json(404, {"error": {"code": 404, "message": "Not found"}})
+
+        time.sleep(config.delay())
+        product_id = int(match.group(1))
+        roll = random.random()
+        if roll < config.throttle_rate:
+            self.server.count("status_429")
+            return self.send_json(429, {"error": {"code": 429, "message": "Too many requests"}},
+                                  [("Retry-After", str(config.retry_after))])
+        if roll < config.throttle_rate + config.error_rate:
+            self.server.count("status_503")
+            return self.send_json(503, {"error": {"code": 503, "message": "Service unavailable"}})
+        if config.is_missing(product_id):
+            self.server.count("status_404")
+            return self.send_json(404, {"error": {"code": 404, "message": "Product not found"}})
+
+        version = config.version(product_id)
+        headers = []
+        if config.validators:
+            # versions are a day apart, starting from a fixed date
+            version_time = EPOCH + version * 86400
+            etag = f'"{product_id:x}-{version}"'
+            headers = [("ETag", etag), ("Last-Modified", formatdate(version_time, usegmt=True))]
+            if self.is_not_modified(etag, version_time):
+                self.server.count("status_304")
+                return self.send_not_modified(headers)
+        self.server.count("status_200")
+        self.send_json(200, make_product(product_id, config.description_size, version), headers)
+
+
+class MockTikiServer(ThreadingHTTPServer):
+    """ Local stand-in for api.tiki.vn, serving /product-detail/api/v1/products/{id}
+
+    Counts requests by status and the number of TCP connections accepted,
+    which shows how well a client reuses connections. The counters are served
+    as JSON from ``/__stats``.
+    """
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        super().__init__((host, port), MockTikiHandler)
+        self.config = config or MockConfig()
+        self.counters = {}
+        self.lock = threading.Lock()
+        self.thread = None
+
+    @property
+    def url(self):
+        """ Product URL template for TIKI_PRODUCT_URL """
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/product-detail/api/v1/products/{{}}"
+
+    def handle_error(self, request, client_address):
+        # clients dropping idle keep-alive connections is normal, not worth a traceback
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def count(self, name):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + 1
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.counters)
+
+    def reset(self):
+        with self.lock:
+            self.counters = {}
+
+    def start(self):
+        """ Serve from a background thread and return self """
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def read_id_file(path):
+    with open(path, encoding="utf-8") as f:
+        return [int(line) for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m crawler.mock_server", description="Local mock of the Tiki product API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.05, help="median latency in seconds")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="log-normal spread, 0 for fixed latency")
+    parser.add_argument("--not-found-rate", type=float, default=0.0)
+    parser.add_argument("--not-found-file", help="IDs that always 404, e.g. errors_async/status_404.txt")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="share of requests answered with 429")
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 503")
+    parser.add_argument("--description-size", type=int, default=4000, help="approximate description HTML bytes")
+    parser.add_argument("--connect-latency", type=float, default=0.0, help="simulated handshake seconds per connection")
+    parser.add_argument("--revision", type=int, default=0, help="catalogue day; raise it to simulate changes")
+    parser.add_argument("--change-rate", type=float, default=0.0, help="share of products changed per revision")
+    parser.add_argument("--no-validators", action="store_true", help="send no ETag/Last-Modified, never 304")
+    args = parser.parse_args()
+
+    config = MockConfig(args.latency, args.latency_sigma, args.not_found_rate,
+                        read_id_file(args.not_found_file) if args.not_found_file else (),
+                        args.throttle_rate, args.retry_after, args.error_rate, args.description_size,
+                        connect_latency=args.connect_latency, revision=args.revision,
+                        change_rate=args.change_rate, validators=not args.no_validators)
+    server = MockTikiServer(config, args.host, args.port)
+    print(f"Serving {server.url}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
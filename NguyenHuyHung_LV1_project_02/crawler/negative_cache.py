@@ -0,0 +1,138 @@
+import os
+import sys
+import time
+import struct
+import argparse
+from array import array
+from bisect import bisect_left
+
+DEAD_TTL = 7 * 24 * 3600
+DEAD_STATUSES = ("status_404",)
+
+MAGIC = b"TIKINEG1"
+HEADER = struct.Struct("<8sQ")
+
+
+class NegativeCache:
+    """ Product IDs known to be missing, each with the time it was last seen missing
+
+    On disk the IDs are one sorted int64 array followed by a parallel array
+    of int64 timestamps, so 200k dead IDs take about 3 MB and a lookup is a
+    binary search. An ID is skipped until ``ttl`` seconds after it was last
+    seen missing; after that it is fetched once more and either seen missing
+    again (``add`` refreshes it) or dropped on the next ``save``.
+
+    Only the process that owns the cache reads or writes the file; after a
+    run it adds the dead IDs the workers wrote to the error log.
+    """
+
+    def __init__(self, path, ttl=DEAD_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.ids = array("q")
+        self.seen_at = array("q")
+        self.new_ids = array("q")
+        self.new_seen_at = array("q")
+        self.skipped = 0
+        if os.path.exists(path):
+            self.load()
+
+    def load(self):
+        with open(self.path, "rb") as f:
+            magic, count = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{self.path} is not a negative cache file")
+            self.ids = array("q")
+            self.ids.fromfile(f, count)
+            self.seen_at = array("q")
+            self.seen_at.fromfile(f, count)
+        if sys.byteorder != "little":
+            self.ids.byteswap()
+            self.seen_at.byteswap()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def is_dead(self, product_id, now=None):
+        """ Whether ``product_id`` was seen missing less than ``ttl`` seconds ago """
+        product_id = int(product_id)
+        i = bisect_left(self.ids, product_id)
+        if i == len(self.ids) or self.ids[i] != product_id:
+            return False
+        return (now or time.time()) - self.seen_at[i] < self.ttl
+
+    def filter(self, product_ids):
+        """ Yield the IDs that are not known to be dead, lazily """
+        now = time.time()
+        skipped = 0
+        for pid in product_ids:
+            if self.is_dead(pid, now):
+                skipped += 1
+            else:
+                yield pid
+        self.skipped += skipped
+        if skipped:
+            print(f"Negative cache {self.path}: skipped {skipped} dead IDs")
+
+    def add(self, product_ids, now=None):
+        """ Remember IDs just seen missing; they reach the file on ``save`` """
+        now = int(now or time.time())
+        for pid in product_ids:
+            self.new_ids.append(int(pid))
+            self.new_seen_at.append(now)
+
+    def save(self):
+        """ Merge the new IDs in, drop expired ones and replace the file atomically """
+        cutoff = time.time() - self.ttl
+        merged = {pid: seen for pid, seen in zip(self.ids, self.seen_at) if seen > cutoff}
+        merged.update(zip(self.new_ids, self.new_seen_at))
+        ids = sorted(merged)
+        self.ids = array("q", ids)
+        self.seen_at = array("q", (merged[pid] for pid in ids))
+        self.new_ids = array("q")
+        self.new_seen_at = array("q")
+
+        ids, seen_at = self.ids, self.seen_at
+        if sys.byteorder != "little":
+            ids, seen_at = array("q", ids), array("q", seen_at)
+            ids.byteswap()
+            seen_at.byteswap()
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, len(ids)))
+            ids.tofile(f)
+            seen_at.tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+
+def read_id_list(path):
+    """ IDs from a one-per-line list such as errors_async/status_404.txt """
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield int(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m crawler.negative_cache",
+                                     description="Inspect or seed the cache of dead product IDs")
+    parser.add_argument("path")
+    parser.add_argument("--ttl-days", type=float, default=DEAD_TTL / 86400)
+    parser.add_argument("--import", dest="imports", action="append", default=[],
+                        help="add the IDs of an error list, e.g. errors_async/status_404.txt")
+    args = parser.parse_args()
+
+    cache = NegativeCache(args.path, args.ttl_days * 86400)
+    for path in args.imports:
+        cache.add(read_id_list(path))
+    if args.imports:
+        cache.save()
+    now = time.time()
+    live = sum(1 for seen in cache.seen_at if now - seen < cache.ttl)
+    print(f"{len(cache)} dead IDs, {live} within the {args.ttl_days:g} day TTL")
+
+
+if __name__ == "__main__":
+    main()
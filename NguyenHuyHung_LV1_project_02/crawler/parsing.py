@@ -0,0 +1,159 @@
+import re
+import html
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from bs4 import BeautifulSoup
+
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+PARSE_BATCH_SIZE = 64
+PARSE_MAX_DELAY = 0.02
+
+_WHITESPACE = re.compile(r'\s+')
+_INVISIBLE = re.compile(r'<(script|style)\b.*?</\1\s*>|<!--.*?-->', re.IGNORECASE | re.DOTALL)
+_TAG = re.compile(r'<[^>]*>')
+
+
+def clean_description(description):
+    if not description:
+        return ""
+    soup = BeautifulSoup(description, "html.parser")
+    text = soup.get_text(separator=' ', strip=True)
+    text = re.sub(r'\s+', ' ', text)
+    return text
+
+
+def clean_description_lxml(description):
+    """ Same text as clean_description, using lxml's C parser """
+    if not description:
+        return ""
+    root = lxml.html.fragment_fromstring(description, create_parent="div")
+    for element in root.xpath("//script|//style"):
+        element.drop_tree()
+    text = ' '.join(part.strip() for part in root.itertext() if part.strip())
+    return _WHITESPACE.sub(' ', text)
+
+
+def clean_description_regex(description):
+    """ Tag stripper without an HTML parser; fastest, but looser on broken markup """
+    if not description:
+        return ""
+    text = _INVISIBLE.sub(' ', description)
+    text = html.unescape(_TAG.sub(' ', text))
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+CLEANERS = {
+    "bs4": clean_description,
+    "regex": clean_description_regex,
+}
+if lxml is not None:
+    CLEANERS["lxml"] = clean_description_lxml
+
+
+def get_cleaner(name):
+    if name not in CLEANERS:
+        raise ValueError(f"Unknown description cleaner {name!r}, expected one of {sorted(CLEANERS)}")
+    return CLEANERS[name]
+
+
+def parse_product(data, cleaner="bs4"):
+    """ Keep the fields we store from a product-detail payload """
+    return {
+        "id": data.get("id"),
+        "name": data.get("name"),
+        "url_key": data.get("url_key"),
+        "price": data.get("price"),
+        "description": get_cleaner(cleaner)(data.get("description")),
+        "images": data.get("images", []),
+    }
+
+
+def parse_batch(payloads, cleaner="bs4"):
+    """ Parse every payload; one that fails comes back as its exception, so it fails alone """
+    products = []
+    for data in payloads:
+        try:
+            products.append(parse_product(data, cleaner))
+        except Exception as e:
+            products.append(e)
+    return products
+
+
+class ParserPool:
+    """ Parse stage for the event loop: product payloads are cleaned in an executor
+
+    Payloads are grouped into batches of up to ``batch_size`` (or whatever
+    arrived within ``max_delay`` seconds) so a process pool pays one pickle
+    round-trip per batch instead of per product. ``kind`` is "process",
+    "thread", or "inline" to parse on the loop as before.
+    """
+
+    def __init__(self, cleaner="bs4", kind="process", workers=None,
+                 batch_size=PARSE_BATCH_SIZE, max_delay=PARSE_MAX_DELAY):
+        get_cleaner(cleaner)
+        self.cleaner = cleaner
+        self.kind = kind
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.pending = []
+        self.timer = None
+        if kind == "process":
+            self.executor = ProcessPoolExecutor(max_workers=workers)
+        elif kind == "thread":
+            self.executor = ThreadPoolExecutor(max_workers=workers or 1)
+        elif kind == "inline":
+            self.executor = None
+        else:
+            raise ValueError(f"Unknown parser pool kind {kind!r}, expected process, thread or inline")
+
+    async def parse(self, data):
+        if self.executor is None:
+            return parse_product(data, self.cleaner)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((data, future))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+        elif self.timer is None:
+            self.timer = loop.call_later(self.max_delay, self.flush)
+        return await future
+
+    def flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if not self.pending:
+            return
+
+        batch, self.pending = self.pending, []
+        loop = asyncio.get_running_loop()
+        done = loop.run_in_executor(self.executor, parse_batch, [data for data, _ in batch], self.cleaner)
+
+        def deliver(done):
+            if done.cancelled() or done.exception() is not None:
+                for _, future in batch:
+                    if future.done():
+                        continue
+                    if done.cancelled():
+                        future.cancel()
+                    else:
+                        future.set_exception(done.exception())
+                return
+            for (_, future), product in zip(batch, done.result()):
+                if future.done():
+                    continue
+                if isinstance(product, Exception):
+                    future.set_exception(product)
+                else:
+                    future.set_result(product)
+
+        done.add_done_callback(deliver)
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
@@ -0,0 +1,90 @@
+import math
+from itertools import islice, chain
+from multiprocessing import Pool, cpu_count
+
+from .common import bounded_imap_unordered
+from .errors import merge_shards
+from .sequential import fetch_into
+from .session import init_session, current_session
+
+CHUNK_SIZE = 1000
+WINDOW = 4
+
+# set in each worker by init_worker
+_output = None
+_cleaner = "bs4"
+_retry_not_found = True
+
+
+def init_worker(output, cleaner, keepalive, http2, retry_not_found=True):
+    global _output, _cleaner, _retry_not_found
+    _output = output
+    _cleaner = cleaner
+    _retry_not_found = retry_not_found
+    init_session(1, http2, keepalive)
+
+
+def fetch_chunk(job):
+    """ Fetch one chunk of IDs into its own output shard; only the summary goes back """
+    index, product_ids = job
+    output = _output.worker(f"c{index}")
+    for pid in product_ids:
+        fetch_into(output, pid, _cleaner, current_session(), _retry_not_found)
+    return output.close()
+
+
+def chunks(product_ids, size):
+    product_ids = iter(product_ids)
+    index = 0
+    while chunk := list(islice(product_ids, size)):
+        yield index, chunk
+        index += 1
+
+
+def pick_chunk_size(product_ids, processes, chunk_size=None):
+    """ Returns (chunk_size, product_ids)
+
+    Without an explicit ``chunk_size``, up to ``CHUNK_SIZE * processes`` IDs
+    are read ahead: an input that ends within them is split evenly over the
+    processes, so a small crawl still uses every worker; a longer one uses
+    CHUNK_SIZE. The IDs read ahead are put back in front of the stream.
+    """
+    product_ids = iter(product_ids)
+    if chunk_size is not None:
+        return chunk_size, product_ids
+    head = list(islice(product_ids, CHUNK_SIZE * processes))
+    if len(head) < CHUNK_SIZE * processes:
+        chunk_size = max(1, math.ceil(len(head) / processes))
+    else:
+        chunk_size = CHUNK_SIZE
+    return chunk_size, chain(head, product_ids)
+
+
+def run(product_ids, output, processes=None, chunk_size=None, cleaner="bs4", keepalive=True, http2=False,
+        retry_not_found=True):
+    """ Blocking fetchers in a process pool, fed with chunks of IDs
+
+    Every chunk is written by the worker that fetched it, as its own shard
+    (``products_c<chunk>_*``), so products never travel back to the parent;
+    workers return only counts and a latency histogram. At most
+    ``WINDOW * processes`` chunks are queued at a time, which keeps the ID
+    stream lazy, and each worker keeps one pooled session. See
+    ``pick_chunk_size`` for the default chunk size. Once the pool is done the
+    chunks' error files are merged into one set for the run.
+    """
+    processes = processes or cpu_count()
+    chunk_size, product_ids = pick_chunk_size(product_ids, processes, chunk_size)
+    shards = []
+
+    def jobs():
+        for index, chunk in chunks(product_ids, chunk_size):
+            shards.append(f"c{index}")
+            yield index, chunk
+
+    try:
+        with Pool(processes=processes, initializer=init_worker,
+                  initargs=(output, cleaner, keepalive, http2, retry_not_found)) as pool:
+            for summary in bounded_imap_unordered(pool, fetch_chunk, jobs(), WINDOW * processes):
+                output.merge(summary)
+    finally:
+        merge_shards(output.error_dir, output.prefix, shards)
@@ -0,0 +1,130 @@
+import time
+import asyncio
+from collections import deque
+
+
+class AdaptiveLimiter:
+    """ AIMD concurrency limit plus a token bucket for the request rate
+
+    While responses come back fast and healthy, both the in-flight limit and
+    the token rate grow additively (about +1 slot and +``rate_step`` req/s per
+    full window of requests). A throttled response (429/5xx), a timeout or a
+    latency above twice ``target_latency`` halves both, at most once per
+    ``target_latency`` seconds so one burst of failures is a single cut.
+    A ``Retry-After`` from the server pauses the whole bucket.
+
+    Each event loop needs its own limiter; in the hybrid backend every worker
+    process adapts independently.
+    """
+
+    def __init__(self, concurrency=20, min_concurrency=2, max_concurrency=200,
+                 rate=50.0, min_rate=1.0, max_rate=2000.0, rate_step=5.0,
+                 target_latency=2.0, window=10.0):
+        self.limit = float(concurrency)
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.rate = float(rate)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.rate_step = rate_step
+        self.target_latency = target_latency
+        self.window = window
+
+        self.in_flight = 0
+        self.tokens = 1.0
+        self.refilled_at = time.monotonic()
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+        self.waiters = deque()
+        # (finished_at, outcome, latency) of recent requests, for metrics
+        self.recent = deque()
+
+    async def acquire(self):
+        """ Wait for a free slot, then for a token
+
+        A caller cancelled while waiting gives back what it held: its place
+        in the queue, a wake-up it was handed, or its slot.
+        """
+        while self.in_flight >= int(self.limit):
+            waiter = asyncio.get_running_loop().create_future()
+            self.waiters.append(waiter)
+            try:
+                await waiter
+            except BaseException:
+                if waiter in self.waiters:
+                    self.waiters.remove(waiter)
+                else:
+                    self._wake()
+                raise
+        self.in_flight += 1
+
+        try:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.tokens = min(max(self.rate, 1.0), self.tokens + (now - self.refilled_at) * self.rate)
+                self.refilled_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+        except BaseException:
+            self.in_flight -= 1
+            self._wake()
+            raise
+
+    def release(self, latency, outcome, retry_after=None):
+        """ Give the slot back and adapt; ``outcome`` is "ok" or "throttled" """
+        now = time.monotonic()
+        self.in_flight -= 1
+        self.recent.append((now, outcome, latency))
+
+        if retry_after:
+            self.paused_until = max(self.paused_until, now + retry_after)
+        if outcome != "ok" or latency > 2 * self.target_latency:
+            if now - self.last_decrease > self.target_latency:
+                self.limit = max(self.min_concurrency, self.limit / 2)
+                self.rate = max(self.min_rate, self.rate / 2)
+                self.last_decrease = now
+        elif latency <= self.target_latency:
+            self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            self.rate = min(self.max_rate, self.rate + self.rate_step / self.limit)
+        self._wake()
+
+    def _wake(self):
+        """ Let as many queued callers retry as there are free slots """
+        free = int(self.limit) - self.in_flight
+        while free > 0 and self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    def metrics(self):
+        """ Live view of the controller over the last ``window`` seconds """
+        now = time.monotonic()
+        while self.recent and now - self.recent[0][0] > self.window:
+            self.recent.popleft()
+        done = len(self.recent)
+        ok = sum(1 for _, outcome, _ in self.recent if outcome == "ok")
+        latency = sum(latency for _, _, latency in self.recent) / done if done else 0.0
+        return {
+            "concurrency_limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "token_rate": round(self.rate, 1),
+            "request_rate": round(done / self.window, 1),
+            "success_rate": round(ok / done, 3) if done else 1.0,
+            "avg_latency": round(latency, 3),
+        }
+
+
+async def report_metrics(limiter, interval):
+    """ Print the limiter metrics every ``interval`` seconds until cancelled """
+    while True:
+        await asyncio.sleep(interval)
+        m = limiter.metrics()
+        print(f"[limiter] concurrency={m['concurrency_limit']} in_flight={m['in_flight']} "
+              f"rate={m['request_rate']}/s (bucket {m['token_rate']}/s) "
+              f"success={m['success_rate']:.1%} latency={m['avg_latency']}s")
@@ -0,0 +1,125 @@
+import io
+import os
+import re
+import gzip
+import json
+from contextlib import contextmanager
+
+from .sinks import zstandard, pq
+
+PRODUCT_FILE = re.compile(r"^products_.*\.(json|ndjson|ndjson\.gz|ndjson\.zst|parquet)$")
+
+
+def product_files(success_dir):
+    """ Finished product files in a crawl output folder, in name order """
+    return sorted(os.path.join(success_dir, name) for name in os.listdir(success_dir)
+                  if PRODUCT_FILE.match(name))
+
+
+@contextmanager
+def _open_lines(path, offset=0, single_block=False):
+    """ Text stream over an NDJSON file, starting at ``offset`` """
+    with open(path, "rb") as f:
+        f.seek(offset)
+        if path.endswith(".gz"):
+            stream = gzip.GzipFile(fileobj=f)
+        elif path.endswith(".zst"):
+            if zstandard is None:
+                raise ValueError("Reading .zst files needs the zstandard package")
+            stream = io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(
+                f, read_across_frames=not single_block, closefd=False))
+        else:
+            stream = f
+        yield io.TextIOWrapper(stream, encoding="utf-8")
+
+
+def _read_ndjson(path):
+    with _open_lines(path) as lines:
+        try:
+            for line in lines:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # a line cut short by a crash can only be the last one
+                    return
+        except EOFError:
+            # compressed file whose last block was never finished
+            return
+
+
+def _read_parquet(path, batch_size=1000):
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+        for row in batch.to_pylist():
+            row["images"] = json.loads(row["images"]) if row["images"] else []
+            yield row
+
+
+def read_file(path):
+    """ Stream the products of one output file, whatever its format """
+    if path.endswith(".parquet"):
+        if pq is None:
+            raise ValueError("Reading Parquet files needs the pyarrow package")
+        yield from _read_parquet(path)
+    elif path.endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            yield from json.load(f)
+    else:
+        yield from _read_ndjson(path)
+
+
+def iter_products(success_dir):
+    """ Stream every product in a crawl output folder """
+    for path in product_files(success_dir):
+        yield from read_file(path)
+
+
+class ProductIndex:
+    """ Look up single products by ID without reading whole files
+
+    NDJSON files are found through their ``.idx`` sidecars, which are loaded
+    once (two ints per product). A plain file is read from the product's own
+    line; a compressed one from the start of its block. Parquet files are
+    searched with a filter on ``id``, which skips row groups by statistics,
+    and legacy JSON batches are scanned.
+    """
+
+    def __init__(self, success_dir):
+        self.success_dir = success_dir
+        self.offsets = {}
+        self.other_files = []
+        for path in product_files(success_dir):
+            if ".ndjson" in path and os.path.exists(path + ".idx"):
+                with open(path + ".idx", encoding="utf-8") as f:
+                    for line in f:
+                        product_id, offset = line.split("\t")
+                        # older sinks wrote "None" for a payload with "id": null
+                        if product_id.isdigit():
+                            self.offsets[int(product_id)] = (path, int(offset))
+            else:
+                self.other_files.append(path)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def get(self, product_id):
+        product_id = int(product_id)
+        if product_id in self.offsets:
+            path, offset = self.offsets[product_id]
+            with _open_lines(path, offset, single_block=True) as lines:
+                for line in lines:
+                    product = json.loads(line)
+                    if product.get("id") == product_id:
+                        return product
+            return None
+
+        for path in self.other_files:
+            if path.endswith(".parquet") and pq is not None:
+                rows = pq.read_table(path, filters=[("id", "=", product_id)]).to_pylist()
+                if rows:
+                    rows[0]["images"] = json.loads(rows[0]["images"]) if rows[0]["images"] else []
+                    return rows[0]
+            elif path.endswith(".json") or ".ndjson" in path:
+                for product in read_file(path):
+                    if product.get("id") == product_id:
+                        return product
+        return None
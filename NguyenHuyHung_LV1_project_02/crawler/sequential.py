@@ -0,0 +1,81 @@
+import time
+import json
+import requests
+
+from .common import (URL, HEADERS, TIMEOUT, RETRIES, is_throttled, is_not_found, parse_retry_after,
+                     backoff_delay)
+from .parsing import parse_product
+from .session import make_session
+from .snapshots import Validators, content_hash, conditional_headers
+
+
+def fetch_product(product_id, retries=RETRIES, cleaner="bs4", session=None, retry_not_found=True, snapshot=None):
+    """ Fetch one product; returns (status, result, validators)
+
+    ``session`` reuses connections, without it every request opens a new one.
+    With ``retry_not_found`` off a 404 is final after the first attempt.
+    ``snapshot`` holds the validators of the last fetch: the request is made
+    conditional, and a 304 or an identical body returns status "unchanged"
+    without cleaning the description. ``validators`` describe what the
+    server sent, for the snapshot store.
+    """
+    client = session or requests
+    url = URL.format(product_id)
+    headers = {**HEADERS, **conditional_headers(snapshot)}
+    error_type = "unknown_error"
+    for attempt in range(1, retries + 1):
+        retry_after = None
+        try:
+            response = client.get(url, headers=headers, timeout=TIMEOUT)
+            if response.status_code == 304 and snapshot is not None:
+                print(f"Unchanged: {product_id}")
+                return "unchanged", {"id": product_id}, _validators(response, snapshot.content_hash)
+            if response.status_code == 200:
+                body = response.content
+                validators = _validators(response, content_hash(body))
+                if snapshot is not None and validators.content_hash == snapshot.content_hash:
+                    print(f"Unchanged: {product_id}")
+                    return "unchanged", {"id": product_id}, validators
+                print(f"Success fetch: {product_id}")
+                return "success", parse_product(json.loads(body), cleaner), validators
+            error_type = f"status_{response.status_code}"
+            print(f"Failed {product_id}: Status {response.status_code} (Attempt {attempt})")
+            if is_throttled(response.status_code):
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            elif is_not_found(response.status_code) and not retry_not_found:
+                return error_type, {"id": product_id, "attempts": attempt}, None
+        except Exception as e:
+            error_type = "exception"
+            print(f"Exception {product_id}: {e} (Attempt {attempt})")
+        if attempt < retries:
+            time.sleep(backoff_delay(attempt, retry_after))
+
+    return error_type, {"id": product_id, "attempts": retries}, None
+
+
+def _validators(response, body_hash):
+    return Validators(body_hash, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+
+
+def get_product_info(product_id, retries=RETRIES, cleaner="bs4", session=None, retry_not_found=True):
+    """ fetch_product without change detection: (status, result) """
+    return fetch_product(product_id, retries, cleaner, session, retry_not_found)[:2]
+
+
+def fetch_into(output, product_id, cleaner="bs4", session=None, retry_not_found=True):
+    """ Fetch one product into ``output``, conditionally if it has a snapshot store """
+    snapshot = output.snapshots.get(product_id) if output.snapshots is not None else None
+    started = time.perf_counter()
+    status, result, validators = fetch_product(product_id, cleaner=cleaner, session=session,
+                                               retry_not_found=retry_not_found, snapshot=snapshot)
+    output.add(product_id, status, result, time.perf_counter() - started, validators)
+
+
+def run(product_ids, output, cleaner="bs4", keepalive=True, http2=False, retry_not_found=True):
+    session = make_session(1, http2) if keepalive else None
+    try:
+        for pid in product_ids:
+            fetch_into(output, pid, cleaner, session, retry_not_found)
+    finally:
+        if session is not None:
+            session.close()
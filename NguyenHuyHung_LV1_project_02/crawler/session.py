@@ -0,0 +1,47 @@
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+from .common import HEADERS, TIMEOUT
+
+POOL_SIZE = 10
+
+# the session of this process, set by init_session (the Pool initializer)
+_session = None
+
+
+def make_session(pool_size=POOL_SIZE, http2=False):
+    """ Keep-alive HTTP client with a connection pool of ``pool_size``
+
+    With ``http2`` an httpx client is used instead of requests, so requests
+    to the same host share one multiplexed connection. Both clients expose
+    the ``get(url, headers=, timeout=)`` / ``status_code`` / ``json()``
+    surface the fetchers use.
+    """
+    if http2:
+        if httpx is None:
+            raise ValueError("HTTP/2 needs the httpx package with its http2 extra")
+        limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        return httpx.Client(http2=True, headers=HEADERS, timeout=TIMEOUT, limits=limits)
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(HEADERS)
+    return session
+
+
+def init_session(pool_size=POOL_SIZE, http2=False, keepalive=True):
+    """ Pool initializer: build this worker's session once, before any task runs """
+    global _session
+    _session = make_session(pool_size, http2) if keepalive else None
+
+
+def current_session():
+    """ This process's session, or None to fall back to one connection per request """
+    return _session
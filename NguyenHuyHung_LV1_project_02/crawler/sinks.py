@@ -0,0 +1,243 @@
+import os
+import re
+import gzip
+import json
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+ROTATE_ROWS = 100_000
+COMPRESSION_SUFFIX = {None: "", "gzip": ".gz", "zstd": ".zst"}
+
+
+def next_file_index(success_dir, prefix=""):
+    """ First unused products_<prefix>N.* index, so resumed runs never overwrite """
+    pattern = re.compile(rf"^products_{re.escape(prefix)}(\d+)\.")
+    indexes = [int(m.group(1)) for m in map(pattern.match, os.listdir(success_dir)) if m]
+    return max(indexes, default=0) + 1
+
+
+def save_product_to_file(success_dir, data_list, name):
+    # write to a temp file and rename, so a crash never leaves half a batch behind
+    file_path = os.path.join(success_dir, f"products_{name}.json")
+    tmp_path = file_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data_list, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, file_path)
+    print(f"Saved {file_path}")
+
+
+class JsonBatchSink:
+    """ The original layout: one pretty-printed JSON array per batch """
+
+    def __init__(self, success_dir, prefix=""):
+        self.success_dir = success_dir
+        self.prefix = prefix
+        self.products = []
+        self.ids = []
+
+    def write(self, product_id, product):
+        self.products.append(product)
+        self.ids.append(product_id)
+
+    def flush(self):
+        """ End the current block; returns the product IDs now safely on disk """
+        if not self.products:
+            return []
+        index = next_file_index(self.success_dir, self.prefix)
+        save_product_to_file(self.success_dir, self.products, f"{self.prefix}{index}")
+        durable, self.products, self.ids = self.ids, [], []
+        return durable
+
+    def close(self):
+        return self.flush()
+
+
+class NdjsonSink:
+    """ One compact JSON object per line, optionally gzip or zstd compressed
+
+    Products are serialized and handed to the (compressing) stream as they
+    arrive; nothing is held back but the current line. Each ``flush`` ends a
+    block, which for compressed files is a separate gzip member / zstd frame,
+    so a block can be decompressed on its own. A sidecar ``.idx`` file maps
+    every product ID to its line offset (plain files) or block offset
+    (compressed files) for ``reader.ProductIndex``.
+    """
+
+    def __init__(self, success_dir, prefix="", compression=None, rotate_rows=ROTATE_ROWS):
+        if compression not in COMPRESSION_SUFFIX:
+            raise ValueError(f"Unknown compression {compression!r}, expected gzip or zstd")
+        if compression == "zstd" and zstandard is None:
+            raise ValueError("zstd compression needs the zstandard package")
+        self.success_dir = success_dir
+        self.prefix = prefix
+        self.compression = compression
+        self.rotate_rows = rotate_rows
+        self.path = None
+        self.file = None
+        self.index_file = None
+        self.block = None
+        self.block_offset = 0
+        self.block_ids = []
+        self.index_lines = []
+        self.rows_in_file = 0
+
+    def __getstate__(self):
+        if self.file is not None:
+            raise TypeError("Cannot pickle a sink with an open file")
+        return self.__dict__.copy()
+
+    def _open_file(self):
+        index = next_file_index(self.success_dir, self.prefix)
+        suffix = ".ndjson" + COMPRESSION_SUFFIX[self.compression]
+        self.path = os.path.join(self.success_dir, f"products_{self.prefix}{index}{suffix}")
+        self.file = open(self.path, "xb")
+        self.index_file = open(self.path + ".idx", "x", encoding="utf-8")
+        self.rows_in_file = 0
+
+    def _open_block(self):
+        if self.file is None:
+            self._open_file()
+        self.block_offset = self.file.tell()
+        if self.compression == "gzip":
+            self.block = gzip.GzipFile(fileobj=self.file, mode="wb", compresslevel=6)
+        elif self.compression == "zstd":
+            self.block = zstandard.ZstdCompressor(level=3).stream_writer(self.file, closefd=False)
+        else:
+            self.block = self.file
+
+    def write(self, product_id, product):
+        if self.block is None:
+            self._open_block()
+        offset = self.block_offset if self.compression else self.file.tell()
+        line = json.dumps(product, ensure_ascii=False, separators=(",", ":")) + "\n"
+        self.block.write(line.encode("utf-8"))
+        self.block_ids.append(product_id)
+        # a payload with "id": null is still indexed under the ID it was fetched by
+        self.index_lines.append(f"{product.get('id') or product_id}\t{offset}\n")
+
+    def flush(self):
+        """ End the current block; returns the product IDs now safely on disk """
+        if self.block is None:
+            return []
+        if self.compression:
+            self.block.close()
+        self.block = None
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.index_file.writelines(self.index_lines)
+        self.index_file.flush()
+        print(f"Saved {len(self.block_ids)} products to {self.path}")
+
+        durable, self.block_ids, self.index_lines = self.block_ids, [], []
+        self.rows_in_file += len(durable)
+        if self.rows_in_file >= self.rotate_rows:
+            self._close_file()
+        return durable
+
+    def _close_file(self):
+        if self.file is not None:
+            self.file.close()
+            self.index_file.close()
+            self.file = self.index_file = None
+
+    def close(self):
+        durable = self.flush()
+        self._close_file()
+        return durable
+
+
+PARQUET_SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("name", pa.string()),
+    ("url_key", pa.string()),
+    ("price", pa.int64()),
+    ("description", pa.string()),
+    # image dicts differ between products, so they are kept as a JSON string
+    ("images", pa.string()),
+]) if pa is not None else None
+
+
+class ParquetSink:
+    """ Columnar output: one row group per block, one file per ``rotate_rows`` rows
+
+    A Parquet file is only readable once its footer is written, so the file
+    is written under a ``.tmp`` name and renamed when closed. The IDs in it
+    are reported as durable at that point, not at every row group.
+    """
+
+    def __init__(self, success_dir, prefix="", compression="zstd", rotate_rows=ROTATE_ROWS):
+        if pq is None:
+            raise ValueError("Parquet output needs the pyarrow package")
+        self.success_dir = success_dir
+        self.prefix = prefix
+        self.compression = compression or "none"
+        self.rotate_rows = rotate_rows
+        self.path = None
+        self.writer = None
+        self.rows = []
+        self.block_ids = []
+        self.file_ids = []
+
+    def __getstate__(self):
+        if self.writer is not None:
+            raise TypeError("Cannot pickle a sink with an open file")
+        return self.__dict__.copy()
+
+    def write(self, product_id, product):
+        self.rows.append({**product, "images": json.dumps(product.get("images", []), ensure_ascii=False)})
+        self.block_ids.append(product_id)
+
+    def flush(self):
+        """ Write the block as a row group; returns the IDs of a file that was just completed """
+        if not self.rows:
+            return []
+        if self.writer is None:
+            index = next_file_index(self.success_dir, self.prefix)
+            self.path = os.path.join(self.success_dir, f"products_{self.prefix}{index}.parquet")
+            self.writer = pq.ParquetWriter(self.path + ".tmp", PARQUET_SCHEMA, compression=self.compression)
+        table = pa.Table.from_pylist(self.rows, schema=PARQUET_SCHEMA)
+        self.writer.write_table(table, row_group_size=len(self.rows))
+        self.file_ids.extend(self.block_ids)
+        self.rows, self.block_ids = [], []
+
+        if len(self.file_ids) >= self.rotate_rows:
+            return self._close_file()
+        return []
+
+    def _close_file(self):
+        if self.writer is None:
+            return []
+        self.writer.close()
+        with open(self.path + ".tmp", "rb") as f:
+            os.fsync(f.fileno())
+        os.replace(self.path + ".tmp", self.path)
+        print(f"Saved {len(self.file_ids)} products to {self.path}")
+        durable, self.file_ids, self.writer = self.file_ids, [], None
+        return durable
+
+    def close(self):
+        return self.flush() + self._close_file()
+
+
+FORMATS = ("json", "ndjson", "parquet")
+
+
+def make_sink(output_format, success_dir, prefix="", compression=None):
+    if output_format == "json":
+        return JsonBatchSink(success_dir, prefix)
+    if output_format == "ndjson":
+        return NdjsonSink(success_dir, prefix, compression)
+    if output_format == "parquet":
+        return ParquetSink(success_dir, prefix, compression or "zstd")
+    raise ValueError(f"Unknown output format {output_format!r}, expected one of {FORMATS}")
@@ -0,0 +1,150 @@
+import os
+import time
+import hashlib
+import sqlite3
+from collections import namedtuple
+
+# what we know about the last version of a product we fetched
+Validators = namedtuple("Validators", ["content_hash", "etag", "last_modified"])
+
+# connections opened by a parent process before it forked; see SnapshotStore.conn
+_inherited = []
+
+
+def content_hash(body):
+    """ Hash of the raw response bytes, before any parsing or cleaning """
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def conditional_headers(snapshot):
+    """ If-None-Match / If-Modified-Since for a product fetched before, so the API can answer 304 """
+    headers = {}
+    if snapshot is not None:
+        if snapshot.etag:
+            headers["If-None-Match"] = snapshot.etag
+        if snapshot.last_modified:
+            headers["If-Modified-Since"] = snapshot.last_modified
+    return headers
+
+
+class SnapshotStore:
+    """ Content hash, ETag and Last-Modified of every product fetched, kept in a SQLite file
+
+    A re-crawl sends conditional requests from these and treats a 304, or a
+    200 whose body hashes the same as before, as "unchanged": the product is
+    not cleaned or written again, so the product files of the run hold only
+    new and changed products. Validators of a written product wait in
+    ``pending_snapshots`` until the sink reports it durable and only then
+    move to ``snapshots``, like the progress journal; keeping them in the
+    file rather than in memory bounds a worker whose sink holds many rows
+    (a Parquet file) before it is durable. The connection is opened lazily
+    so worker processes each open their own.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+        self._pid = None
+
+    def __getstate__(self):
+        return {"path": self.path, "_conn": None, "_pid": None}
+
+    @property
+    def conn(self):
+        if self._conn is not None and self._pid != os.getpid():
+            # opened before a fork: SQLite connections must not cross processes,
+            # and closing the copy here could disturb the parent's, so just keep it
+            _inherited.append(self._conn)
+            self._conn = None
+        if self._conn is None:
+            self._pid = os.getpid()
+            self._conn = sqlite3.connect(self.path, timeout=60)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS snapshots (
+                    id INTEGER PRIMARY KEY,
+                    content_hash TEXT NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    checked_at REAL NOT NULL,
+                    changed_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS snapshots_changed_at ON snapshots(changed_at)")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS pending_snapshots (
+                    id INTEGER PRIMARY KEY,
+                    content_hash TEXT NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT
+                )
+            """)
+            self._conn.commit()
+        return self._conn
+
+    def get(self, product_id):
+        row = self.conn.execute("SELECT content_hash, etag, last_modified FROM snapshots WHERE id = ?",
+                                (int(product_id),)).fetchone()
+        return Validators(*row) if row else None
+
+    def record_changed(self, rows):
+        """ Store (product_id, Validators) of new or changed products in one transaction """
+        now = time.time()
+        with self.conn:
+            self.conn.executemany("""
+                INSERT INTO snapshots(id, content_hash, etag, last_modified, checked_at, changed_at)
+                VALUES(?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET content_hash = excluded.content_hash, etag = excluded.etag,
+                    last_modified = excluded.last_modified, checked_at = excluded.checked_at,
+                    changed_at = excluded.changed_at
+            """, [(int(pid), v.content_hash, v.etag, v.last_modified, now, now) for pid, v in rows])
+
+    def record_pending(self, rows):
+        """ Park (product_id, Validators) of products written but not yet durable """
+        with self.conn:
+            self.conn.executemany("""
+                INSERT OR REPLACE INTO pending_snapshots(id, content_hash, etag, last_modified)
+                VALUES(?, ?, ?, ?)
+            """, [(int(pid), v.content_hash, v.etag, v.last_modified) for pid, v in rows])
+
+    def promote(self, product_ids):
+        """ Move the pending validators of now durable products into ``snapshots``, in one transaction """
+        now = time.time()
+        ids = [(int(pid),) for pid in product_ids]
+        with self.conn:
+            self.conn.executemany("""
+                INSERT INTO snapshots(id, content_hash, etag, last_modified, checked_at, changed_at)
+                SELECT id, content_hash, etag, last_modified, ?, ?
+                FROM pending_snapshots WHERE id = ?
+                ON CONFLICT(id) DO UPDATE SET content_hash = excluded.content_hash, etag = excluded.etag,
+                    last_modified = excluded.last_modified, checked_at = excluded.checked_at,
+                    changed_at = excluded.changed_at
+            """, [(now, now, pid) for (pid,) in ids])
+            self.conn.executemany("DELETE FROM pending_snapshots WHERE id = ?", ids)
+
+    def record_unchanged(self, rows):
+        """ Mark (product_id, Validators or None) as checked; new validators replace the old ones """
+        now = time.time()
+        with self.conn:
+            self.conn.executemany("""
+                UPDATE snapshots SET checked_at = ?, etag = COALESCE(?, etag),
+                    last_modified = COALESCE(?, last_modified)
+                WHERE id = ?
+            """, [(now, v.etag if v else None, v.last_modified if v else None, int(pid)) for pid, v in rows])
+
+    def changed_since(self, timestamp):
+        """ IDs of products that were new or changed at or after ``timestamp`` """
+        for (pid,) in self.conn.execute("SELECT id FROM snapshots WHERE changed_at >= ? ORDER BY id",
+                                        (timestamp,)):
+            yield pid
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM snapshots").fetchone()[0]
+
+    def close(self):
+        if self._conn is not None:
+            if self._pid == os.getpid():
+                self._conn.close()
+            else:
+                _inherited.append(self._conn)
+            self._conn = None
@@ -0,0 +1,8 @@
+from multiprocessing import cpu_count
+
+from crawler import fetch_products, read_product_ids
+
+if __name__ == "__main__":
+    product_ids = read_product_ids('products-0-200000(in).csv')
+    fetch_products(product_ids, backend="hybrid", journal="progress_hybrid.sqlite",
+                   processes=cpu_count(), concurrency=20)
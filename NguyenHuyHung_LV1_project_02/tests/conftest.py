@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the crawler package lives next to this folder and is not installed
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
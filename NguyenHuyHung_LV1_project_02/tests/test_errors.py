@@ -0,0 +1,42 @@
+import os
+
+from crawler.errors import ErrorLog, iter_failures, merge_shards, retry_ids
+
+
+def write_shard(error_dir, shard, rows):
+    log = ErrorLog(str(error_dir), f"{shard}_")
+    for product_id, error_type in rows:
+        log.record(product_id, error_type, attempts=1, latency=0.05)
+    log.flush()
+
+
+def test_error_log_writes_id_lists_and_csv(tmp_path):
+    write_shard(tmp_path, "w0", [(1, "status_404"), (2, "timeout"), (3, "status_404")])
+    assert (tmp_path / "w0_status_404.txt").read_text().split() == ["1", "3"]
+    rows = list(iter_failures(str(tmp_path)))
+    assert [(row["id"], row["error_type"], row["status"]) for row in rows] == [
+        ("1", "status_404", "404"), ("2", "timeout", ""), ("3", "status_404", "404")]
+
+
+def test_merge_shards_folds_files_into_one(tmp_path):
+    write_shard(tmp_path, "c0", [(1, "status_404")])
+    write_shard(tmp_path, "c1", [(2, "status_404"), (3, "status_429")])
+    merge_shards(str(tmp_path), "", ["c0", "c1"])
+
+    assert sorted(os.listdir(tmp_path)) == ["failures.csv", "status_404.txt", "status_429.txt"]
+    assert (tmp_path / "status_404.txt").read_text().split() == ["1", "2"]
+    # one header, whatever the number of shards
+    assert (tmp_path / "failures.csv").read_text().count("error_type") == 1
+    assert sorted(retry_ids(str(tmp_path), exclude=["status_404"])) == [3]
+
+
+def test_merge_shards_never_merges_a_leftover_twice(tmp_path):
+    write_shard(tmp_path, "c0", [(1, "status_404")])
+    merge_shards(str(tmp_path), "", ["c0"])
+    # a crash between appending and deleting leaves the renamed shard behind
+    (tmp_path / "c0_status_404.txt.merging").write_text("1\n")
+
+    write_shard(tmp_path, "c0", [(2, "status_404")])
+    merge_shards(str(tmp_path), "", ["c0"])
+    assert (tmp_path / "status_404.txt").read_text().split() == ["1", "2"]
+    assert [row["id"] for row in iter_failures(str(tmp_path))] == ["1", "2"]
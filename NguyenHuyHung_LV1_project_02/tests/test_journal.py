@@ -0,0 +1,62 @@
+import sys
+import multiprocessing
+
+import pytest
+
+from crawler.journal import ProgressJournal
+from crawler.process_pool import CHUNK_SIZE, pick_chunk_size
+
+
+def test_pending_skips_finished_ids(tmp_path):
+    journal = ProgressJournal(str(tmp_path / "journal.db"))
+    journal.mark([(1, "success"), (2, "status_404"), (3, "unchanged")])
+    assert list(journal.pending(range(1, 5))) == [4]
+    assert list(journal.pending(range(1, 5), retry_failed=True)) == [2, 4]
+    journal.close()
+
+
+# set before the fork, so the worker inherits the object (open connection included)
+# instead of unpickling a fresh one
+_journal = None
+
+
+def _mark_in_child():
+    journal = _journal
+    journal.mark([(7, "success")])
+    return list(journal.pending([7, 8]))
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_forked_worker_opens_its_own_connection(tmp_path, monkeypatch):
+    journal = ProgressJournal(str(tmp_path / "journal.db"))
+    list(journal.pending([1]))  # the parent's connection is open before the fork
+    monkeypatch.setattr(sys.modules[__name__], "_journal", journal)
+    with multiprocessing.get_context("fork").Pool(1) as pool:
+        assert pool.apply(_mark_in_child) == [8]
+    assert list(journal.pending([7, 8])) == [8]
+    journal.close()
+
+
+def test_small_input_is_split_over_every_process():
+    chunk_size, ids = pick_chunk_size(iter(range(10)), processes=4)
+    assert chunk_size == 3
+    assert list(ids) == list(range(10))
+
+
+def test_long_input_uses_the_default_chunk_size():
+    chunk_size, ids = pick_chunk_size(iter(range(CHUNK_SIZE * 2 + 5)), processes=2)
+    assert chunk_size == CHUNK_SIZE
+    assert sum(1 for _ in ids) == CHUNK_SIZE * 2 + 5
+
+
+def test_explicit_chunk_size_reads_nothing_ahead():
+    consumed = []
+
+    def ids():
+        for pid in range(5):
+            consumed.append(pid)
+            yield pid
+
+    chunk_size, stream = pick_chunk_size(ids(), processes=2, chunk_size=7)
+    assert chunk_size == 7 and consumed == []
+    assert list(stream) == list(range(5))
@@ -0,0 +1,78 @@
+import time
+
+import pytest
+
+from crawler.negative_cache import NegativeCache, read_id_list
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "dead.bin")
+    cache = NegativeCache(path)
+    cache.add([30, 10, 20])
+    cache.save()
+
+    loaded = NegativeCache(path)
+    assert list(loaded.ids) == [10, 20, 30]
+    assert all(loaded.is_dead(pid) for pid in (10, 20, 30))
+    assert not loaded.is_dead(15)
+    assert not loaded.is_dead(31)
+
+
+def test_entries_expire_after_ttl(tmp_path):
+    path = str(tmp_path / "dead.bin")
+    cache = NegativeCache(path, ttl=60)
+    now = time.time()
+    cache.add([1], now=now - 120)
+    cache.add([2], now=now)
+    assert not cache.is_dead(2)  # not saved yet
+    cache.save()
+    assert not cache.is_dead(1) and cache.is_dead(2)
+    assert not cache.is_dead(2, now=now + 61)
+
+    # expired IDs are dropped from the file on the next save
+    cache = NegativeCache(path, ttl=60)
+    cache.save()
+    assert list(cache.ids) == [2]
+
+
+def test_later_add_refreshes_an_id(tmp_path):
+    path = str(tmp_path / "dead.bin")
+    cache = NegativeCache(path, ttl=60)
+    cache.add([5], now=time.time() - 50)
+    cache.add([5])
+    cache.save()
+    assert len(cache) == 1
+    assert cache.is_dead(5, now=time.time() + 30)
+
+
+def test_filter_skips_dead_ids_lazily(tmp_path):
+    path = str(tmp_path / "dead.bin")
+    cache = NegativeCache(path)
+    cache.add([2, 4])
+    cache.save()
+
+    consumed = []
+
+    def ids():
+        for pid in range(1, 6):
+            consumed.append(pid)
+            yield pid
+
+    live = cache.filter(ids())
+    assert next(live) == 1
+    assert consumed == [1]
+    assert list(live) == [3, 5]
+    assert cache.skipped == 2
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"NOTACACHE" + bytes(16))
+    with pytest.raises(ValueError):
+        NegativeCache(str(path))
+
+
+def test_read_id_list(tmp_path):
+    path = tmp_path / "status_404.txt"
+    path.write_text("1\n\n22\n333\n", encoding="utf-8")
+    assert list(read_id_list(str(path))) == [1, 22, 333]
@@ -0,0 +1,106 @@
+import asyncio
+
+from crawler.ratelimit import AdaptiveLimiter
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_limits_in_flight_and_wakes_waiters():
+    async def scenario():
+        limiter = AdaptiveLimiter(concurrency=2, min_concurrency=1, rate=1000)
+        await limiter.acquire()
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0.01)
+        assert not waiter.done() and limiter.in_flight == 2
+
+        limiter.release(0.01, "ok")
+        await asyncio.wait_for(waiter, 1)
+        assert limiter.in_flight == 2
+
+    run(scenario())
+
+
+def test_throttled_response_halves_limit_and_rate():
+    limiter = AdaptiveLimiter(concurrency=20, rate=100, target_latency=1.0)
+    limiter.in_flight = 1
+    limiter.release(0.1, "throttled")
+    assert limiter.limit == 10 and limiter.rate == 50
+
+    # a second failure within target_latency is part of the same burst
+    limiter.in_flight = 1
+    limiter.release(0.1, "throttled")
+    assert limiter.limit == 10
+
+
+def test_healthy_responses_grow_limit():
+    limiter = AdaptiveLimiter(concurrency=4, rate=10, target_latency=1.0)
+    for _ in range(8):
+        limiter.in_flight = 1
+        limiter.release(0.1, "ok")
+    assert limiter.limit > 4 and limiter.rate > 10
+
+
+def test_retry_after_pauses_the_bucket():
+    async def scenario():
+        limiter = AdaptiveLimiter(rate=1000)
+        limiter.in_flight = 1
+        limiter.release(0.01, "throttled", retry_after=0.1)
+        started = asyncio.get_running_loop().time()
+        await limiter.acquire()
+        return asyncio.get_running_loop().time() - started
+
+    assert run(scenario()) >= 0.09
+
+
+def test_cancelled_token_wait_gives_the_slot_back():
+    async def scenario():
+        limiter = AdaptiveLimiter(concurrency=2, min_concurrency=1, rate=1.0)
+        limiter.tokens = 0
+        task = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0.01)
+        assert limiter.in_flight == 1
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        assert limiter.in_flight == 0
+
+    run(scenario())
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        limiter = AdaptiveLimiter(concurrency=1, min_concurrency=1, rate=1000)
+        await limiter.acquire()
+        first = asyncio.create_task(limiter.acquire())
+        second = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0.01)
+        assert len(limiter.waiters) == 2
+
+        first.cancel()
+        await asyncio.gather(first, return_exceptions=True)
+        assert len(limiter.waiters) == 1
+
+        limiter.release(0.01, "ok")
+        await asyncio.wait_for(second, 1)
+        assert limiter.in_flight == 1
+
+    run(scenario())
+
+
+def test_wake_up_is_passed_on_when_the_woken_waiter_is_cancelled():
+    async def scenario():
+        limiter = AdaptiveLimiter(concurrency=1, min_concurrency=1, rate=1000)
+        await limiter.acquire()
+        first = asyncio.create_task(limiter.acquire())
+        second = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0.01)
+
+        limiter.release(0.01, "ok")  # wakes first ...
+        first.cancel()  # ... which is cancelled before it runs
+        await asyncio.gather(first, return_exceptions=True)
+        await asyncio.wait_for(second, 1)
+        assert limiter.in_flight == 1
+
+    run(scenario())
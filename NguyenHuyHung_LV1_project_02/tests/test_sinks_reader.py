@@ -0,0 +1,76 @@
+import pytest
+
+from crawler import sinks
+from crawler.reader import ProductIndex, iter_products, product_files, read_file
+
+PRODUCTS = [
+    {"id": pid, "name": f"product {pid}", "url_key": f"p-{pid}", "price": pid * 1000,
+     "description": "tab\tnewline\n unicode đ", "images": [{"base_url": f"http://img/{pid}"}]}
+    for pid in range(1, 8)
+]
+
+FORMATS = [
+    ("json", None),
+    ("ndjson", None),
+    ("ndjson", "gzip"),
+    pytest.param("ndjson", "zstd", marks=pytest.mark.skipif(sinks.zstandard is None, reason="needs zstandard")),
+    pytest.param("parquet", None, marks=pytest.mark.skipif(sinks.pq is None, reason="needs pyarrow")),
+]
+
+
+def write_all(sink, products, block=3):
+    durable = []
+    for i, product in enumerate(products, 1):
+        sink.write(product["id"], product)
+        if i % block == 0:
+            durable += sink.flush()
+    return durable + sink.close()
+
+
+@pytest.mark.parametrize("output_format, compression", FORMATS)
+def test_round_trip(tmp_path, output_format, compression):
+    sink = sinks.make_sink(output_format, str(tmp_path), compression=compression)
+    durable = write_all(sink, PRODUCTS)
+    assert sorted(durable) == [product["id"] for product in PRODUCTS]
+
+    products = sorted(iter_products(str(tmp_path)), key=lambda product: product["id"])
+    assert products == PRODUCTS
+
+
+@pytest.mark.parametrize("output_format, compression", FORMATS)
+def test_product_index(tmp_path, output_format, compression):
+    write_all(sinks.make_sink(output_format, str(tmp_path), compression=compression), PRODUCTS)
+    index = ProductIndex(str(tmp_path))
+    assert index.get(5)["name"] == "product 5"
+    assert index.get(999) is None
+
+
+@pytest.mark.parametrize("compression", [None, "gzip"])
+def test_ndjson_index_with_null_id(tmp_path, compression):
+    sink = sinks.make_sink("ndjson", str(tmp_path), compression=compression)
+    sink.write(41, {"id": None, "name": "no id"})
+    sink.write(42, {"id": 42, "name": "has id"})
+    sink.close()
+
+    (path,) = product_files(str(tmp_path))
+    with open(path + ".idx", encoding="utf-8") as f:
+        assert [line.split("\t")[0] for line in f] == ["41", "42"]
+    assert ProductIndex(str(tmp_path)).get(42)["name"] == "has id"
+
+
+def test_index_skips_legacy_none_keys(tmp_path):
+    sink = sinks.make_sink("ndjson", str(tmp_path))
+    sink.write(1, {"id": 1})
+    sink.close()
+    (path,) = product_files(str(tmp_path))
+    with open(path + ".idx", "a", encoding="utf-8") as f:
+        f.write("None\t0\n")
+    assert len(ProductIndex(str(tmp_path))) == 1
+
+
+def test_ndjson_rotates_files(tmp_path):
+    sink = sinks.NdjsonSink(str(tmp_path), rotate_rows=3)
+    write_all(sink, PRODUCTS)
+    files = product_files(str(tmp_path))
+    assert len(files) == 3
+    assert [product["id"] for path in files for product in read_file(path)] == list(range(1, 8))
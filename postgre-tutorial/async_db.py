@@ -0,0 +1,137 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import insert
+import update
+import delete_data
+import call_function
+import transaction
+import blob_stream
+import load_products
+from db_pool import connection, get_pool
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """ Threads that run the blocking calls, one per pooled connection """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(get_pool().maxconn, thread_name_prefix="db")
+    return _executor
+
+
+async def run(func, *args, **kwargs):
+    """ Run a blocking database function without blocking the event loop """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(func, *args, **kwargs))
+
+
+def _in_transaction(work, args):
+    with connection() as conn:
+        with conn.cursor() as cur:
+            return work(cur, *args)
+
+
+async def run_transaction(work, *args):
+    """ Run ``work(cursor, *args)`` in one transaction on a pooled connection
+
+    Everything ``work`` executes commits together, or is rolled back if it
+    raises; the exception is re-raised here.
+    """
+    return await run(_in_transaction, work, args)
+
+
+async def insert_vendor(vendor_name):
+    return await run(insert.insert_vendor, vendor_name)
+
+
+async def insert_many_vendors(vendor_list):
+    return await run(insert.insert_many_vendors, vendor_list)
+
+
+async def update_vendor(vendor_id, vendor_name):
+    return await run(update.update_vendor, vendor_id, vendor_name)
+
+
+async def update_vendors(vendors):
+    return await run(update.update_vendors, vendors)
+
+
+async def delete_part(part_id):
+    return await run(delete_data.delete_part, part_id)
+
+
+async def delete_parts(part_ids):
+    return await run(delete_data.delete_parts, part_ids)
+
+
+async def get_parts(vendor_id):
+    return await run(call_function.get_parts, vendor_id)
+
+
+async def add_part(part_name, vendor_list):
+    """ transaction.add_part: the part and its vendor links commit together or not at all """
+    return await run(transaction.add_part, part_name, vendor_list)
+
+
+async def write_blob(part_id, path_to_file, file_extension, dedup=True):
+    return await run(blob_stream.write_blob, part_id, path_to_file, file_extension, dedup)
+
+
+async def read_blob(part_id, path_to_dir):
+    return await run(blob_stream.read_blob, part_id, path_to_dir)
+
+
+async def read_range(part_id, offset, length):
+    return await run(blob_stream.read_range, part_id, offset, length)
+
+
+async def persist_products(products, batch_size=load_products.BATCH_SIZE):
+    """ Upsert products from an async iterable while it is still being produced
+
+    Batches go to the database in the executor, so a crawler feeding
+    ``products`` keeps running; at most one batch is written while the next
+    one fills. Returns (inserted, updated).
+    """
+    inserted = updated = 0
+    pending = None
+    batch = []
+
+    async def drain():
+        nonlocal inserted, updated
+        batch_inserted, batch_updated = await pending
+        inserted += batch_inserted
+        updated += batch_updated
+
+    async for product in products:
+        batch.append(product)
+        if len(batch) >= batch_size:
+            if pending is not None:
+                await drain()
+            pending = asyncio.ensure_future(run(load_products.upsert_batch, batch))
+            batch = []
+    if pending is not None:
+        await drain()
+    if batch:
+        batch_inserted, batch_updated = await run(load_products.upsert_batch, batch)
+        inserted += batch_inserted
+        updated += batch_updated
+    return inserted, updated
+
+
+async def main():
+    vendor_ids = await asyncio.gather(*(insert_vendor(f"Async vendor {i}") for i in range(10)))
+    print(vendor_ids)
+    await asyncio.gather(add_part('Async part', vendor_ids[:2]),
+                         update_vendor(vendor_ids[0], "Async vendor renamed"))
+    print(await get_parts(vendor_ids[0]))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
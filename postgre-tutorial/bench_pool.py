@@ -0,0 +1,84 @@
+import sys
+import time
+import statistics
+import threading
+
+import psycopg2
+from config import load_config
+from db_pool import connection, close_pool
+
+CALLS = 500
+# a primary-key lookup, so the timings are dominated by connection overhead
+QUERY = "SELECT vendor_id, vendor_name FROM vendors WHERE vendor_id = 1"
+
+
+def query_unpooled():
+    """ The old pattern: parse the config and open a connection per call """
+    config = load_config(cached=False)
+    conn = psycopg2.connect(**config)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(QUERY)
+            cur.fetchall()
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def query_pooled():
+    """ Check a connection out of the shared pool """
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(QUERY)
+            cur.fetchall()
+
+
+def measure(func, calls, threads=1):
+    timings = []
+    lock = threading.Lock()
+
+    def loop(count):
+        local = []
+        for _ in range(count):
+            started = time.perf_counter()
+            func()
+            local.append(time.perf_counter() - started)
+        with lock:
+            timings.extend(local)
+
+    workers = [threading.Thread(target=loop, args=(calls // threads,)) for _ in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    timings.sort()
+    return {
+        "calls": len(timings),
+        "mean_ms": statistics.fmean(timings) * 1000,
+        "p50_ms": timings[len(timings) // 2] * 1000,
+        "p99_ms": timings[min(len(timings) - 1, int(len(timings) * 0.99))] * 1000,
+        "rate": len(timings) / elapsed,
+    }
+
+
+def print_row(label, stats):
+    print(f"{label:<20}{stats['calls']:>7}{stats['mean_ms']:>10.3f}{stats['p50_ms']:>10.3f}"
+          f"{stats['p99_ms']:>10.3f}{stats['rate']:>10.0f}")
+
+
+if __name__ == '__main__':
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else CALLS
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    # open the pool before timing so its first connect is not counted
+    query_pooled()
+
+    print(f"{'':<20}{'calls':>7}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}{'calls/s':>10}")
+    print_row("connect per call", measure(query_unpooled, calls))
+    print_row("pooled", measure(query_pooled, calls))
+    print_row(f"connect x{threads} thr", measure(query_unpooled, calls, threads))
+    print_row(f"pooled x{threads} thr", measure(query_pooled, calls, threads))
+    close_pool()
@@ -1,49 +1,24 @@
-import psycopg2
-from config import load_config
+import warnings
 
-def write_blob(part_id, path_to_file, file_extension):
-    """ Insert a BLOB into a table """
-    # read database configuration
-    params = load_config()
-
-    # read data from a picture
-    data = open(path_to_file, 'rb').read()
+from blob_stream import write_blob as stream_write_blob, read_blob as stream_read_blob
 
+# Drawings used to be read whole into memory and stored as BYTEA in
+# part_drawings. They are now streamed into large objects by blob_stream;
+# existing part_drawings rows move over with blob_stream.migrate_part_drawings().
 
-    try:
-        # connect to the PostgresQL database
-        with psycopg2.connect(**params) as conn:
-            # create a new cursor object
-            with  conn.cursor() as cur:
-                # execute the INSERT statement
-                cur.execute("INSERT INTO part_drawings(part_id,file_extension,drawing_data) " +
-                            "VALUES(%s,%s,%s)",
-                            (part_id, file_extension, psycopg2.Binary(data)))
 
-            conn.commit()
+def write_blob(part_id, path_to_file, file_extension):
+    """ Insert a BLOB into a table (deprecated: use blob_stream.write_blob) """
+    warnings.warn("blob_stored.write_blob is deprecated, use blob_stream.write_blob", DeprecationWarning,
+                  stacklevel=2)
+    return stream_write_blob(part_id, path_to_file, file_extension)
 
-    except (Exception, psycopg2.DatabaseError) as error:
-        print(error)
 
 def read_blob(part_id, path_to_dir):
-    """ Read BLOB data from a table """
-    # read database configuration
-    config = load_config()
-    try:
-        # connect to the PostgresQL database
-        with  psycopg2.connect(**config) as conn:
-            with conn.cursor() as cur:
-                # execute the SELECT statement
-                cur.execute(""" SELECT part_name, file_extension, drawing_data
-                                FROM part_drawings
-                                INNER JOIN parts on parts.part_id = part_drawings.part_id
-                                WHERE parts.part_id = %s """,
-                            (part_id,))
-                blob = cur.fetchone()
-                # write blob data into file
-                open(path_to_dir + blob[0] + '.' + blob[1], 'wb').write(blob[2])
-    except (Exception, psycopg2.DatabaseError) as error:
-        print(error)
+    """ Read BLOB data from a table (deprecated: use blob_stream.read_blob) """
+    warnings.warn("blob_stored.read_blob is deprecated, use blob_stream.read_blob", DeprecationWarning,
+                  stacklevel=2)
+    return stream_read_blob(part_id, path_to_dir)
 
 
 if __name__ == '__main__':
@@ -51,4 +26,4 @@ if __name__ == '__main__':
     write_blob(2, 'images/japan-background-digital-art.jpg', 'png')
 
     read_blob(1, 'images/output/')
-    read_blob(2, 'images/output/')
\ No newline at end of file
+    read_blob(2, 'images/output/')
@@ -0,0 +1,249 @@
+import os
+import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg2
+from db_pool import connection
+
+CHUNK_SIZE = 1 << 20
+
+CREATE_TABLES = (
+    """
+    CREATE TABLE IF NOT EXISTS drawing_contents (
+        sha256 CHAR(64) PRIMARY KEY,
+        loid OID NOT NULL,
+        size BIGINT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS part_drawing_files (
+        part_id INTEGER PRIMARY KEY,
+        file_extension VARCHAR(5) NOT NULL,
+        sha256 CHAR(64) NOT NULL REFERENCES drawing_contents (sha256),
+        FOREIGN KEY (part_id)
+            REFERENCES parts (part_id)
+            ON UPDATE CASCADE ON DELETE CASCADE
+    )
+    """)
+
+SAVE_DRAWING = """
+    INSERT INTO part_drawing_files(part_id, file_extension, sha256)
+    VALUES(%s, %s, %s)
+    ON CONFLICT (part_id) DO UPDATE
+        SET file_extension = EXCLUDED.file_extension, sha256 = EXCLUDED.sha256
+"""
+
+
+def create_blob_tables():
+    """ Create the tables for drawings stored as large objects
+
+    Drawing contents are keyed by their sha256, so parts sharing the same
+    file share one large object.
+    """
+    try:
+        with connection() as conn:
+            with conn.cursor() as cur:
+                for command in CREATE_TABLES:
+                    cur.execute(command)
+    except (psycopg2.DatabaseError, Exception) as error:
+        print(error)
+
+
+def file_sha256(path, chunk_size=CHUNK_SIZE):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _upload(conn, cur, path, chunk_size):
+    """ Copy a file into a new large object and register it; returns the sha256 """
+    digest = hashlib.sha256()
+    size = 0
+    lobj = conn.lobject(0, 'wb')
+    try:
+        with open(path, 'rb') as f:
+            while chunk := f.read(chunk_size):
+                lobj.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+    finally:
+        lobj.close()
+    sha256 = digest.hexdigest()
+
+    cur.execute("INSERT INTO drawing_contents(sha256, loid, size) VALUES(%s, %s, %s) "
+                "ON CONFLICT (sha256) DO NOTHING RETURNING sha256", (sha256, lobj.oid, size))
+    if cur.fetchone() is None:
+        # someone stored the same content meanwhile; drop our copy
+        conn.lobject(lobj.oid).unlink()
+    return sha256
+
+
+def write_blob(part_id, path_to_file, file_extension, dedup=True, chunk_size=CHUNK_SIZE):
+    """ Stream a drawing into a large object, ``chunk_size`` bytes at a time
+
+    With ``dedup`` the file is hashed first and not uploaded at all when the
+    same content is already stored. Returns the content sha256, or None on error.
+    """
+    try:
+        with connection() as conn:
+            with conn.cursor() as cur:
+                sha256 = None
+                if dedup:
+                    sha256 = file_sha256(path_to_file, chunk_size)
+                    cur.execute("SELECT 1 FROM drawing_contents WHERE sha256 = %s", (sha256,))
+                    if cur.fetchone() is None:
+                        sha256 = None
+                if sha256 is None:
+                    sha256 = _upload(conn, cur, path_to_file, chunk_size)
+                cur.execute(SAVE_DRAWING, (part_id, file_extension, sha256))
+        return sha256
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(error)
+        return None
+
+
+def _drawing(cur, part_id):
+    cur.execute(""" SELECT part_name, file_extension, loid, size
+                    FROM part_drawing_files
+                    INNER JOIN drawing_contents USING (sha256)
+                    INNER JOIN parts ON parts.part_id = part_drawing_files.part_id
+                    WHERE part_drawing_files.part_id = %s """,
+                (part_id,))
+    row = cur.fetchone()
+    if row is None:
+        raise LookupError(f"No drawing stored for part {part_id}")
+    return row
+
+
+def _chunks(conn, loid, offset, length, chunk_size):
+    lobj = conn.lobject(loid, 'rb')
+    try:
+        lobj.seek(offset)
+        remaining = length
+        while remaining is None or remaining > 0:
+            chunk = lobj.read(chunk_size if remaining is None else min(chunk_size, remaining))
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+    finally:
+        lobj.close()
+
+
+def iter_blob(part_id, offset=0, length=None, chunk_size=CHUNK_SIZE):
+    """ Yield a part's drawing in chunks, optionally only bytes [offset, offset + length) """
+    with connection() as conn:
+        with conn.cursor() as cur:
+            loid = _drawing(cur, part_id)[2]
+        yield from _chunks(conn, loid, offset, length, chunk_size)
+
+
+def read_range(part_id, offset, length):
+    """ Read ``length`` bytes of a part's drawing starting at ``offset`` """
+    return b"".join(iter_blob(part_id, offset, length))
+
+
+def read_blob(part_id, path_to_dir, chunk_size=CHUNK_SIZE):
+    """ Stream a part's drawing into <path_to_dir><part_name>.<extension>
+
+    Returns the written path, or None on error.
+    """
+    try:
+        with connection() as conn:
+            with conn.cursor() as cur:
+                part_name, file_extension, loid, size = _drawing(cur, part_id)
+            path = os.path.join(path_to_dir, f"{part_name}.{file_extension}")
+            tmp_path = path + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                for chunk in _chunks(conn, loid, 0, None, chunk_size):
+                    f.write(chunk)
+            os.replace(tmp_path, path)
+        return path
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(error)
+        return None
+
+
+def write_blobs(drawings, workers=4):
+    """ Upload many (part_id, path_to_file, file_extension) drawings in parallel
+
+    Each worker thread streams over its own pooled connection; workers beyond
+    the pool size wait for one. Returns the sha256 (or None) per drawing.
+    """
+    with ThreadPoolExecutor(workers) as executor:
+        return list(executor.map(lambda drawing: write_blob(*drawing), drawings))
+
+
+def read_blobs(part_ids, path_to_dir, workers=4):
+    """ Download many drawings in parallel; returns the written path (or None) per part """
+    with ThreadPoolExecutor(workers) as executor:
+        return list(executor.map(lambda part_id: read_blob(part_id, path_to_dir), part_ids))
+
+
+def migrate_part_drawings(delete=False):
+    """ Move drawings stored by the old blob_stored script (BYTEA in part_drawings) to large objects
+
+    The copy happens on the server (lo_from_bytea), so no drawing passes
+    through the client. Contents are deduplicated like uploads, and a part
+    that already has a streamed drawing keeps it. With ``delete`` the
+    migrated part_drawings rows are removed. Returns how many parts were
+    migrated, or None on error.
+    """
+    try:
+        with connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(""" INSERT INTO drawing_contents(sha256, loid, size)
+                                SELECT sha256, lo_from_bytea(0, drawing_data), length(drawing_data)
+                                FROM (SELECT DISTINCT ON (sha256) sha256, drawing_data
+                                      FROM (SELECT encode(sha256(drawing_data), 'hex') AS sha256, drawing_data
+                                            FROM part_drawings) AS hashed
+                                      WHERE NOT EXISTS (SELECT 1 FROM drawing_contents
+                                                        WHERE drawing_contents.sha256 = hashed.sha256)
+                                      ORDER BY sha256) AS new_contents """)
+                cur.execute(""" INSERT INTO part_drawing_files(part_id, file_extension, sha256)
+                                SELECT part_id, file_extension, encode(sha256(drawing_data), 'hex')
+                                FROM part_drawings
+                                ON CONFLICT (part_id) DO NOTHING """)
+                migrated = cur.rowcount
+                if delete:
+                    cur.execute(""" DELETE FROM part_drawings
+                                    WHERE EXISTS (SELECT 1 FROM part_drawing_files
+                                                  WHERE part_drawing_files.part_id = part_drawings.part_id) """)
+                return migrated
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(error)
+        return None
+
+
+def delete_unused_contents():
+    """ Remove stored contents no drawing refers to any more; returns how many """
+    try:
+        with connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(""" DELETE FROM drawing_contents
+                                WHERE NOT EXISTS (SELECT 1 FROM part_drawing_files
+                                                  WHERE part_drawing_files.sha256 = drawing_contents.sha256)
+                                RETURNING loid """)
+                for (loid,) in cur.fetchall():
+                    conn.lobject(loid).unlink()
+                return cur.rowcount
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(error)
+        return 0
+
+
+if __name__ == '__main__':
+    create_blob_tables()
+
+    started = time.perf_counter()
+    write_blobs([(1, 'images/cartoon-style-summer-scene-with-cute-animal.jpg', 'jpg'),
+                 (2, 'images/japan-background-digital-art.jpg', 'jpg')])
+    print(f"Uploaded in {time.perf_counter() - started:.3f}s")
+
+    os.makedirs('images/output', exist_ok=True)
+    print(read_blobs([1, 2], 'images/output/'))
+    print(read_range(1, 0, 16))
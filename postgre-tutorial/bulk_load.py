@@ -0,0 +1,157 @@
+import io
+import time
+from itertools import islice
+
+import psycopg2
+from psycopg2.extras import execute_values
+from db_pool import connection
+
+BATCH_SIZE = 10000
+PAGE_SIZE = 1000
+
+
+def batched(rows, size=BATCH_SIZE):
+    """ Split any iterable into lists of at most ``size`` rows """
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def reserve_ids(cur, table, column, count):
+    """ Take ``count`` values from the SERIAL sequence behind table.column
+
+    The IDs are assigned before the rows are written, so COPY (which cannot
+    return anything) still lets callers know which ID each row got.
+    """
+    cur.execute("SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)",
+                (table, column, count))
+    return [row[0] for row in cur.fetchall()]
+
+
+def _copy_value(value):
+    if value is None:
+        return "\\N"
+    return (str(value).replace("\\", "\\\\").replace("\t", "\\t")
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+
+def copy_rows(cur, table, columns, rows):
+    """ Stream rows into a table with COPY FROM STDIN (text format) """
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(_copy_value(value) for value in row))
+        buffer.write("\n")
+    buffer.seek(0)
+    cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer)
+
+
+def insert_rows(cur, table, columns, rows, page_size=PAGE_SIZE):
+    """ Multi-row INSERT ... VALUES, ``page_size`` rows per statement """
+    execute_values(cur, f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s", rows,
+                   page_size=page_size)
+
+
+def write_rows(cur, table, columns, rows, method="copy"):
+    """ Write rows with COPY, falling back to execute_values batching
+
+    The fallback kicks in when ``method`` is "values" or when the server
+    refuses COPY (e.g. behind a pooler in statement mode); a savepoint keeps
+    the surrounding transaction usable after the refused COPY. ``rows`` is
+    read into a list first, so the fallback still has every row to insert.
+    """
+    rows = list(rows)
+    if method == "copy":
+        cur.execute("SAVEPOINT bulk_copy")
+        try:
+            copy_rows(cur, table, columns, rows)
+            cur.execute("RELEASE SAVEPOINT bulk_copy")
+            return
+        except psycopg2.NotSupportedError as error:
+            cur.execute("ROLLBACK TO SAVEPOINT bulk_copy")
+            print(f"COPY into {table} refused, using INSERT ... VALUES: {error}")
+    insert_rows(cur, table, columns, rows)
+
+
+def _load_named(table, id_column, name_column, names, method, batch_size):
+    ids = []
+    try:
+        for batch in batched(names, batch_size):
+            # one transaction per batch
+            with connection() as conn:
+                with conn.cursor() as cur:
+                    batch_ids = reserve_ids(cur, table, id_column, len(batch))
+                    write_rows(cur, table, (id_column, name_column), list(zip(batch_ids, batch)), method)
+            ids.extend(batch_ids)
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(error)
+    return ids
+
+
+def load_vendors(vendor_names, method="copy", batch_size=BATCH_SIZE):
+    """ Bulk insert vendors; returns their IDs in input order
+
+    Batches are committed one at a time, so after an error the returned list
+    holds the IDs of the batches that made it in.
+    """
+    return _load_named("vendors", "vendor_id", "vendor_name", vendor_names, method, batch_size)
+
+
+def load_parts(part_names, method="copy", batch_size=BATCH_SIZE):
+    """ Bulk insert parts; returns their IDs in input order """
+    return _load_named("parts", "part_id", "part_name", part_names, method, batch_size)
+
+
+def load_vendor_parts(pairs, method="copy", batch_size=BATCH_SIZE):
+    """ Bulk insert (vendor_id, part_id) pairs; returns the number of rows written """
+    written = 0
+    try:
+        for batch in batched(pairs, batch_size):
+            with connection() as conn:
+                with conn.cursor() as cur:
+                    write_rows(cur, "vendor_parts", ("vendor_id", "part_id"), batch, method)
+            written += len(batch)
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(error)
+    return written
+
+
+def load_parts_with_vendors(parts, method="copy", batch_size=BATCH_SIZE):
+    """ Bulk version of transaction.add_part
+
+    ``parts`` yields (part_name, vendor_ids). Every batch of parts is written
+    together with its vendor_parts rows in a single transaction, so a bad
+    vendor ID rolls back the whole batch. Returns the part IDs in input order.
+    """
+    ids = []
+    try:
+        for batch in batched(parts, batch_size):
+            with connection() as conn:
+                with conn.cursor() as cur:
+                    part_ids = reserve_ids(cur, "parts", "part_id", len(batch))
+                    write_rows(cur, "parts", ("part_id", "part_name"),
+                               [(part_id, name) for part_id, (name, _) in zip(part_ids, batch)], method)
+                    write_rows(cur, "vendor_parts", ("vendor_id", "part_id"),
+                               [(vendor_id, part_id)
+                                for part_id, (_, vendor_ids) in zip(part_ids, batch)
+                                for vendor_id in vendor_ids], method)
+            ids.extend(part_ids)
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(error)
+    return ids
+
+
+if __name__ == '__main__':
+    count = 100000
+
+    started = time.perf_counter()
+    vendor_ids = load_vendors(f"Vendor {i}" for i in range(count))
+    print(f"COPY: {len(vendor_ids)} vendors in {time.perf_counter() - started:.2f}s")
+
+    started = time.perf_counter()
+    part_ids = load_parts_with_vendors(
+        (f"Part {i}", (vendor_ids[i], vendor_ids[(i + 1) % count])) for i in range(count))
+    print(f"COPY: {len(part_ids)} parts with vendors in {time.perf_counter() - started:.2f}s")
+
+    started = time.perf_counter()
+    vendor_ids = load_vendors((f"Vendor {i}" for i in range(count)), method="values")
+    print(f"VALUES: {len(vendor_ids)} vendors in {time.perf_counter() - started:.2f}s")
@@ -1,15 +1,13 @@
 import psycopg2
-from config import load_config
+from db_pool import connection
 
 
 def get_parts(vendor_id):
     """ Get parts provided by a vendor specified by the vendor_id """
     parts = []
-    # read database configuration
-    params = load_config()
     try:
-        # connect to the PostgreSQL database
-        with  psycopg2.connect(**params) as conn:
+        # check a connection out of the pool
+        with  connection() as conn:
             with conn.cursor() as cur:
                 # create a cursor object for execution
                 cur = conn.cursor()
@@ -1,15 +1,13 @@
 import psycopg2
-from config import load_config
+from db_pool import connection
 
 
 def add_part(part_name, vendor_name):
     """ Add a new part """
-    # read database configuration
-    params = load_config()
 
     try:
-        # connect to the PostgreSQL database
-        with psycopg2.connect(**params) as conn:
+        # check a connection out of the pool
+        with connection() as conn:
             with conn.cursor() as cur:
                 # call a stored procedure
                 cur.execute('CALL add_new_part(%s,%s)', (part_name, vendor_name))
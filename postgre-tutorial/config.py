@@ -1,20 +1,90 @@
+import os
+import time
+import threading
 from configparser import ConfigParser
 
-def load_config(filename='database.ini', section='postgresql'):
+# seconds between checks of the file's mtime; within that window the cached
+# settings are returned without touching the filesystem
+CHECK_INTERVAL = 1.0
+INTEGER_KEYS = {'port', 'connect_timeout', 'minconn', 'maxconn', 'batch_size'}
+# overrides need their own prefix: plain POSTGRESQL_* variables (POSTGRESQL_VERSION
+# in many Docker images) would otherwise end up as psycopg2.connect() arguments
+ENV_PREFIX = 'DBCFG_'
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def _read_file(filename):
+    """ Parse the whole file once; returns {section: {key: value}} """
     parser = ConfigParser()
     parser.read(filename)
+    return {section: dict(parser.items(section)) for section in parser.sections()}
+
+
+def _file_sections(filename, cached):
+    path = os.path.abspath(filename)
+    now = time.monotonic()
+    entry = _cache.get(path)
+    if cached and entry is not None and now - entry['checked'] < CHECK_INTERVAL:
+        return entry['sections']
+
+    try:
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size)
+    except FileNotFoundError:
+        version = None
+    with _lock:
+        entry = _cache.get(path)
+        if not cached or entry is None or entry['version'] != version:
+            entry = {'version': version, 'sections': _read_file(path) if version else {}}
+            _cache[path] = entry
+        entry['checked'] = now
+    return entry['sections']
+
+
+def _env_overrides(section):
+    """ DBCFG_<SECTION>_<KEY> environment variables, e.g. DBCFG_POSTGRESQL_PASSWORD """
+    prefix = ENV_PREFIX + section.upper() + '_'
+    return {name[len(prefix):].lower(): value
+            for name, value in os.environ.items() if name.startswith(prefix)}
 
-    # get section, default to postgresql
-    config = {}
-    if parser.has_section(section):
-        params = parser.items(section)
-        for param in params:
-            config[param[0]] = param[1]
-    else:
+
+def _validate(config, section, filename):
+    for key in INTEGER_KEYS & config.keys():
+        try:
+            int(config[key])
+        except ValueError:
+            raise ValueError('{0} in section {1} of {2} must be an integer, got {3!r}'
+                             .format(key, section, filename, config[key])) from None
+
+
+def load_config(filename='database.ini', section='postgresql', required=True, cached=True):
+    """ Settings of one section of an ini file, with environment overrides
+
+    The file is parsed once and cached; it is re-read when its mtime or size
+    changes, checked at most every CHECK_INTERVAL seconds. Any
+    ``DBCFG_<SECTION>_<KEY>`` environment variable overrides (or adds) that key.
+    A missing section raises unless ``required`` is False, in which case the
+    result is just the overrides. Returns a new dict on every call.
+    """
+    sections = _file_sections(filename, cached)
+    overrides = _env_overrides(section)
+    if section not in sections and required and not overrides:
         raise Exception('Section {0} not found in the {1} file'.format(section, filename))
 
+    config = dict(sections.get(section, {}))
+    config.update(overrides)
+    _validate(config, section, filename)
     return config
 
+
+def clear_cache():
+    """ Forget every parsed file """
+    with _lock:
+        _cache.clear()
+
+
 if __name__ == '__main__':
     config = load_config()
-    print(config)
\ No newline at end of file
+    print(config)
@@ -1,5 +1,5 @@
 import psycopg2
-from config import load_config
+from db_pool import connection
 
 def create_tables():
     """ Create tables in the PostgreSQL database"""
@@ -39,8 +39,7 @@ def create_tables():
         )
         """)
     try:
-        config = load_config()
-        with psycopg2.connect(**config) as conn:
+        with connection() as conn:
             with conn.cursor() as cur:
                 # execute the CREATE TABLE statement
                 for command in commands:
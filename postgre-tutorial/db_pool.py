@@ -0,0 +1,119 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import pool
+import instrument
+from config import load_config
+
+MIN_CONNECTIONS = 1
+MAX_CONNECTIONS = 10
+# ping connections that sat idle longer than this before handing them out
+HEALTH_CHECK_INTERVAL = 30
+
+_pool = None
+_pool_pid = None
+_slots = None
+_last_used = {}
+# pools inherited over fork; kept referenced so garbage collection never
+# closes (and terminates the server session of) the parent's sockets
+_inherited = []
+_lock = threading.Lock()
+
+
+def get_pool(minconn=None, maxconn=None, threaded=True, config=None):
+    """ Return the process-wide connection pool, creating it on first use
+
+    The arguments only matter for the call that creates the pool; sizes not
+    given come from the optional [pool] section of database.ini (minconn,
+    maxconn). Its connections are instrumented if instrument.enable() was
+    called first or the [instrument] section says enabled = true. A forked
+    child gets its own pool instead of sharing the parent's sockets.
+    """
+    global _pool, _pool_pid, _slots
+    if _pool is None or _pool.closed or _pool_pid != os.getpid():
+        with _lock:
+            if _pool is None or _pool.closed or _pool_pid != os.getpid():
+                if _pool is not None and _pool_pid != os.getpid():
+                    _inherited.append(_pool)
+                settings = load_config(section='pool', required=False)
+                minconn = minconn or int(settings.get('minconn', MIN_CONNECTIONS))
+                maxconn = maxconn or int(settings.get('maxconn', MAX_CONNECTIONS))
+                params = config or load_config()
+                tracing = load_config(section='instrument', required=False)
+                if tracing.get('enabled', '').lower() in ('1', 'true', 'on', 'yes'):
+                    slow_ms = tracing.get('slow_ms')
+                    instrument.enable(float(slow_ms) if slow_ms else None,
+                                      float(tracing.get('sample_rate', 1.0)),
+                                      analyze=tracing.get('analyze', '').lower() in ('1', 'true', 'on', 'yes'))
+                if instrument.enabled:
+                    params = dict(params, connection_factory=instrument.InstrumentedConnection)
+                pool_class = pool.ThreadedConnectionPool if threaded else pool.SimpleConnectionPool
+                _pool = pool_class(minconn, maxconn, **params)
+                _pool_pid = os.getpid()
+                # psycopg2 raises PoolError when exhausted; callers wait for a slot instead
+                _slots = threading.BoundedSemaphore(maxconn)
+                _last_used.clear()
+    return _pool
+
+
+def _is_healthy(conn):
+    if conn.closed:
+        return False
+    if time.monotonic() - _last_used.get(id(conn), 0) < HEALTH_CHECK_INTERVAL:
+        return True
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+        conn.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+
+def _checkout(db_pool):
+    while True:
+        conn = db_pool.getconn()
+        if _is_healthy(conn):
+            return conn
+        db_pool.putconn(conn, close=True)
+
+
+@contextmanager
+def connection():
+    """ Check a connection out of the pool
+
+    Commits when the block finishes, rolls back if it raises, and always
+    returns the connection to the pool. Blocks while all connections are
+    checked out.
+    """
+    db_pool = get_pool()
+    slots = _slots
+    started = time.perf_counter()
+    with slots:
+        conn = _checkout(db_pool)
+        if instrument.enabled:
+            instrument.record_pool_wait(time.perf_counter() - started)
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            _last_used[id(conn)] = time.monotonic()
+            db_pool.putconn(conn, close=bool(conn.closed))
+
+
+def close_pool():
+    """ Close every pooled connection """
+    global _pool
+    with _lock:
+        if _pool is not None and _pool_pid != os.getpid():
+            _inherited.append(_pool)
+        elif _pool is not None and not _pool.closed:
+            _pool.closeall()
+        _pool = None
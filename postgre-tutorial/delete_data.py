@@ -1,19 +1,18 @@
 import psycopg2
-from config import load_config
+from db_pool import connection
+from prepared import execute, execute_many
 
 
 def delete_part(part_id):
     """ Delete part by part id """
 
     rows_deleted  = 0
-    sql = 'DELETE FROM parts WHERE part_id = %s'
-    config = load_config()
 
     try:
-        with  psycopg2.connect(**config) as conn:
+        with  connection() as conn:
             with  conn.cursor() as cur:
-                # execute the UPDATE statement
-                cur.execute(sql, (part_id,))
+                # execute the prepared DELETE statement
+                execute(cur, 'delete_part', (part_id,))
                 rows_deleted = cur.rowcount
 
             # commit the changes to the database
@@ -23,6 +22,21 @@ def delete_part(part_id):
     finally:
         return rows_deleted
 
+def delete_parts(part_ids):
+    """ Delete many parts by part id in one transaction """
+
+    parts_processed = 0
+
+    try:
+        with  connection() as conn:
+            with  conn.cursor() as cur:
+                # the prepared DELETE, many parameter sets per round-trip
+                parts_processed = execute_many(cur, 'delete_part', [(part_id,) for part_id in part_ids])
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(error)
+    finally:
+        return parts_processed
+
 if __name__ == '__main__':
     deleted_rows = delete_part(1)
     print('The number of deleted rows: ', deleted_rows)
\ No newline at end of file
@@ -1,21 +1,18 @@
 import psycopg2
-from config import load_config
+from db_pool import connection
+from prepared import execute, execute_many
 
 
 def insert_vendor(vendor_name):
     """ Insert a new vendor into the vendors table """
 
-    sql = """INSERT INTO vendors(vendor_name)
-             VALUES(%s) RETURNING vendor_id;"""
-
     vendor_id = None
-    config = load_config()
 
     try:
-        with  psycopg2.connect(**config) as conn:
+        with  connection() as conn:
             with  conn.cursor() as cur:
-                # execute the INSERT statement
-                cur.execute(sql, (vendor_name,))
+                # execute the prepared INSERT statement
+                execute(cur, 'insert_vendor', (vendor_name,))
 
                 # get the generated id back
                 rows = cur.fetchone()
@@ -32,13 +29,11 @@ def insert_vendor(vendor_name):
 def insert_many_vendors(vendor_list):
     """ Insert multiple vendors into the vendors table  """
 
-    sql = "INSERT INTO vendors(vendor_name) VALUES(%s) RETURNING *"
-    config = load_config()
     try:
-        with  psycopg2.connect(**config) as conn:
+        with  connection() as conn:
             with  conn.cursor() as cur:
-                # execute the INSERT statement
-                cur.executemany(sql, vendor_list)
+                # execute the prepared INSERT, many rows per round-trip
+                execute_many(cur, 'insert_vendor', vendor_list)
 
             # commit the changes to the database
             conn.commit()
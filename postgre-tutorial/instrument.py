@@ -0,0 +1,408 @@
+import os
+import re
+import time
+import random
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import psycopg2
+import psycopg2.extensions
+
+# upper bounds in seconds, as Prometheus histogram "le" buckets
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_KEY_LENGTH = 120
+EXPLAIN_SAMPLES = 50
+# statements EXPLAIN can plan
+_EXPLAINABLE = re.compile(r"^\s*(SELECT|WITH|VALUES|TABLE|INSERT|UPDATE|DELETE|EXECUTE)\b", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+_LITERAL = re.compile(r"'(?:[^']|'')*'|(?<![\w$])-?\d+(?:\.\d+)?")
+
+enabled = False
+slow_threshold = None
+explain_sample_rate = 1.0
+explain_cooldown = 60.0
+explain_analyze = False
+
+_lock = threading.Lock()
+_statements = {}
+_pool_wait = None
+_last_explained = {}
+slow_queries = deque(maxlen=EXPLAIN_SAMPLES)
+
+
+class Histogram:
+    """ Cumulative-bucket latency histogram in the Prometheus layout """
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def record(self, seconds):
+        index = 0
+        while index < len(BUCKETS) and seconds > BUCKETS[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(BUCKETS + (float('inf'),), self.counts):
+            total += count
+            yield bound, total
+
+
+def _new_stats():
+    return {'latency': Histogram(), 'rows': 0, 'bytes_sent': 0, 'bytes_received': 0, 'errors': 0,
+            'fetch_seconds': 0.0}
+
+
+def enable(slow_ms=None, sample_rate=1.0, cooldown=60.0, analyze=False):
+    """ Start recording; statements slower than ``slow_ms`` get their plan EXPLAINed
+
+    ``sample_rate`` is the chance that a slow statement is explained, and
+    the same statement is explained at most once per ``cooldown`` seconds.
+    Plain EXPLAIN never runs the statement. With ``analyze`` it is run a
+    second time under EXPLAIN (ANALYZE, BUFFERS) for actual timings, see
+    ``_explain``. Only pools created after the call hand out instrumented
+    connections.
+    """
+    global enabled, slow_threshold, explain_sample_rate, explain_cooldown, explain_analyze
+    slow_threshold = slow_ms / 1000 if slow_ms is not None else None
+    explain_sample_rate = sample_rate
+    explain_cooldown = cooldown
+    explain_analyze = analyze
+    enabled = True
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+def reset():
+    global _pool_wait
+    with _lock:
+        _statements.clear()
+        _last_explained.clear()
+        _pool_wait = None
+        slow_queries.clear()
+
+
+def statement_key(sql):
+    """ Metric label for a statement: literals replaced by ?, whitespace collapsed
+
+    Callers pass the SQL before parameters are bound, but execute_batch
+    sends pre-bound statements joined by ';'; those collapse to one
+    statement marked as a batch, so labels stay few.
+    """
+    if isinstance(sql, bytes):
+        sql = sql.decode('utf-8', 'replace')
+    sql = _WHITESPACE.sub(' ', _LITERAL.sub('?', str(sql))).strip()
+    parts = {part.strip() for part in sql.split(';') if part.strip()}
+    if len(parts) == 1 and sql.count(';') >= 1 and not sql.endswith(';'):
+        sql = parts.pop() + ' [batch]'
+    return sql if len(sql) <= STATEMENT_KEY_LENGTH else sql[:STATEMENT_KEY_LENGTH - 3] + '...'
+
+
+def record(key, seconds, rows=0, bytes_sent=0, bytes_received=0, error=False):
+    with _lock:
+        stats = _statements.get(key)
+        if stats is None:
+            stats = _statements[key] = _new_stats()
+        stats['latency'].record(seconds)
+        stats['rows'] += max(rows, 0)
+        stats['bytes_sent'] += bytes_sent
+        stats['bytes_received'] += bytes_received
+        stats['errors'] += error
+
+
+def record_fetch(key, seconds, rows, bytes_received=0):
+    """ Rows pulled from a named cursor after its execute, and the time that took """
+    with _lock:
+        stats = _statements.get(key)
+        if stats is None:
+            stats = _statements[key] = _new_stats()
+        stats['rows'] += rows
+        stats['fetch_seconds'] += seconds
+        stats['bytes_received'] += bytes_received
+
+
+def row_bytes(rows):
+    """ Size of fetched rows as the server sent them, in the text format psycopg2 uses """
+    total = 0
+    for row in rows:
+        for value in row:
+            if value is None:
+                continue
+            if isinstance(value, (bytes, bytearray, memoryview)):
+                total += len(value)
+            elif isinstance(value, str):
+                total += len(value.encode('utf-8'))
+            else:
+                total += len(str(value))
+    return total
+
+
+def record_pool_wait(seconds):
+    """ Time a caller spent waiting for a pooled connection """
+    global _pool_wait
+    with _lock:
+        if _pool_wait is None:
+            _pool_wait = Histogram()
+        _pool_wait.record(seconds)
+
+
+def _should_explain(key):
+    now = time.monotonic()
+    with _lock:
+        if now - _last_explained.get(key, -explain_cooldown) < explain_cooldown:
+            return False
+        if random.random() >= explain_sample_rate:
+            return False
+        _last_explained[key] = now
+        return True
+
+
+def _explain(conn, key, query, seconds):
+    """ EXPLAIN a slow statement and keep the plan
+
+    With ``explain_analyze`` the statement is run again under EXPLAIN
+    (ANALYZE, BUFFERS), whatever kind it is, since even a SELECT can change
+    data through the functions it calls. That run happens only when a
+    transaction is open. Effects that ignore rollback (nextval,
+    notifications) still happen a second time.
+
+    Inside a transaction either kind of EXPLAIN runs in a savepoint that is
+    rolled back, so a failing EXPLAIN does not abort the caller's work.
+    """
+    query = query.decode('utf-8', 'replace') if isinstance(query, bytes) else query
+    in_transaction = not conn.autocommit and conn.status == psycopg2.extensions.STATUS_IN_TRANSACTION
+    if explain_analyze and not in_transaction:
+        return
+    cur = psycopg2.extensions.cursor(conn)
+    try:
+        if in_transaction:
+            cur.execute("SAVEPOINT instrument_explain")
+        try:
+            cur.execute(("EXPLAIN (ANALYZE, BUFFERS) " if explain_analyze else "EXPLAIN ") + query)
+            plan = "\n".join(row[0] for row in cur.fetchall())
+        finally:
+            if in_transaction:
+                cur.execute("ROLLBACK TO SAVEPOINT instrument_explain")
+                cur.execute("RELEASE SAVEPOINT instrument_explain")
+    except psycopg2.Error as error:
+        plan = f"EXPLAIN failed: {error}"
+    finally:
+        cur.close()
+    slow_queries.append({'statement': key, 'seconds': seconds, 'query': query,
+                         'plan': plan, 'at': time.time()})
+
+
+class InstrumentedCursor(psycopg2.extensions.cursor):
+    """ Cursor that records latency, rows and bytes for every statement it runs """
+
+    def _timed(self, key, run):
+        started = time.perf_counter()
+        try:
+            result = run()
+        except Exception:
+            record(key, time.perf_counter() - started, error=True)
+            raise
+        seconds = time.perf_counter() - started
+        return result, seconds
+
+    _key = None
+
+    def execute(self, query, vars=None):
+        key = self._key = statement_key(query)
+        result, seconds = self._timed(key, lambda: super(InstrumentedCursor, self).execute(query, vars))
+        sent = len(self.query or b'')
+        record(key, seconds, self.rowcount, bytes_sent=sent)
+        if (slow_threshold is not None and seconds >= slow_threshold and self.name is None
+                and _EXPLAINABLE.match(self.query.decode('utf-8', 'replace')) and _should_explain(key)):
+            _explain(self.connection, key, self.query, seconds)
+        return result
+
+    # a named cursor only DECLAREs in execute; its rows come (and cost time) when fetched.
+    # A client-side cursor already holds its rows, so fetching only adds their size.
+
+    def _fetched(self, fetch, *args):
+        if self._key is None:
+            return fetch(*args)
+        if self.name is None:
+            result = fetch(*args)
+            rows = result if isinstance(result, list) else [result] if result is not None else []
+            record_fetch(self._key, 0.0, 0, row_bytes(rows))
+            return result
+        result, seconds = self._timed(self._key, lambda: fetch(*args))
+        rows = result if isinstance(result, list) else [result] if result is not None else []
+        record_fetch(self._key, seconds, len(rows), row_bytes(rows))
+        return result
+
+    def fetchone(self):
+        return self._fetched(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._fetched(super().fetchmany, self.arraysize if size is None else size)
+
+    def fetchall(self):
+        return self._fetched(super().fetchall)
+
+    def __iter__(self):
+        if self.name is None:
+            return self._iter_client()
+        return self._iter_named()
+
+    def _iter_client(self):
+        key, received = self._key, 0
+        try:
+            while (row := super().fetchone()) is not None:
+                received += row_bytes((row,))
+                yield row
+        finally:
+            if key is not None:
+                record_fetch(key, 0.0, 0, received)
+
+    def _iter_named(self):
+        while rows := self.fetchmany(self.itersize):
+            yield from rows
+
+    def executemany(self, query, vars_list):
+        key = statement_key(query)
+        result, seconds = self._timed(key, lambda: super(InstrumentedCursor, self).executemany(query, vars_list))
+        record(key, seconds, self.rowcount)
+        return result
+
+    def callproc(self, procname, parameters=None):
+        key = statement_key(f"CALLPROC {procname}")
+        result, seconds = self._timed(key, lambda: super(InstrumentedCursor, self).callproc(procname, parameters))
+        record(key, seconds, self.rowcount, bytes_sent=len(self.query or b''))
+        return result
+
+    def copy_expert(self, sql, file, size=8192):
+        key = statement_key(sql)
+        counted = _CountingFile(file)
+        result, seconds = self._timed(key, lambda: super(InstrumentedCursor, self).copy_expert(sql, counted, size))
+        # data read from ``file`` went to the server, data written to it came back
+        record(key, seconds, self.rowcount, bytes_sent=counted.bytes_read, bytes_received=counted.bytes_written)
+        return result
+
+
+class _CountingFile:
+    """ File wrapper counting the bytes COPY moves through it """
+
+    def __init__(self, file):
+        self.file = file
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    def read(self, size=-1):
+        data = self.file.read(size)
+        self.bytes_read += len(data)
+        return data
+
+    def readline(self, size=-1):
+        data = self.file.readline(size)
+        self.bytes_read += len(data)
+        return data
+
+    def write(self, data):
+        self.bytes_written += len(data)
+        return self.file.write(data)
+
+
+class InstrumentedConnection(psycopg2.extensions.connection):
+    """ Connection whose cursors are InstrumentedCursors unless told otherwise """
+
+    def cursor(self, *args, **kwargs):
+        kwargs.setdefault('cursor_factory', InstrumentedCursor)
+        return super().cursor(*args, **kwargs)
+
+
+def _escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _histogram_lines(name, histogram, labels=''):
+    separator = ',' if labels else ''
+    for bound, total in histogram.cumulative():
+        le = '+Inf' if bound == float('inf') else repr(bound)
+        yield f'{name}_bucket{{{labels}{separator}le="{le}"}} {total}'
+    braces = f'{{{labels}}}' if labels else ''
+    yield f'{name}_sum{braces} {histogram.sum}'
+    yield f'{name}_count{braces} {histogram.count}'
+
+
+def prometheus_text():
+    """ All metrics in the Prometheus text exposition format """
+    lines = []
+    with _lock:
+        statements = sorted(_statements.items())
+        lines += ['# HELP pg_statement_duration_seconds Statement latency as seen by the client.',
+                  '# TYPE pg_statement_duration_seconds histogram']
+        for key, stats in statements:
+            lines += _histogram_lines('pg_statement_duration_seconds', stats['latency'],
+                                      f'statement="{_escape_label(key)}"')
+        for metric, field, help_text in (
+                ('pg_statement_rows_total', 'rows', 'Rows returned or affected.'),
+                ('pg_statement_bytes_sent_total', 'bytes_sent', 'Query text and COPY data sent.'),
+                ('pg_statement_bytes_received_total', 'bytes_received', 'COPY data and fetched rows received.'),
+                ('pg_statement_errors_total', 'errors', 'Statements that raised.'),
+                ('pg_statement_fetch_seconds_total', 'fetch_seconds', 'Time fetching from server-side cursors.')):
+            lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} counter']
+            lines += [f'{metric}{{statement="{_escape_label(key)}"}} {stats[field]}' for key, stats in statements]
+        if _pool_wait is not None:
+            lines += ['# HELP pg_pool_wait_seconds Time spent waiting for a pooled connection.',
+                      '# TYPE pg_pool_wait_seconds histogram']
+            lines += _histogram_lines('pg_pool_wait_seconds', _pool_wait)
+        lines += ['# HELP pg_slow_queries_explained_total Slow statements sampled with EXPLAIN.',
+                  '# TYPE pg_slow_queries_explained_total gauge',
+                  f'pg_slow_queries_explained_total {len(slow_queries)}']
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path):
+    """ Write the metrics for node_exporter's textfile collector (atomically) """
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(prometheus_text())
+    os.replace(tmp_path, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != '/metrics':
+            self.send_error(404)
+            return
+        body = prometheus_text().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_metrics(port=9187, host='127.0.0.1'):
+    """ Serve /metrics for a Prometheus scrape from a background thread """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    from db_pool import connection
+
+    enable(slow_ms=1)
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT vendor_id, vendor_name FROM vendors ORDER BY vendor_name")
+            cur.execute("UPDATE vendors SET vendor_name = vendor_name WHERE vendor_id = %s", (1,))
+    print(prometheus_text())
+    for sample in slow_queries:
+        print(f"-- {sample['seconds'] * 1000:.1f} ms: {sample['statement']}\n{sample['plan']}\n")
@@ -0,0 +1,224 @@
+import os
+import sys
+import time
+import argparse
+from itertools import islice
+from multiprocessing import Pool
+
+import psycopg2
+from db_pool import connection
+from bulk_load import copy_rows
+
+# the crawler's reader understands every format it writes (json, ndjson[.gz|.zst], parquet)
+CRAWLER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "NguyenHuyHung_LV1_project_02")
+sys.path.insert(0, CRAWLER_DIR)
+from crawler.reader import product_files, read_file  # noqa: E402
+
+BATCH_SIZE = 5000
+IMAGE_FIELDS = ("base_url", "large_url", "medium_url", "small_url", "thumbnail_url")
+PRODUCT_COLUMNS = ("seq", "product_id", "name", "url_key", "price", "description")
+IMAGE_COLUMNS = ("seq", "product_id", "position") + IMAGE_FIELDS
+
+CREATE_TABLES = (
+    """
+    CREATE TABLE IF NOT EXISTS products (
+        product_id BIGINT PRIMARY KEY,
+        name TEXT,
+        url_key TEXT,
+        price NUMERIC(15, 2),
+        description TEXT,
+        updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS product_images (
+        product_id BIGINT NOT NULL,
+        position INTEGER NOT NULL,
+        base_url TEXT,
+        large_url TEXT,
+        medium_url TEXT,
+        small_url TEXT,
+        thumbnail_url TEXT,
+        PRIMARY KEY (product_id, position),
+        FOREIGN KEY (product_id)
+            REFERENCES products (product_id)
+            ON UPDATE CASCADE ON DELETE CASCADE
+    )
+    """)
+
+# staging tables live for one transaction, so parallel workers never see each other's rows.
+# seq is the product's place in the batch: when a batch holds a product twice, the last one read wins
+CREATE_STAGING = (
+    """
+    CREATE TEMP TABLE products_stage (
+        seq INTEGER, product_id BIGINT, name TEXT, url_key TEXT, price NUMERIC(15, 2), description TEXT
+    ) ON COMMIT DROP
+    """,
+    """
+    CREATE TEMP TABLE product_images_stage (
+        seq INTEGER, product_id BIGINT, position INTEGER, base_url TEXT, large_url TEXT,
+        medium_url TEXT, small_url TEXT, thumbnail_url TEXT
+    ) ON COMMIT DROP
+    """)
+
+# images of an earlier copy of a product in the same batch
+DELETE_SUPERSEDED_IMAGES = """
+    DELETE FROM product_images_stage AS st
+    USING products_stage AS p
+    WHERE p.product_id = st.product_id AND p.seq > st.seq
+"""
+
+# rows whose values did not change are skipped by the WHERE, so a re-crawl
+# only rewrites (and only bumps updated_at for) changed products
+UPSERT_PRODUCTS = """
+    INSERT INTO products (product_id, name, url_key, price, description)
+    SELECT DISTINCT ON (product_id) product_id, name, url_key, price, description
+    FROM products_stage
+    ORDER BY product_id, seq DESC
+    ON CONFLICT (product_id) DO UPDATE
+        SET name = EXCLUDED.name,
+            url_key = EXCLUDED.url_key,
+            price = EXCLUDED.price,
+            description = EXCLUDED.description,
+            updated_at = now()
+        WHERE (products.name, products.url_key, products.price, products.description)
+              IS DISTINCT FROM
+              (EXCLUDED.name, EXCLUDED.url_key, EXCLUDED.price, EXCLUDED.description)
+    RETURNING (xmax = 0) AS inserted
+"""
+
+UPSERT_IMAGES = """
+    INSERT INTO product_images (product_id, position, base_url, large_url, medium_url, small_url, thumbnail_url)
+    SELECT DISTINCT ON (product_id, position)
+           product_id, position, base_url, large_url, medium_url, small_url, thumbnail_url
+    FROM product_images_stage
+    ORDER BY product_id, position, seq DESC
+    ON CONFLICT (product_id, position) DO UPDATE
+        SET base_url = EXCLUDED.base_url,
+            large_url = EXCLUDED.large_url,
+            medium_url = EXCLUDED.medium_url,
+            small_url = EXCLUDED.small_url,
+            thumbnail_url = EXCLUDED.thumbnail_url
+        WHERE (product_images.base_url, product_images.large_url, product_images.medium_url,
+               product_images.small_url, product_images.thumbnail_url)
+              IS DISTINCT FROM
+              (EXCLUDED.base_url, EXCLUDED.large_url, EXCLUDED.medium_url,
+               EXCLUDED.small_url, EXCLUDED.thumbnail_url)
+"""
+
+# images a product no longer has
+DELETE_STALE_IMAGES = """
+    DELETE FROM product_images AS i
+    USING (SELECT DISTINCT product_id FROM products_stage) AS s
+    WHERE i.product_id = s.product_id
+      AND NOT EXISTS (SELECT 1 FROM product_images_stage AS st
+                      WHERE st.product_id = i.product_id AND st.position = i.position)
+"""
+
+
+def create_product_tables():
+    """ Create the products and product_images tables """
+    try:
+        with connection() as conn:
+            with conn.cursor() as cur:
+                for command in CREATE_TABLES:
+                    cur.execute(command)
+    except (psycopg2.DatabaseError, Exception) as error:
+        print(error)
+
+
+def upsert_batch(products):
+    """ COPY one batch into staging tables and merge it in a single transaction
+
+    Returns (inserted, updated); unchanged products count as neither.
+    """
+    product_rows = []
+    image_rows = []
+    for seq, product in enumerate(products):
+        product_id = product.get("id")
+        if product_id is None:
+            continue
+        product_rows.append((seq, product_id, product.get("name"), product.get("url_key"),
+                             product.get("price"), product.get("description")))
+        for position, image in enumerate(product.get("images") or []):
+            image_rows.append((seq, product_id, position) + tuple(image.get(field) for field in IMAGE_FIELDS))
+
+    if not product_rows:
+        return 0, 0
+    with connection() as conn:
+        with conn.cursor() as cur:
+            for command in CREATE_STAGING:
+                cur.execute(command)
+            copy_rows(cur, "products_stage", PRODUCT_COLUMNS, product_rows)
+            copy_rows(cur, "product_images_stage", IMAGE_COLUMNS, image_rows)
+            cur.execute(DELETE_SUPERSEDED_IMAGES)
+            cur.execute(UPSERT_PRODUCTS)
+            flags = [row[0] for row in cur.fetchall()]
+            cur.execute(DELETE_STALE_IMAGES)
+            cur.execute(UPSERT_IMAGES)
+    inserted = sum(flags)
+    return inserted, len(flags) - inserted
+
+
+def load_products(products, batch_size=BATCH_SIZE):
+    """ Upsert a stream of products, ``batch_size`` at a time
+
+    Only one batch is held in memory. Returns (inserted, updated).
+    """
+    products = iter(products)
+    inserted = updated = 0
+    while batch := list(islice(products, batch_size)):
+        batch_inserted, batch_updated = upsert_batch(batch)
+        inserted += batch_inserted
+        updated += batch_updated
+    return inserted, updated
+
+
+def _load_file(args):
+    path, batch_size = args
+    try:
+        return path, load_products(read_file(path), batch_size), None
+    except (Exception, psycopg2.DatabaseError) as error:
+        return path, (0, 0), str(error)
+
+
+def load_files(paths, processes=None, batch_size=BATCH_SIZE):
+    """ Load crawler output files in parallel, one file per worker at a time
+
+    Each worker streams its file in batches, so memory stays around
+    ``processes * batch_size`` products. Batches are merged in product_id
+    order, which keeps workers that touch the same products from deadlocking.
+    Returns (inserted, updated, failed_paths).
+    """
+    inserted = updated = 0
+    failed = []
+    with Pool(processes) as pool:
+        for path, (file_inserted, file_updated), error in pool.imap_unordered(
+                _load_file, [(path, batch_size) for path in paths]):
+            if error:
+                print(f"Failed {path}: {error}")
+                failed.append(path)
+                continue
+            print(f"Loaded {path}: {file_inserted} new, {file_updated} changed")
+            inserted += file_inserted
+            updated += file_updated
+    return inserted, updated, failed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Upsert crawled Tiki products into PostgreSQL")
+    parser.add_argument("paths", nargs="+", help="crawler output folders or product files")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    files = []
+    for path in args.paths:
+        files.extend(product_files(path) if os.path.isdir(path) else [path])
+
+    create_product_tables()
+    started = time.perf_counter()
+    inserted, updated, failed = load_files(files, args.processes, args.batch_size)
+    print(f"{inserted} inserted, {updated} updated from {len(files)} files "
+          f"in {time.perf_counter() - started:.2f}s")
+    sys.exit(1 if failed else 0)
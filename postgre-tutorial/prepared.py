@@ -0,0 +1,162 @@
+import re
+import time
+import threading
+
+import psycopg2
+from psycopg2.extras import execute_batch
+from db_pool import connection
+
+PAGE_SIZE = 100
+
+# name -> SQL with %s placeholders
+STATEMENTS = {
+    'insert_vendor': "INSERT INTO vendors(vendor_name) VALUES(%s) RETURNING vendor_id",
+    'update_vendor': "UPDATE vendors SET vendor_name = %s WHERE vendor_id = %s",
+    'delete_part': "DELETE FROM parts WHERE part_id = %s",
+    'insert_part': "INSERT INTO parts(part_name) VALUES(%s) RETURNING part_id",
+    'assign_vendor': "INSERT INTO vendor_parts(vendor_id, part_id) VALUES(%s, %s)",
+}
+
+_PLACEHOLDER = re.compile(r"%s")
+_PLANNING_TIME = re.compile(r"Planning Time: ([\d.]+) ms")
+
+# (id(conn), backend pid) -> names prepared on that session; the pid tells a
+# reused id() of a new connection apart from the old one
+_prepared = {}
+_stats = {}
+_lock = threading.Lock()
+
+
+def register(name, sql):
+    """ Add a named statement; it is prepared lazily on each connection that runs it """
+    STATEMENTS[name] = sql
+
+
+def _session_key(conn):
+    return id(conn), conn.get_backend_pid()
+
+
+def _stats_for(name):
+    return _stats.setdefault(name, {'executions': 0, 'round_trips': 0, 'prepares': 0, 'planning_ms': None})
+
+
+def _planning_ms(cur, sql, params):
+    """ How long the server takes to plan the statement once, from EXPLAIN's summary """
+    cur.execute("EXPLAIN (SUMMARY) " + sql, params)
+    for (line,) in cur.fetchall():
+        match = _PLANNING_TIME.search(line)
+        if match:
+            return float(match.group(1))
+    return 0.0
+
+
+def prepare(cur, name, params=None):
+    """ PREPARE the statement on the cursor's connection unless that session already has it """
+    key = _session_key(cur.connection)
+    names = _prepared.setdefault(key, set())
+    if name in names:
+        return
+    sql = STATEMENTS[name]
+    count = iter(range(1, sql.count('%s') + 1))
+    cur.execute(f"PREPARE {name} AS " + _PLACEHOLDER.sub(lambda _: f"${next(count)}", sql))
+    names.add(name)
+    with _lock:
+        stats = _stats_for(name)
+        stats['prepares'] += 1
+        needs_planning_time = stats['planning_ms'] is None and params is not None
+    if needs_planning_time:
+        planning_ms = _planning_ms(cur, sql, params)
+        with _lock:
+            stats['planning_ms'] = planning_ms
+
+
+def _execute_sql(name):
+    placeholders = ", ".join(["%s"] * STATEMENTS[name].count('%s'))
+    return f"EXECUTE {name} ({placeholders})" if placeholders else f"EXECUTE {name}"
+
+
+def execute(cur, name, params=()):
+    """ Run a named statement with one parameter set; results are read from ``cur`` """
+    prepare(cur, name, params)
+    cur.execute(_execute_sql(name), params)
+    with _lock:
+        stats = _stats_for(name)
+        stats['executions'] += 1
+        stats['round_trips'] += 1
+
+
+def execute_many(cur, name, param_list, page_size=PAGE_SIZE):
+    """ Run a named statement for many parameter sets, ``page_size`` EXECUTEs per round-trip
+
+    Results are discarded, as with executemany; returns the number of
+    parameter sets run.
+    """
+    param_list = list(param_list)
+    if not param_list:
+        return 0
+    prepare(cur, name, param_list[0])
+    execute_batch(cur, _execute_sql(name), param_list, page_size=page_size)
+    with _lock:
+        stats = _stats_for(name)
+        stats['executions'] += len(param_list)
+        stats['round_trips'] += -(-len(param_list) // page_size)
+    return len(param_list)
+
+
+def run(name, params=(), fetch=None):
+    """ Check out a pooled connection, execute a named statement and commit
+
+    ``fetch`` is None, "one" or "all". Returns (rowcount, rows).
+    """
+    with connection() as conn:
+        with conn.cursor() as cur:
+            execute(cur, name, params)
+            rows = cur.fetchone() if fetch == "one" else cur.fetchall() if fetch == "all" else None
+            return cur.rowcount, rows
+
+
+def run_many(name, param_list, page_size=PAGE_SIZE):
+    """ execute_many in one pooled transaction; returns the number of parameter sets """
+    with connection() as conn:
+        with conn.cursor() as cur:
+            return execute_many(cur, name, param_list, page_size)
+
+
+def report():
+    """ Per statement: executions, round-trips and the round-trips and planning time saved
+
+    Without the layer every execution is its own round-trip and is parsed
+    and planned from scratch. Planning time is measured once per statement
+    with EXPLAIN (SUMMARY); the saving is an estimate, as the server may
+    still re-plan a prepared statement with custom parameters.
+    """
+    with _lock:
+        result = {}
+        for name, stats in _stats.items():
+            planning_ms = stats['planning_ms'] or 0.0
+            result[name] = dict(stats,
+                                round_trips_saved=stats['executions'] - stats['round_trips'],
+                                planning_ms_saved=planning_ms * max(stats['executions'] - stats['prepares'], 0))
+        return result
+
+
+def reset_stats():
+    with _lock:
+        _stats.clear()
+
+
+if __name__ == '__main__':
+    try:
+        started = time.perf_counter()
+        run_many('update_vendor', [(f"Vendor {i}", i) for i in range(1, 5001)])
+        print(f"5000 batched updates in {time.perf_counter() - started:.3f}s")
+
+        started = time.perf_counter()
+        for i in range(1, 1001):
+            run('update_vendor', (f"Vendor {i}", i))
+        print(f"1000 single prepared updates in {time.perf_counter() - started:.3f}s")
+
+        for name, stats in report().items():
+            print(name, stats)
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(error)
@@ -1,11 +1,10 @@
 import psycopg2
-from config import load_config
+from db_pool import connection
 
 def get_vendors_with_fetch_one():
     """ Retrieve data from the vendors table """
-    config  = load_config()
     try:
-        with psycopg2.connect(**config) as conn:
+        with connection() as conn:
             with conn.cursor() as cur:
                 cur.execute("SELECT vendor_id, vendor_name FROM vendors ORDER BY vendor_name")
                 print("The number of parts: ", cur.rowcount)
@@ -21,9 +20,8 @@ def get_vendors_with_fetch_one():
 
 def get_vendors_with_fetch_all():
     """ Retrieve data from the vendors table """
-    config  = load_config()
     try:
-        with psycopg2.connect(**config) as conn:
+        with connection() as conn:
             with conn.cursor() as cur:
                 cur.execute("SELECT vendor_id, vendor_name FROM vendors ORDER BY vendor_name")
                 rows = cur.fetchall()
@@ -44,10 +42,11 @@ def iter_row(cursor, size=10):
 
 def get_part_vendors():
     """ Retrieve data from the vendors table """
-    config  = load_config()
     try:
-        with psycopg2.connect(**config) as conn:
-            with conn.cursor() as cur:
+        with connection() as conn:
+            # a named cursor keeps the result on the server, so iter_row
+            # really fetches 10 rows per round-trip
+            with conn.cursor(name='part_vendors') as cur:
                 cur.execute("""
                     SELECT part_name, vendor_name
                     FROM parts
@@ -0,0 +1,401 @@
+import io
+import sys
+import time
+import hashlib
+import tarfile
+import zipfile
+import argparse
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg2
+from config import load_config
+
+ARCHIVE = 'dvdrental.tar'
+WORKERS = 4
+COPY_BUFFER = 1 << 16
+
+# teSection in pg_dump's pg_backup.h
+SECTION_NONE, SECTION_PRE_DATA, SECTION_DATA, SECTION_POST_DATA = 1, 2, 3, 4
+
+# settings pg_restore applies to every session before replaying a dump
+SESSION_SETUP = """
+    SET statement_timeout = 0;
+    SET lock_timeout = 0;
+    SET client_encoding = 'UTF8';
+    SET standard_conforming_strings = on;
+    SELECT pg_catalog.set_config('search_path', '', false);
+    SET check_function_bodies = false;
+    SET xmloption = content;
+    SET client_min_messages = warning;
+    SET row_security = off;
+    SET datestyle = ISO;
+    SET extra_float_digits = 3;
+"""
+
+# entries that only set session state or create the database itself; the
+# session state is covered by SESSION_SETUP, and ownership and privileges are
+# skipped (like pg_restore --no-owner --no-privileges) so the restore does not
+# depend on the dump's roles existing
+SKIPPED_ENTRIES = {'ENCODING', 'STDSTRINGS', 'SEARCHPATH', 'DATABASE', 'ACL', 'DEFAULT ACL'}
+# post-data entries that only need their table's data; run in parallel before the rest
+INDEX_ENTRIES = {'CONSTRAINT', 'INDEX'}
+
+
+class TocReader:
+    """ Reader for the binary toc.dat of a pg_dump archive
+
+    Integers are a sign byte followed by ``int_size`` little-endian bytes,
+    strings an integer length (-1 for NULL) and the bytes, as written by
+    pg_backup_archiver.c.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+        self.int_size = 4
+        self.version = (0, 0, 0)
+
+    def read_byte(self):
+        value = self.data[self.pos]
+        self.pos += 1
+        return value
+
+    def read_int(self):
+        sign = self.read_byte()
+        value = int.from_bytes(self.data[self.pos:self.pos + self.int_size], 'little')
+        self.pos += self.int_size
+        return -value if sign else value
+
+    def read_str(self):
+        length = self.read_int()
+        if length < 0:
+            return None
+        value = self.data[self.pos:self.pos + length].decode('utf-8')
+        self.pos += length
+        return value
+
+    def read_header(self):
+        if self.data[:5] != b'PGDMP':
+            raise ValueError('Not a pg_dump archive (bad magic)')
+        self.pos = 5
+        self.version = (self.read_byte(), self.read_byte(), self.read_byte())
+        if self.version < (1, 12, 0):
+            raise ValueError('Unsupported archive version {0}.{1}.{2}'.format(*self.version))
+        self.int_size = self.read_byte()
+        self.read_byte()  # offset size
+        archive_format = self.read_byte()
+        if self.version >= (1, 15, 0):
+            compression = self.read_byte()
+        else:
+            compression = self.read_int()
+        for _ in range(7):  # creation time: sec, min, hour, mday, mon, year, isdst
+            self.read_int()
+        header = {
+            'version': self.version,
+            'format': archive_format,
+            'compression': compression,
+            'dbname': self.read_str(),
+            'server_version': self.read_str(),
+            'pg_dump_version': self.read_str(),
+        }
+        return header
+
+    def read_entry(self):
+        version = self.version
+        entry = {
+            'dump_id': self.read_int(),
+            'had_dumper': self.read_int(),
+            'table_oid': self.read_str(),
+            'oid': self.read_str(),
+            'tag': self.read_str(),
+            'desc': self.read_str(),
+            'section': self.read_int(),
+            'defn': self.read_str(),
+            'drop_stmt': self.read_str(),
+            'copy_stmt': self.read_str(),
+            'namespace': self.read_str(),
+            'tablespace': self.read_str(),
+        }
+        if version >= (1, 14, 0):
+            entry['table_am'] = self.read_str()
+        if version >= (1, 16, 0):
+            entry['relkind'] = self.read_int()
+        entry['owner'] = self.read_str()
+        self.read_str()  # "with oids", always "false" in the supported versions
+        deps = []
+        while (dep := self.read_str()) is not None:
+            deps.append(int(dep))
+        entry['deps'] = deps
+        # tar and directory archives store the data file name
+        entry['filename'] = self.read_str()
+        return entry
+
+
+def read_toc(data):
+    """ Parse toc.dat; returns (header, entries in dump order) """
+    reader = TocReader(data)
+    header = reader.read_header()
+    entries = [reader.read_entry() for _ in range(reader.read_int())]
+    return header, entries
+
+
+class CopyData(io.RawIOBase):
+    """ A table's .dat stream up to (not including) the ``\\.`` end marker
+
+    Also counts the rows and keeps an order-independent checksum of them for
+    verify_tables(); lines pass through a buffer at a time.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.rows = 0
+        self.checksum = 0
+        self.pending = b''
+        self.done = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self.pending and not self.done:
+            lines = self.stream.readlines(COPY_BUFFER)
+            if not lines:
+                self.done = True
+                break
+            kept = []
+            for line in lines:
+                if line == b'\\.\n' or line == b'\\.':
+                    self.done = True
+                    break
+                self.rows += 1
+                self.checksum = (self.checksum + row_hash(line)) & 0xFFFFFFFFFFFFFFFF
+                kept.append(line)
+            self.pending = b''.join(kept)
+        size = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        return size
+
+
+def row_hash(line):
+    """ 64-bit hash of one COPY text line; summed, it ignores row order """
+    return int.from_bytes(hashlib.blake2b(line.rstrip(b'\n'), digest_size=8).digest(), 'little')
+
+
+@contextmanager
+def open_archive(path):
+    """ Open the tar archive, or the tar inside a .zip such as dvdrental.zip """
+    if not path.endswith('.zip'):
+        with tarfile.open(path) as archive:
+            yield archive
+        return
+    with zipfile.ZipFile(path) as bundle:
+        name = next(name for name in bundle.namelist() if name.endswith('.tar'))
+        with bundle.open(name) as inner, tarfile.open(fileobj=inner) as archive:
+            yield archive
+
+
+def _connect(params):
+    conn = psycopg2.connect(**params)
+    with conn.cursor() as cur:
+        cur.execute(SESSION_SETUP)
+    conn.commit()
+    return conn
+
+
+def create_database(params, dbname):
+    """ Drop and recreate the target database through the maintenance database """
+    admin = dict(params, database='postgres')
+    conn = psycopg2.connect(**admin)
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f'DROP DATABASE IF EXISTS "{dbname}"')
+            cur.execute(f'CREATE DATABASE "{dbname}" TEMPLATE template0 ENCODING \'UTF8\'')
+    finally:
+        conn.close()
+
+
+def _run_serial(params, entries):
+    conn = _connect(params)
+    try:
+        with conn.cursor() as cur:
+            for entry in entries:
+                if entry['defn']:
+                    cur.execute(entry['defn'])
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _run_parallel(params, tasks, workers):
+    """ Run ``task(conn)`` callables over ``workers`` connections; returns their results """
+    if not tasks:
+        return []
+    workers = max(1, min(workers, len(tasks)))
+    connections = [_connect(params) for _ in range(workers)]
+    free = list(connections)
+
+    def run(task):
+        conn = free.pop()
+        try:
+            result = task(conn)
+            conn.commit()
+            return result
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            free.append(conn)
+
+    try:
+        with ThreadPoolExecutor(workers) as executor:
+            return list(executor.map(run, tasks))
+    finally:
+        for conn in connections:
+            conn.close()
+
+
+def _copy_task(archive_path, entry):
+    def task(conn):
+        with open_archive(archive_path) as archive:
+            data = CopyData(archive.extractfile(entry['filename']))
+            with conn.cursor() as cur:
+                cur.copy_expert(entry['copy_stmt'], io.BufferedReader(data, COPY_BUFFER))
+        return entry['namespace'], entry['tag'], data.rows, data.checksum
+    return task
+
+
+def _statement_task(entry):
+    def task(conn):
+        with conn.cursor() as cur:
+            cur.execute(entry['defn'])
+    return task
+
+
+def _verify_task(schema, table, columns):
+    def task(conn):
+        data = io.BytesIO()
+        with conn.cursor() as cur:
+            cur.copy_expert(f'COPY "{schema}"."{table}" {columns} TO STDOUT', data)
+        data.seek(0)
+        rows = checksum = 0
+        for line in data:
+            rows += 1
+            checksum = (checksum + row_hash(line)) & 0xFFFFFFFFFFFFFFFF
+        return rows, checksum
+    return task
+
+
+def restore(archive_path=ARCHIVE, dbname='dvdrental', workers=WORKERS, params=None, verify=True):
+    """ Restore a pg_dump tar archive into a fresh database
+
+    Pre-data (types, tables, functions, ...) is replayed serially in dump
+    order, then every table's data is COPYed in parallel, largest first, one
+    connection per worker. Primary keys, unique constraints and indexes are
+    built after the data, in parallel, then foreign keys, then the remaining
+    post-data entries. Returns a report with the timing of each phase and
+    the verification result.
+    """
+    params = dict(params or load_config(), database=dbname)
+    timings = {}
+
+    started = time.perf_counter()
+    with open_archive(archive_path) as archive:
+        header, entries = read_toc(archive.extractfile('toc.dat').read())
+        sizes = {member.name: member.size for member in archive.getmembers()}
+    entries = [entry for entry in entries if entry['desc'] not in SKIPPED_ENTRIES]
+    create_database(params, dbname)
+    timings['create'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    pre_data = [entry for entry in entries if entry['section'] == SECTION_PRE_DATA]
+    _run_serial(params, pre_data)
+    timings['pre_data'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    table_data = sorted((entry for entry in entries if entry['desc'] == 'TABLE DATA'),
+                        key=lambda entry: sizes.get(entry['filename'], 0), reverse=True)
+    loaded = _run_parallel(params, [_copy_task(archive_path, entry) for entry in table_data], workers)
+    other_data = [entry for entry in entries
+                  if entry['section'] == SECTION_DATA and entry['desc'] != 'TABLE DATA']
+    _run_serial(params, other_data)
+    timings['data'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    post_data = [entry for entry in entries if entry['section'] == SECTION_POST_DATA]
+    _run_parallel(params, [_statement_task(entry) for entry in post_data
+                           if entry['desc'] in INDEX_ENTRIES], workers)
+    _run_parallel(params, [_statement_task(entry) for entry in post_data
+                           if entry['desc'] == 'FK CONSTRAINT'], workers)
+    _run_serial(params, [entry for entry in entries
+                         if entry['section'] == SECTION_NONE
+                         or (entry['section'] == SECTION_POST_DATA
+                             and entry['desc'] not in INDEX_ENTRIES | {'FK CONSTRAINT'})])
+    timings['post_data'] = time.perf_counter() - started
+
+    report = {'header': header, 'tables': len(table_data), 'timings': timings, 'mismatches': None}
+    if verify:
+        started = time.perf_counter()
+        report['mismatches'] = verify_tables(params, table_data, loaded, workers)
+        timings['verify'] = time.perf_counter() - started
+    report['rows'] = sum(rows for _, _, rows, _ in loaded)
+    return report
+
+
+def verify_tables(params, table_data, loaded, workers=WORKERS):
+    """ Compare every table's row count and checksum with its archive data
+
+    The checksum sums a hash of each row's COPY text, so row order does not
+    matter. Returns a list of (table, expected, found) for the mismatches.
+    """
+    tasks = []
+    for entry in table_data:
+        columns = entry['copy_stmt'].split(' FROM stdin')[0]
+        columns = columns[columns.index('('):] if '(' in columns else ''
+        tasks.append(_verify_task(entry['namespace'], entry['tag'], columns))
+    found = _run_parallel(params, tasks, workers)
+    mismatches = []
+    for (schema, table, rows, checksum), (found_rows, found_checksum) in zip(loaded, found):
+        if (rows, checksum) != (found_rows, found_checksum):
+            mismatches.append((f'{schema}.{table}', (rows, checksum), (found_rows, found_checksum)))
+    return mismatches
+
+
+def print_report(label, report):
+    timings = report['timings']
+    print(f"{label}: {report['rows']} rows in {report['tables']} tables, "
+          + ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in timings.items()))
+    if report['mismatches']:
+        for table, expected, found in report['mismatches']:
+            print(f"  MISMATCH {table}: archive {expected}, database {found}")
+    elif report['mismatches'] is not None:
+        print("  verified: row counts and checksums match")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Restore the dvdrental sample database")
+    parser.add_argument("archive", nargs="?", default=ARCHIVE)
+    parser.add_argument("--dbname", default="dvdrental")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--no-verify", action="store_true")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="also restore with one worker into <dbname>_serial and compare")
+    args = parser.parse_args()
+
+    try:
+        if args.benchmark:
+            serial = restore(args.archive, f"{args.dbname}_serial", 1, verify=not args.no_verify)
+            print_report("serial", serial)
+        report = restore(args.archive, args.dbname, args.workers, verify=not args.no_verify)
+        print_report(f"{args.workers} workers", report)
+        if args.benchmark:
+            total = sum(report['timings'].get(phase, 0) for phase in ('create', 'pre_data', 'data', 'post_data'))
+            serial_total = sum(serial['timings'].get(phase, 0) for phase in ('create', 'pre_data', 'data', 'post_data'))
+            print(f"restore: serial {serial_total:.2f}s, parallel {total:.2f}s, "
+                  f"speedup {serial_total / total:.2f}x")
+        sys.exit(1 if report['mismatches'] else 0)
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(error)
+        sys.exit(1)
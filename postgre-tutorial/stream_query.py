@@ -0,0 +1,215 @@
+import os
+import json
+import time
+import itertools
+import threading
+
+import psycopg2
+from db_pool import connection
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = pa_csv = None
+
+ITERSIZE = 2000
+BATCH_SIZE = 10000
+COPY_BLOCK_SIZE = 1 << 20
+
+# type OIDs of the columns NumPy can hold unboxed
+NUMPY_TYPES = {
+    16: "bool",
+    20: "int64", 21: "int64", 23: "int64",
+    700: "float64", 701: "float64", 1700: "float64",
+}
+
+# type OIDs with a fixed pyarrow type; numeric and json are special-cased in _arrow_column
+ARROW_TYPES = {
+    16: pa.bool_(), 17: pa.binary(),
+    20: pa.int64(), 21: pa.int16(), 23: pa.int32(),
+    700: pa.float32(), 701: pa.float64(),
+    19: pa.string(), 25: pa.string(), 1042: pa.string(), 1043: pa.string(),
+    1082: pa.date32(), 1114: pa.timestamp("us"), 1184: pa.timestamp("us", tz="UTC"),
+} if pa is not None else {}
+
+PART_VENDORS = """
+    SELECT part_name, vendor_name
+    FROM parts
+    INNER JOIN vendor_parts ON vendor_parts.part_id = parts.part_id
+    INNER JOIN vendors ON vendors.vendor_id = vendor_parts.vendor_id
+    ORDER BY part_name
+"""
+
+_cursor_ids = itertools.count()
+
+
+def _cursor_name():
+    return f"stream_{os.getpid()}_{next(_cursor_ids)}"
+
+
+def stream_rows(sql, params=None, itersize=ITERSIZE):
+    """ Iterate over a query result through a named server-side cursor
+
+    The server keeps the result; the client holds ``itersize`` rows at a
+    time. The pooled connection stays checked out until the generator is
+    exhausted or closed.
+    """
+    with connection() as conn:
+        with conn.cursor(name=_cursor_name()) as cur:
+            cur.itersize = itersize
+            cur.execute(sql, params)
+            yield from cur
+
+
+def _batches(sql, params, batch_size):
+    with connection() as conn:
+        with conn.cursor(name=_cursor_name()) as cur:
+            cur.execute(sql, params)
+            while rows := cur.fetchmany(batch_size):
+                yield cur.description, rows
+
+
+def stream_batches(sql, params=None, batch_size=BATCH_SIZE):
+    """ Yield (column_names, rows) with up to ``batch_size`` rows per batch """
+    for description, rows in _batches(sql, params, batch_size):
+        yield [column.name for column in description], rows
+
+
+def _numpy_array(values, type_code):
+    dtype = NUMPY_TYPES.get(type_code)
+    if dtype is None:
+        return np.array(values, dtype=object)
+    if None in values:
+        if dtype == "float64":
+            return np.array([np.nan if value is None else value for value in values], dtype=dtype)
+        return np.array(values, dtype=object)
+    return np.array(values, dtype=dtype)
+
+
+def stream_numpy(sql, params=None, batch_size=BATCH_SIZE):
+    """ Yield one dict of column name -> NumPy array per batch
+
+    Numeric and boolean columns become typed arrays (NULLs turn float columns
+    into NaN and other columns into object arrays); everything else is an
+    object array.
+    """
+    if np is None:
+        raise ValueError("stream_numpy needs the numpy package")
+    for description, rows in _batches(sql, params, batch_size):
+        yield {column.name: _numpy_array(values, column.type_code)
+               for column, values in zip(description, zip(*rows))}
+
+
+def _arrow_column(column, values):
+    """ (pyarrow type, value converter or None) for a result column
+
+    The type comes from the column's type OID where that fixes it. Other
+    columns take the type pyarrow infers from ``values``, the first batch,
+    or string when that batch is all NULL.
+    """
+    if column.type_code == 1700:
+        if column.precision and column.precision <= 38:
+            return pa.decimal128(column.precision, column.scale or 0), None
+        return pa.float64(), float
+    if column.type_code in (114, 3802):
+        return pa.string(), json.dumps
+    if column.type_code in ARROW_TYPES:
+        return ARROW_TYPES[column.type_code], None
+    inferred = pa.array(values).type
+    if pa.types.is_null(inferred):
+        return pa.string(), str
+    return inferred, None
+
+
+def stream_arrow(sql, params=None, batch_size=BATCH_SIZE):
+    """ Yield the result as pyarrow RecordBatches of up to ``batch_size`` rows
+
+    The schema is fixed by the first batch, so every batch has the same one
+    even when a later batch has a column that is all NULL.
+    """
+    if pa is None:
+        raise ValueError("stream_arrow needs the pyarrow package")
+    schema = converters = None
+    for description, rows in _batches(sql, params, batch_size):
+        columns = list(zip(*rows))
+        if schema is None:
+            types, converters = zip(*(_arrow_column(column, values)
+                                      for column, values in zip(description, columns)))
+            schema = pa.schema([(column.name, type_) for column, type_ in zip(description, types)])
+        arrays = []
+        for values, field, convert in zip(columns, schema, converters):
+            if convert is not None:
+                values = [None if value is None else convert(value) for value in values]
+            arrays.append(pa.array(values, type=field.type))
+        yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def copy_arrow(sql, params=None, block_size=COPY_BLOCK_SIZE, column_types=None):
+    """ Stream a query as pyarrow RecordBatches without building Python rows
+
+    The server writes the result as CSV through COPY ... TO STDOUT into a
+    pipe, and pyarrow parses it block by block in C, so memory is about one
+    ``block_size`` block. Column types are inferred from the first block
+    unless given in ``column_types`` (name -> pyarrow type).
+    """
+    if pa is None:
+        raise ValueError("copy_arrow needs the pyarrow package")
+    read_fd, write_fd = os.pipe()
+    errors = []
+
+    def copy_out(query):
+        try:
+            with os.fdopen(write_fd, "wb") as sink:
+                with connection() as conn:
+                    with conn.cursor() as cur:
+                        cur.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)", sink)
+        except (Exception, psycopg2.DatabaseError) as error:
+            errors.append(error)
+
+    with connection() as conn:
+        with conn.cursor() as cur:
+            query = cur.mogrify(sql, params).decode() if params is not None else sql
+    writer = threading.Thread(target=copy_out, args=(query,), daemon=True)
+    writer.start()
+    with os.fdopen(read_fd, "rb") as source:
+        try:
+            reader = pa_csv.open_csv(
+                source,
+                read_options=pa_csv.ReadOptions(block_size=block_size),
+                convert_options=pa_csv.ConvertOptions(column_types=column_types,
+                                                      strings_can_be_null=True))
+            yield from reader
+        except pa.ArrowInvalid:
+            # an empty stream (failed COPY) has no header to parse
+            writer.join()
+            if not errors:
+                raise
+        finally:
+            # let a writer blocked on a full pipe see EPIPE and stop
+            source.close()
+            writer.join()
+    if errors:
+        raise errors[0]
+
+
+if __name__ == '__main__':
+    try:
+        for part_name, vendor_name in stream_rows(PART_VENDORS):
+            print(part_name, vendor_name)
+
+        for label, batches in (("named cursor -> numpy", stream_numpy(PART_VENDORS)),
+                               ("named cursor -> arrow", stream_arrow(PART_VENDORS)),
+                               ("COPY -> arrow", copy_arrow(PART_VENDORS))):
+            started = time.perf_counter()
+            rows = 0
+            for batch in batches:
+                rows += len(batch) if not isinstance(batch, dict) else len(next(iter(batch.values())))
+            print(f"{label}: {rows} rows in {time.perf_counter() - started:.3f}s")
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(error)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the tutorial scripts import each other by name from their own folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
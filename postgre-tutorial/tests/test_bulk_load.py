@@ -0,0 +1,59 @@
+import psycopg2
+import pytest
+
+import bulk_load
+
+
+def test_copy_value_escapes_the_text_format():
+    assert bulk_load._copy_value(None) == "\\N"
+    assert bulk_load._copy_value(12) == "12"
+    assert bulk_load._copy_value("a\tb\nc\rd\\e") == "a\\tb\\nc\\rd\\\\e"
+
+
+def test_batched():
+    assert list(bulk_load.batched(iter(range(5)), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(bulk_load.batched([], 2)) == []
+
+
+class FakeCursor:
+    def __init__(self, refuse_copy=False):
+        self.refuse_copy = refuse_copy
+        self.statements = []
+        self.copied = None
+
+    def execute(self, sql, params=None):
+        self.statements.append(sql)
+
+    def copy_expert(self, sql, file):
+        if self.refuse_copy:
+            raise psycopg2.NotSupportedError("COPY is not supported")
+        self.copied = (sql, file.read())
+
+
+@pytest.fixture
+def inserted(monkeypatch):
+    calls = []
+    monkeypatch.setattr(bulk_load, "insert_rows", lambda cur, table, columns, rows: calls.append(rows))
+    return calls
+
+
+def test_write_rows_uses_copy(inserted):
+    cur = FakeCursor()
+    bulk_load.write_rows(cur, "vendors", ("vendor_id", "vendor_name"), iter([(1, "a"), (2, None)]))
+    assert cur.copied == ("COPY vendors (vendor_id, vendor_name) FROM STDIN", "1\ta\n2\t\\N\n")
+    assert cur.statements == ["SAVEPOINT bulk_copy", "RELEASE SAVEPOINT bulk_copy"]
+    assert inserted == []
+
+
+def test_write_rows_falls_back_with_every_row(inserted):
+    cur = FakeCursor(refuse_copy=True)
+    bulk_load.write_rows(cur, "vendors", ("vendor_id", "vendor_name"), (row for row in [(1, "a"), (2, "b")]))
+    assert cur.statements == ["SAVEPOINT bulk_copy", "ROLLBACK TO SAVEPOINT bulk_copy"]
+    assert inserted == [[(1, "a"), (2, "b")]]
+
+
+def test_write_rows_values_method_skips_copy(inserted):
+    cur = FakeCursor()
+    bulk_load.write_rows(cur, "vendors", ("vendor_name",), [("a",)], method="values")
+    assert cur.statements == [] and cur.copied is None
+    assert inserted == [[("a",)]]
@@ -0,0 +1,76 @@
+import pytest
+
+import config
+
+INI = """
+[postgresql]
+host=localhost
+database=suppliers
+user=postgres
+password=secret
+port=5432
+
+[pool]
+maxconn=5
+"""
+
+
+@pytest.fixture
+def ini(tmp_path, monkeypatch):
+    for name in list(config.os.environ):
+        if name.startswith(config.ENV_PREFIX):
+            monkeypatch.delenv(name)
+    path = tmp_path / "database.ini"
+    path.write_text(INI, encoding="utf-8")
+    config.clear_cache()
+    yield str(path)
+    config.clear_cache()
+
+
+def test_reads_a_section(ini):
+    assert config.load_config(ini) == {"host": "localhost", "database": "suppliers", "user": "postgres",
+                                       "password": "secret", "port": "5432"}
+    assert config.load_config(ini, "pool") == {"maxconn": "5"}
+
+
+def test_prefixed_environment_variables_override(ini, monkeypatch):
+    monkeypatch.setenv("DBCFG_POSTGRESQL_PASSWORD", "from-env")
+    monkeypatch.setenv("DBCFG_POSTGRESQL_SSLMODE", "require")
+    monkeypatch.setenv("POSTGRESQL_VERSION", "16")  # unprefixed, as set by Docker images
+    result = config.load_config(ini)
+    assert result["password"] == "from-env"
+    assert result["sslmode"] == "require"
+    assert "version" not in result
+
+
+def test_overrides_only_apply_to_their_section(ini, monkeypatch):
+    monkeypatch.setenv("DBCFG_POOL_MAXCONN", "8")
+    assert config.load_config(ini, "pool") == {"maxconn": "8"}
+    assert "maxconn" not in config.load_config(ini)
+
+
+def test_integer_keys_are_validated(ini, monkeypatch):
+    monkeypatch.setenv("DBCFG_POSTGRESQL_PORT", "five")
+    with pytest.raises(ValueError, match="port"):
+        config.load_config(ini)
+
+
+def test_missing_section(ini, monkeypatch):
+    with pytest.raises(Exception, match="Section instrument not found"):
+        config.load_config(ini, "instrument")
+    assert config.load_config(ini, "instrument", required=False) == {}
+    monkeypatch.setenv("DBCFG_INSTRUMENT_SLOW_MS", "50")
+    assert config.load_config(ini, "instrument") == {"slow_ms": "50"}
+
+
+def test_file_changes_are_picked_up(ini):
+    assert config.load_config(ini)["host"] == "localhost"
+    with open(ini, "a", encoding="utf-8") as f:
+        f.write("\n[extra]\nkey=value\n")
+    assert config.load_config(ini, "extra", cached=False) == {"key": "value"}
+
+
+def test_returns_a_new_dict_every_call(ini):
+    first = config.load_config(ini)
+    first["host"] = "changed"
+    assert config.load_config(ini)["host"] == "localhost"
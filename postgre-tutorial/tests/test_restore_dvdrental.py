@@ -0,0 +1,95 @@
+import io
+
+import pytest
+
+from restore_dvdrental import CopyData, TocReader, read_toc, row_hash
+
+
+def enc_int(value, int_size=4):
+    return bytes([1 if value < 0 else 0]) + abs(value).to_bytes(int_size, "little")
+
+
+def enc_str(value):
+    if value is None:
+        return enc_int(-1)
+    data = value.encode("utf-8")
+    return enc_int(len(data)) + data
+
+
+def toc(entries, version=(1, 14, 0)):
+    data = b"PGDMP" + bytes(version) + bytes([4, 8, 3])  # int size, offset size, tar format
+    data += bytes([0]) if version >= (1, 15, 0) else enc_int(0)  # compression
+    data += b"".join(enc_int(value) for value in (0, 0, 0, 1, 0, 124, 0))  # creation time
+    data += enc_str("dvdrental") + enc_str("16.0") + enc_str("16.0")
+    data += enc_int(len(entries))
+    for entry in entries:
+        data += enc_int(entry["dump_id"]) + enc_int(1)
+        for field in ("table_oid", "oid", "tag", "desc"):
+            data += enc_str(entry.get(field))
+        data += enc_int(entry["section"])
+        for field in ("defn", "drop_stmt", "copy_stmt", "namespace", "tablespace"):
+            data += enc_str(entry.get(field))
+        if version >= (1, 14, 0):
+            data += enc_str("heap")
+        if version >= (1, 16, 0):
+            data += enc_int(ord("r"))
+        data += enc_str("postgres") + enc_str("false")
+        data += b"".join(enc_str(str(dep)) for dep in entry.get("deps", ())) + enc_str(None)
+        data += enc_str(entry.get("filename"))
+    return data
+
+
+ENTRIES = [
+    {"dump_id": 200, "tag": "actor", "desc": "TABLE", "section": 2, "namespace": "public",
+     "defn": "CREATE TABLE public.actor (actor_id integer);"},
+    {"dump_id": 3000, "tag": "actor", "desc": "TABLE DATA", "section": 3, "namespace": "public",
+     "copy_stmt": "COPY public.actor (actor_id) FROM stdin;", "deps": [200], "filename": "3000.dat"},
+]
+
+
+@pytest.mark.parametrize("version", [(1, 14, 0), (1, 15, 0), (1, 16, 0)])
+def test_read_toc(version):
+    header, entries = read_toc(toc(ENTRIES, version))
+    assert header["version"] == version
+    assert header["dbname"] == "dvdrental"
+    assert [(e["dump_id"], e["desc"], e["section"]) for e in entries] == [(200, "TABLE", 2), (3000, "TABLE DATA", 3)]
+    assert entries[1]["deps"] == [200]
+    assert entries[1]["filename"] == "3000.dat"
+    assert entries[0]["filename"] is None
+    assert entries[1]["copy_stmt"].startswith("COPY public.actor")
+
+
+def test_negative_and_null_values():
+    reader = TocReader(enc_int(-7) + enc_str(None) + enc_str("đ"))
+    assert reader.read_int() == -7
+    assert reader.read_str() is None
+    assert reader.read_str() == "đ"
+
+
+def test_rejects_other_files():
+    with pytest.raises(ValueError, match="magic"):
+        read_toc(b"PK\x03\x04" + bytes(64))
+    with pytest.raises(ValueError, match="Unsupported"):
+        read_toc(toc([], version=(1, 11, 0)))
+
+
+def test_copy_data_stops_at_the_end_marker():
+    lines = [b"1\tPenelope\n", b"2\tNick\n", b"3\tEd\n"]
+    stream = io.BytesIO(b"".join(lines) + b"\\.\n" + b"trailing bytes of the next member")
+    data = CopyData(stream)
+    assert data.read() == b"".join(lines)
+    assert data.rows == 3
+    assert data.checksum == sum(row_hash(line) for line in lines) & 0xFFFFFFFFFFFFFFFF
+
+
+def test_copy_data_small_reads_and_order_independent_checksum():
+    lines = [f"{i}\tname {i}\n".encode() for i in range(1000)]
+    forward = CopyData(io.BytesIO(b"".join(lines) + b"\\."))
+    chunks = []
+    while chunk := forward.read(7):
+        chunks.append(chunk)
+    assert b"".join(chunks) == b"".join(lines)
+
+    backward = CopyData(io.BytesIO(b"".join(reversed(lines)) + b"\\.\n"))
+    backward.read()
+    assert (backward.rows, backward.checksum) == (forward.rows, forward.checksum)
@@ -0,0 +1,32 @@
+from collections import namedtuple
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+from stream_query import _arrow_column  # noqa: E402
+
+Column = namedtuple("Column", "name type_code precision scale")
+
+
+@pytest.mark.parametrize("type_code, expected", [
+    (23, pa.int32()), (20, pa.int64()), (701, pa.float64()), (25, pa.string()), (16, pa.bool_()),
+])
+def test_type_comes_from_the_oid(type_code, expected):
+    # an all-NULL first batch must not decide the type
+    assert _arrow_column(Column("c", type_code, None, None), [None, None]) == (expected, None)
+
+
+def test_numeric():
+    assert _arrow_column(Column("price", 1700, 15, 2), []) == (pa.decimal128(15, 2), None)
+    assert _arrow_column(Column("ratio", 1700, None, None), []) == (pa.float64(), float)
+
+
+def test_json_is_serialized():
+    type_, convert = _arrow_column(Column("doc", 3802, None, None), [None])
+    assert type_ == pa.string() and convert({"a": 1}) == '{"a": 1}'
+
+
+def test_other_types_are_inferred_from_the_first_batch():
+    assert _arrow_column(Column("tags", 1009, None, None), [["a"], None]) == (pa.list_(pa.string()), None)
+    assert _arrow_column(Column("other", 1009, None, None), [None]) == (pa.string(), str)
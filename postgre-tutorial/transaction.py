@@ -1,22 +1,15 @@
 import psycopg2
-from config import load_config
+from db_pool import connection
+from prepared import execute, execute_many
 
 
 def add_part(part_name, vendor_list):
-    # statement for inserting a new row into the parts table
-    insert_part = "INSERT INTO parts(part_name) VALUES(%s) RETURNING part_id;"
-
-    # statement for inserting a new row into the vendor_parts table
-    assign_vendor = "INSERT INTO vendor_parts(vendor_id,part_id) VALUES(%s,%s)"
-
-    conn = None
-    config = load_config()
-
+    # uses the prepared statements insert_part and assign_vendor
     try:
-        with psycopg2.connect(**config) as conn:
+        with connection() as conn:
             with conn.cursor() as cur:
                 # insert a new part
-                cur.execute(insert_part, (part_name,))
+                execute(cur, 'insert_part', (part_name,))
 
                 # get the part id
                 row = cur.fetchone()
@@ -26,14 +19,12 @@ def add_part(part_name, vendor_list):
                     raise Exception('Could not get the part id')
 
                 # assign parts provided by vendors
-                for vendor_id in vendor_list:
-                    cur.execute(assign_vendor, (vendor_id, part_id))
+                execute_many(cur, 'assign_vendor', [(vendor_id, part_id) for vendor_id in vendor_list])
 
                 # commit the transaction
                 conn.commit()
     except (Exception, psycopg2.DatabaseError) as error:
-        if conn:
-            conn.rollback()
+        # connection() has already rolled the transaction back
         print(error)
 
 if __name__ == '__main__':
@@ -1,5 +1,6 @@
 import psycopg2
-from config import load_config
+from db_pool import connection
+from prepared import execute, execute_many
 
 
 def update_vendor(vendor_id, vendor_name):
@@ -7,18 +8,12 @@ def update_vendor(vendor_id, vendor_name):
 
     updated_row_count = 0
 
-    sql = """ UPDATE vendors
-                SET vendor_name = %s
-                WHERE vendor_id = %s"""
-
-    config = load_config()
-
     try:
-        with  psycopg2.connect(**config) as conn:
+        with  connection() as conn:
             with  conn.cursor() as cur:
 
-                # execute the UPDATE statement
-                cur.execute(sql, (vendor_name, vendor_id))
+                # execute the prepared UPDATE statement
+                execute(cur, 'update_vendor', (vendor_name, vendor_id))
                 updated_row_count = cur.rowcount
 
             # commit the changes to the database
@@ -28,5 +23,23 @@ def update_vendor(vendor_id, vendor_name):
     finally:
         return updated_row_count
 
+def update_vendors(vendors):
+    """ Rename many vendors, given (vendor_id, vendor_name) pairs, in one transaction
+
+    Returns the number of pairs processed. """
+
+    processed_count = 0
+
+    try:
+        with  connection() as conn:
+            with  conn.cursor() as cur:
+                # the prepared UPDATE, many parameter sets per round-trip
+                processed_count = execute_many(cur, 'update_vendor',
+                                               [(vendor_name, vendor_id) for vendor_id, vendor_name in vendors])
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(error)
+    finally:
+        return processed_count
+
 if __name__ == '__main__':
     update_vendor(1, "3M Corp")
\ No newline at end of file
@@ -0,0 +1,178 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import subprocess
+import tempfile
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+CSV_PATH = 'tmdb-movies.csv'
+
+# typed columns; everything else is text
+DTYPES = {
+    'id': 'int64',
+    'popularity': 'float64',
+    'budget': 'int64',
+    'revenue': 'int64',
+    'runtime': 'float64',
+    'vote_count': 'int64',
+    'vote_average': 'float64',
+    'release_year': 'int64',
+    'budget_adj': 'float64',
+    'revenue_adj': 'float64',
+}
+TEXT_COLUMNS = ['imdb_id', 'original_title', 'cast', 'homepage', 'director', 'tagline', 'keywords',
+                'overview', 'genres', 'production_companies', 'release_date']
+
+# the csvkit pipeline of NguyenHuyHung_K16_project_01, with its input file names fixed
+SHELL_STEPS = {
+    'release_date_sorted': "csvsort -c release_date -r tmdb-movies.csv > release_date_sorted.csv",
+    'vote_average_filtered': "csvgrep -c vote_average -r '^(7\\.[6-9]|[89])' tmdb-movies.csv "
+                             "> vote_average_filtered_above_7.5.csv",
+    'highest_revenue': "csvsort -c revenue -r tmdb-movies.csv | head -n 2 > highest_revenue_movie.csv",
+    'lowest_revenue': "min_revenue=$(csvsql --tables tmdb --query 'SELECT MIN(revenue) FROM tmdb' "
+                      "tmdb-movies.csv | tail -n +2 | tr -d '\"'); "
+                      "csvsql --tables tmdb --query \"SELECT * FROM tmdb WHERE revenue = $min_revenue\" "
+                      "tmdb-movies.csv > lowest_revenue_movies.csv",
+    'total_revenue': "csvcut -c revenue tmdb-movies.csv | tail -n +2 | awk '{sum+=$1} END {print sum}'",
+    'top_profit': "csvsql --tables tmdb --query 'SELECT *, revenue - budget AS profit FROM tmdb' "
+                  "tmdb-movies.csv > movies_with_profit.csv; "
+                  "csvsort -c profit -r movies_with_profit.csv | head -n 11 > top_10_profit_movies.csv",
+    'top_director': "csvcut -c director tmdb-movies.csv | tail -n +2 | grep -v '^$' | grep -v '^\"\"$' "
+                    "| sort | uniq -c | sort -nr | head -n 1",
+    'top_actor': "csvcut -c cast tmdb-movies.csv | tail -n +2 | grep -v '^$' | grep -v '^\"\"$' | tr '|' '\\n' "
+                 "| grep -v '^$' | grep -v '^\"\"$' | sort | uniq -c | sort -nr | head -n 1",
+    'genre_count': "csvcut -c genres tmdb-movies.csv | tail -n +2 | tr '|' '\\n' | sort | uniq -c "
+                   "| sort -nr > genre_count.txt",
+}
+
+
+def load_movies(path=CSV_PATH):
+    """ Parse the CSV once into typed columns, plus the columns several questions share
+
+    ``release_dt`` is the full release date: the file writes years with two
+    digits (1/1/66), so the century comes from ``release_year``. ``profit``
+    is revenue minus budget.
+    """
+    movies = pd.read_csv(path, dtype={**DTYPES, **{column: 'object' for column in TEXT_COLUMNS}})
+    month_day = movies['release_date'].str.split('/', expand=True)
+    movies['release_dt'] = pd.to_datetime(pd.DataFrame({'year': movies['release_year'],
+                                                        'month': month_day[0].astype('int64'),
+                                                        'day': month_day[1].astype('int64')}))
+    movies['profit'] = movies['revenue'] - movies['budget']
+    return movies
+
+
+def count_values(column, separator=None):
+    """ How often each non-empty value (or ``separator``-split token) occurs, most common first """
+    values = column.dropna()
+    if separator is not None:
+        values = separator.join(values).split(separator)
+    counts = Counter(values)
+    counts.pop('', None)
+    return counts.most_common()
+
+
+def analyze(movies):
+    """ Answer every question of the project from the loaded columns """
+    revenue = movies['revenue'].to_numpy()
+    # stable sorts, so ties keep file order like csvsort
+    by_date = np.argsort(-movies['release_dt'].to_numpy().astype('int64'), kind='stable')
+    by_profit = np.argsort(-movies['profit'].to_numpy(), kind='stable')
+    return {
+        'release_date_sorted': movies.iloc[by_date],
+        'vote_average_filtered': movies[movies['vote_average'] > 7.5],
+        'highest_revenue': movies.iloc[[int(np.argmax(revenue))]],
+        'lowest_revenue': movies[revenue == revenue.min()],
+        'total_revenue': int(revenue.sum()),
+        'top_profit': movies.iloc[by_profit[:10]],
+        'director_counts': count_values(movies['director']),
+        'actor_counts': count_values(movies['cast'], '|'),
+        'genre_counts': count_values(movies['genres'], '|'),
+    }
+
+
+def write_outputs(results, out_dir='.'):
+    """ Write the same files the shell pipeline produces """
+    source_columns = lambda frame: frame.drop(columns=['release_dt', 'profit'])
+    for name, file_name in (('release_date_sorted', 'release_date_sorted.csv'),
+                            ('vote_average_filtered', 'vote_average_filtered_above_7.5.csv'),
+                            ('highest_revenue', 'highest_revenue_movie.csv'),
+                            ('lowest_revenue', 'lowest_revenue_movies.csv')):
+        source_columns(results[name]).to_csv(os.path.join(out_dir, file_name), index=False)
+    results['top_profit'].drop(columns=['release_dt']).to_csv(
+        os.path.join(out_dir, 'top_10_profit_movies.csv'), index=False)
+    with open(os.path.join(out_dir, 'genre_count.txt'), 'w', encoding='utf-8') as f:
+        for genre, count in results['genre_counts']:
+            f.write(f"{count:7d} {genre}\n")
+
+
+def print_answers(results):
+    top = results['highest_revenue'].iloc[0]
+    print(f"Highest revenue movie: {top['original_title']} ({top['revenue']})")
+    print(f"Lowest revenue: {len(results['lowest_revenue'])} movies with "
+          f"{results['lowest_revenue']['revenue'].iloc[0]}")
+    print(f"Total revenue: {results['total_revenue']}")
+    print("Top 10 profit:", ", ".join(results['top_profit']['original_title']))
+    print("Top director: {0} ({1} movies)".format(*results['director_counts'][0]))
+    print("Top actor: {0} ({1} movies)".format(*results['actor_counts'][0]))
+    print("Genres:", ", ".join(f"{genre} {count}" for genre, count in results['genre_counts']))
+
+
+def run_python(path, out_dir, store=False):
+    timings = {}
+    started = time.perf_counter()
+    if store:
+        from column_store import open_store
+        movies = open_store(path).to_frame()
+    else:
+        movies = load_movies(path)
+    timings['load'] = time.perf_counter() - started
+    started = time.perf_counter()
+    results = analyze(movies)
+    timings['analyze'] = time.perf_counter() - started
+    started = time.perf_counter()
+    write_outputs(results, out_dir)
+    timings['write'] = time.perf_counter() - started
+    return results, timings
+
+
+def benchmark(path):
+    """ Time the csvkit pipeline step by step against one Python load + analyze + write """
+    if shutil.which('csvsort') is None:
+        raise RuntimeError("The shell pipeline needs csvkit (pip install csvkit)")
+    with tempfile.TemporaryDirectory() as work_dir:
+        shutil.copy(path, os.path.join(work_dir, 'tmdb-movies.csv'))
+        shell = {}
+        for name, command in SHELL_STEPS.items():
+            started = time.perf_counter()
+            subprocess.run(command, shell=True, cwd=work_dir, check=True,
+                           stdout=subprocess.DEVNULL, executable='/bin/bash')
+            shell[name] = time.perf_counter() - started
+            print(f"shell {name:<24}{shell[name]:8.2f}s")
+        _, timings = run_python(path, work_dir)
+    for phase, seconds in timings.items():
+        print(f"python {phase:<23}{seconds:8.2f}s")
+    shell_total, python_total = sum(shell.values()), sum(timings.values())
+    print(f"shell {shell_total:.2f}s, python {python_total:.2f}s, speedup {shell_total / python_total:.0f}x")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Answer the TMDB questions from one load of the CSV")
+    parser.add_argument("csv", nargs="?", default=CSV_PATH)
+    parser.add_argument("--out-dir", default=".")
+    parser.add_argument("--benchmark", action="store_true", help="compare against the csvkit pipeline")
+    parser.add_argument("--store", action="store_true",
+                        help="read the binary column store (built on first use) instead of parsing the CSV")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.csv)
+        sys.exit(0)
+    results, timings = run_python(args.csv, args.out_dir, args.store)
+    print_answers(results)
+    print(", ".join(f"{phase} {seconds:.3f}s" for phase, seconds in timings.items()))
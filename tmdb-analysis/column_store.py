@@ -0,0 +1,205 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from analytics import CSV_PATH, load_movies
+
+STORE_VERSION = 1
+MANIFEST = 'manifest.json'
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def default_store_dir(csv_path):
+    return os.path.splitext(csv_path)[0] + '.columns'
+
+
+def _write_text_column(store_dir, name, values):
+    """ UTF-8 bytes of every value back to back, int64 offsets and a validity mask """
+    valid = values.notna().to_numpy()
+    encoded = [value.encode('utf-8') if ok else b'' for value, ok in zip(values, valid)]
+    offsets = np.zeros(len(encoded) + 1, dtype='int64')
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    np.save(os.path.join(store_dir, f'{name}.offsets.npy'), offsets)
+    np.save(os.path.join(store_dir, f'{name}.data.npy'), np.frombuffer(b''.join(encoded), dtype='uint8'))
+    np.save(os.path.join(store_dir, f'{name}.valid.npy'), valid)
+
+
+def build_store(csv_path=CSV_PATH, store_dir=None):
+    """ Convert the CSV into one .npy file per column, with a manifest of the source
+
+    The store is written next to the old one and swapped in with a rename,
+    so readers never see half a store. Returns the manifest.
+    """
+    store_dir = store_dir or default_store_dir(csv_path)
+    stat = os.stat(csv_path)
+    movies = load_movies(csv_path)
+
+    tmp_dir = store_dir + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    columns = {}
+    for name in movies.columns:
+        column = movies[name]
+        if column.dtype == object or pd.api.types.is_string_dtype(column.dtype):
+            _write_text_column(tmp_dir, name, column)
+            columns[name] = 'text'
+        else:
+            array = column.to_numpy()
+            np.save(os.path.join(tmp_dir, f'{name}.npy'), array)
+            columns[name] = str(array.dtype)
+
+    manifest = {
+        'version': STORE_VERSION,
+        'source': os.path.abspath(csv_path),
+        'sha256': file_sha256(csv_path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'rows': len(movies),
+        'columns': columns,
+    }
+    with open(os.path.join(tmp_dir, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    old_dir = store_dir + '.old'
+    if os.path.exists(store_dir):
+        os.replace(store_dir, old_dir)
+    os.replace(tmp_dir, store_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return manifest
+
+
+def _read_manifest(store_dir):
+    try:
+        with open(os.path.join(store_dir, MANIFEST), encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def is_current(csv_path, store_dir):
+    """ Whether the store was built from the CSV as it is now
+
+    Size and mtime are checked first; only when they changed is the file
+    hashed, so touching the CSV without editing it does not cost a rebuild.
+    """
+    manifest = _read_manifest(store_dir)
+    if manifest is None or manifest.get('version') != STORE_VERSION:
+        return False
+    stat = os.stat(csv_path)
+    if (stat.st_size, stat.st_mtime_ns) == (manifest['size'], manifest['mtime_ns']):
+        return True
+    if stat.st_size != manifest['size'] or file_sha256(csv_path) != manifest['sha256']:
+        return False
+    # same content, new mtime: remember it so the next check is cheap again
+    manifest['mtime_ns'] = stat.st_mtime_ns
+    tmp_path = os.path.join(store_dir, MANIFEST + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(store_dir, MANIFEST))
+    return True
+
+
+class TextColumn:
+    """ A memory-mapped text column; values are decoded only when asked for """
+
+    def __init__(self, store_dir, name):
+        self.offsets = np.load(os.path.join(store_dir, f'{name}.offsets.npy'), mmap_mode='r')
+        self.data = np.load(os.path.join(store_dir, f'{name}.data.npy'), mmap_mode='r')
+        self.valid = np.load(os.path.join(store_dir, f'{name}.valid.npy'), mmap_mode='r')
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if not self.valid[index]:
+            return None
+        return bytes(self.data[self.offsets[index]:self.offsets[index + 1]]).decode('utf-8')
+
+    def to_list(self):
+        raw = self.data.tobytes()
+        bounds = self.offsets.tolist()
+        return [raw[start:end].decode('utf-8') if ok else None
+                for start, end, ok in zip(bounds, bounds[1:], self.valid.tolist())]
+
+    def to_pandas(self):
+        return pd.Series(self.to_list(), dtype='object')
+
+
+class ColumnStore:
+    """ Read side of a store: numeric columns are memory-mapped .npy arrays (no copy) """
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        self.manifest = _read_manifest(store_dir)
+        if self.manifest is None:
+            raise FileNotFoundError(f"No column store in {store_dir}")
+        self._columns = {}
+
+    def __len__(self):
+        return self.manifest['rows']
+
+    @property
+    def columns(self):
+        return list(self.manifest['columns'])
+
+    def column(self, name):
+        if name not in self._columns:
+            if self.manifest['columns'][name] == 'text':
+                self._columns[name] = TextColumn(self.store_dir, name)
+            else:
+                self._columns[name] = np.load(os.path.join(self.store_dir, f'{name}.npy'), mmap_mode='r')
+        return self._columns[name]
+
+    def to_frame(self, columns=None):
+        """ A DataFrame of the chosen columns; text columns are decoded, numeric ones stay mapped """
+        data = {}
+        for name in columns or self.columns:
+            column = self.column(name)
+            data[name] = column.to_pandas() if isinstance(column, TextColumn) else column
+        return pd.DataFrame(data, copy=False)
+
+
+def open_store(csv_path=CSV_PATH, store_dir=None):
+    """ Map the column store of a CSV, (re)building it first if the CSV changed """
+    store_dir = store_dir or default_store_dir(csv_path)
+    if not is_current(csv_path, store_dir):
+        build_store(csv_path, store_dir)
+    return ColumnStore(store_dir)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build or check the binary column store of tmdb-movies.csv")
+    parser.add_argument("csv", nargs="?", default=CSV_PATH)
+    parser.add_argument("--store-dir", default=None)
+    parser.add_argument("--rebuild", action="store_true")
+    args = parser.parse_args()
+
+    store_dir = args.store_dir or default_store_dir(args.csv)
+    started = time.perf_counter()
+    if args.rebuild:
+        build_store(args.csv, store_dir)
+        store = ColumnStore(store_dir)
+    else:
+        store = open_store(args.csv, store_dir)
+    print(f"{len(store)} rows, {len(store.columns)} columns in {store_dir} "
+          f"({time.perf_counter() - started:.3f}s)")
+
+    started = time.perf_counter()
+    load_movies(args.csv)
+    csv_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    store.to_frame()
+    print(f"parse CSV {csv_seconds:.3f}s, map store {time.perf_counter() - started:.3f}s")
@@ -0,0 +1,155 @@
+import os
+import sys
+import json
+import time
+import heapq
+import argparse
+
+import numpy as np
+
+from analytics import CSV_PATH
+from column_store import open_store
+
+# pipe-delimited fields of the dataset; director is usually one name but can list several
+INDEXED_FIELDS = ('cast', 'director', 'genres')
+SEPARATOR = '|'
+
+
+class InvertedIndex:
+    """ Names of one field mapped to the rows (movies) they appear in
+
+    Every distinct name is interned once and gets an integer code, in order
+    of first appearance. Postings are stored CSR-style: the rows of code
+    ``i`` are ``rows[offsets[i]:offsets[i + 1]]``, ascending, each movie once.
+    """
+
+    def __init__(self, terms, offsets, rows):
+        self.terms = terms
+        self.codes = {term: code for code, term in enumerate(terms)}
+        self.offsets = offsets
+        self.rows = rows
+        self.counts = np.diff(offsets)
+
+    @classmethod
+    def build(cls, values, separator=SEPARATOR):
+        """ Index an iterable of cells (None for missing) by their ``separator``-split names """
+        codes = {}
+        terms = []
+        posting_codes = []
+        posting_rows = []
+        for row, value in enumerate(values):
+            if not value:
+                continue
+            for name in dict.fromkeys(value.split(separator)):
+                if not name:
+                    continue
+                code = codes.get(name)
+                if code is None:
+                    code = codes[name] = len(terms)
+                    terms.append(sys.intern(name))
+                posting_codes.append(code)
+                posting_rows.append(row)
+        posting_codes = np.array(posting_codes, dtype='int32')
+        # rows arrive ascending, so a stable sort by code keeps them ascending per code
+        order = np.argsort(posting_codes, kind='stable')
+        offsets = np.zeros(len(terms) + 1, dtype='int64')
+        np.cumsum(np.bincount(posting_codes, minlength=len(terms)), out=offsets[1:])
+        return cls(terms, offsets, np.array(posting_rows, dtype='int32')[order])
+
+    def __len__(self):
+        return len(self.terms)
+
+    def __contains__(self, term):
+        return term in self.codes
+
+    def postings(self, term):
+        """ Rows of every movie that lists ``term``; empty if it never occurs """
+        code = self.codes.get(term)
+        if code is None:
+            return self.rows[:0]
+        return self.rows[self.offsets[code]:self.offsets[code + 1]]
+
+    def count(self, term):
+        code = self.codes.get(term)
+        return 0 if code is None else int(self.counts[code])
+
+    def top(self, k=None):
+        """ The ``k`` names with the most movies, as (name, count), ties in file order
+
+        Uses heap selection, O(n log k), instead of sorting every name;
+        ``k=None`` returns all of them.
+        """
+        if k is None or k >= len(self.terms):
+            best = sorted(range(len(self.terms)), key=self.counts.__getitem__, reverse=True)
+        else:
+            best = heapq.nlargest(k, range(len(self.terms)), key=self.counts.__getitem__)
+        return [(self.terms[code], int(self.counts[code])) for code in best]
+
+    def save(self, directory, name):
+        with open(os.path.join(directory, f'{name}.terms.json'), 'w', encoding='utf-8') as f:
+            json.dump(self.terms, f, ensure_ascii=False)
+        np.save(os.path.join(directory, f'{name}.postings.offsets.npy'), self.offsets)
+        np.save(os.path.join(directory, f'{name}.postings.rows.npy'), self.rows)
+
+    @classmethod
+    def load(cls, directory, name):
+        with open(os.path.join(directory, f'{name}.terms.json'), encoding='utf-8') as f:
+            terms = [sys.intern(term) for term in json.load(f)]
+        offsets = np.load(os.path.join(directory, f'{name}.postings.offsets.npy'), mmap_mode='r')
+        rows = np.load(os.path.join(directory, f'{name}.postings.rows.npy'), mmap_mode='r')
+        return cls(terms, offsets, rows)
+
+
+def open_indexes(csv_path=CSV_PATH, fields=INDEXED_FIELDS):
+    """ The column store of the CSV and an index per field
+
+    Indexes are saved inside the store directory, so a rebuild of the store
+    (the CSV changed) drops them and they are rebuilt on the next call.
+    """
+    store = open_store(csv_path)
+    indexes = {}
+    for field in fields:
+        try:
+            indexes[field] = InvertedIndex.load(store.store_dir, field)
+        except FileNotFoundError:
+            indexes[field] = InvertedIndex.build(store.column(field).to_list())
+            indexes[field].save(store.store_dir, field)
+    return store, indexes
+
+
+def movies_where(index, term, column, above):
+    """ Rows of ``term``'s movies whose ``column`` value is greater than ``above`` """
+    rows = index.postings(term)
+    return rows[np.asarray(column)[rows] > above]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Query the cast, director and genre indexes of tmdb-movies.csv")
+    parser.add_argument("csv", nargs="?", default=CSV_PATH)
+    parser.add_argument("--top", type=int, default=10, help="how many names to list per field")
+    parser.add_argument("--field", choices=INDEXED_FIELDS, default='cast')
+    parser.add_argument("--name", help="list the movies of this name in --field")
+    parser.add_argument("--min-revenue", type=int, default=None, help="with --name: revenue greater than this")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    store, indexes = open_indexes(args.csv)
+    print(f"indexes ready in {time.perf_counter() - started:.3f}s")
+
+    if args.name:
+        index = indexes[args.field]
+        if args.min_revenue is None:
+            rows = index.postings(args.name)
+        else:
+            rows = movies_where(index, args.name, store.column('revenue'), args.min_revenue)
+        titles = store.column('original_title')
+        revenue = store.column('revenue')
+        for row in rows:
+            print(f"{titles[row]} ({revenue[row]})")
+        print(f"{len(rows)} of {index.count(args.name)} movies")
+    else:
+        for field, index in indexes.items():
+            started = time.perf_counter()
+            top = index.top(args.top)
+            print(f"{field} ({len(index)} names, {time.perf_counter() - started:.4f}s): "
+                  + ", ".join(f"{name} {count}" for name, count in top))